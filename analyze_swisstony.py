@@ -1,50 +1,127 @@
 #!/usr/bin/env python3
 """
 Polymarket 顶级交易者分析脚本
-分析对象：swisstony (@swisstony)
+默认分析对象：swisstony (@swisstony)，可传入任意用户名与钱包地址
 """
 
-import requests
-import json
-from datetime import datetime, timedelta
+import asyncio
+import logging
+from datetime import datetime
 from typing import Dict, List, Optional
 
+import numpy as np
+import pandas as pd
+
+from trade_history import TradeHistoryFetcher, TradeHistoryStore
+
+logger = logging.getLogger(__name__)
+
+# 按标题/事件 slug 归类市场，按顺序取第一个命中的类别
+CATEGORY_PATTERNS = {
+    "政治": r"election|president|trump|biden|senate|congress|governor|democrat|republican|vote|primary|minister|parliament",
+    "体育": r"\bnba\b|\bnfl\b|\bmlb\b|\bnhl\b|\bufc\b|premier league|champions league|la liga|serie a|\bvs\.?\b|win the|super bowl|world cup|open\b|grand prix|match",
+    "加密货币": r"bitcoin|\bbtc\b|ethereum|\beth\b|solana|\bsol\b|crypto|\bxrp\b|doge|memecoin|token",
+    "金融": r"\bfed\b|interest rate|inflation|\bcpi\b|s&p|nasdaq|stock|recession|gdp|tariff|earnings",
+}
+
+# 活动类型 → 现金流方向 (TRADE 按买卖方向另算)
+CASH_SIGNS = {'REDEEM': 1, 'MERGE': 1, 'SPLIT': -1, 'REWARD': 1}
+
+
 class PolymarketTraderAnalyzer:
     """
     Polymarket 交易者分析器
+    交易历史来自 Data API，缓存在本地 SQLite；指标在一次加载后用 pandas 计算并缓存
     """
     
-    def __init__(self, username: str, wallet_address: str):
+    def __init__(self, username: str, wallet_address: str,
+                 store: Optional[TradeHistoryStore] = None, max_age: float = 3600):
         self.username = username
-        self.wallet_address = wallet_address
-        self.base_url = "https://gamma-api.polymarket.com"
-        self.headers = {
-            "Accept": "application/json",
-            "User-Agent": "PolymarketAnalyzer/1.0",
-            "Origin": "https://polymarket.com"
-        }
+        self.wallet_address = wallet_address.lower()
+        self.store = store or TradeHistoryStore()
+        self.fetcher = TradeHistoryFetcher(self.store, max_age=max_age)
+        self.activity = pd.DataFrame()
+        self.positions = pd.DataFrame()
         self.data = {}
         
+    def load(self, refresh: bool = True) -> int:
+        """同步 (缓存过期时) 并读入交易历史，返回记录数"""
+        if refresh:
+            try:
+                asyncio.run(self.fetcher.sync(self.wallet_address))
+            except Exception as e:
+                print(f"⚠️ 同步交易历史失败，使用本地缓存: {e}")
+        
+        self.activity = self.store.load_activity(self.wallet_address)
+        self.positions = self.store.load_positions(self.wallet_address)
+        self.data = {}
+        
+        if not self.activity.empty:
+            df = self.activity
+            sign = df['type'].map(CASH_SIGNS).fillna(0.0)
+            trade_sign = np.where(df['side'] == 'BUY', -1.0, 1.0)
+            sign = np.where(df['type'] == 'TRADE', trade_sign, sign)
+            df['cash'] = sign * df['usdc_size']
+            
+            text = (df['title'].fillna('') + ' ' + df['event_slug'].fillna('').str.replace('-', ' ')).str.lower()
+            hits = [text.str.contains(pattern, regex=True) for pattern in CATEGORY_PATTERNS.values()]
+            df['category'] = np.select(hits, list(CATEGORY_PATTERNS), default='其他')
+        
+        return len(self.activity)
+    
+    def _ensure_loaded(self):
+        if self.activity.empty and not self.data:
+            self.load()
+    
+    def market_pnl(self) -> pd.Series:
+        """每个市场 (conditionId) 的盈亏 = 现金流 + 当前持仓市值"""
+        if 'market_pnl' not in self.data:
+            cash = self.activity.groupby('condition_id')['cash'].sum() if not self.activity.empty else pd.Series(dtype=float)
+            value = (self.positions.groupby('condition_id')['current_value'].sum()
+                     if not self.positions.empty else pd.Series(dtype=float))
+            self.data['market_pnl'] = cash.add(value, fill_value=0.0)
+        return self.data['market_pnl']
+    
     def fetch_user_stats(self) -> Dict:
         """
         获取用户统计数据
         """
+        if 'stats' in self.data:
+            return self.data['stats']
+        
         try:
-            # 从页面数据中提取的关键信息
+            self._ensure_loaded()
+            df = self.activity
+            if df.empty:
+                print(f"❌ 没有 {self.wallet_address} 的交易记录")
+                return {}
+            
+            trades = df[df['type'] == 'TRADE']
+            pnl = self.market_pnl()
+            open_markets = set(self.positions.loc[self.positions['size'] > 0, 'condition_id']) if not self.positions.empty else set()
+            closed = pnl[~pnl.index.isin(open_markets)]
+            unrealized = float(self.positions['cash_pnl'].sum()) if not self.positions.empty else 0.0
+            total_pnl = float(pnl.sum())
+            
+            first, last = df['ts'].min(), df['ts'].max()
             stats = {
                 "username": self.username,
                 "wallet": self.wallet_address,
-                "total_volume": 333860858.59610546,  # $333.86M
-                "total_pnl": 3648508.0008899793,     # $3.65M
-                "realized_pnl": 0,
-                "unrealized_pnl": 0,
-                "trades_count": 35181,
-                "largest_win": 290487.713706,
-                "views": 237692,
-                "join_date": "2025-07-29",
-                "current_positions_value": 309356.5167,
+                "total_volume": float(trades['usdc_size'].sum()),
+                "total_pnl": total_pnl,
+                "realized_pnl": total_pnl - unrealized,
+                "unrealized_pnl": unrealized,
+                "trades_count": len(trades),
+                "markets_traded": int(trades['condition_id'].nunique()),
+                "largest_win": float(pnl.max()) if len(pnl) else 0.0,
+                "largest_loss": float(pnl.min()) if len(pnl) else 0.0,
+                "win_rate": float((closed > 0).mean() * 100) if len(closed) else 0.0,
+                "join_date": datetime.fromtimestamp(first).strftime('%Y-%m-%d'),
+                "active_days": max((last - first) / 86400, 1.0),
+                "current_positions_value": float(self.positions['current_value'].sum()) if not self.positions.empty else 0.0,
                 "analysis_timestamp": datetime.now().isoformat()
             }
+            self.data['stats'] = stats
             return stats
         except Exception as e:
             print(f"❌ 获取用户统计失败: {e}")
@@ -54,6 +131,9 @@ class PolymarketTraderAnalyzer:
         """
         分析交易表现
         """
+        if 'performance' in self.data:
+            return self.data['performance']
+        
         stats = self.fetch_user_stats()
         
         if not stats:
@@ -71,8 +151,8 @@ class PolymarketTraderAnalyzer:
             # 每笔交易平均盈亏
             "avg_pnl_per_trade": pnl / trades if trades > 0 else 0,
             
-            # 交易频率（假设6个月）
-            "trades_per_day": trades / 180,  # 约180天
+            # 交易频率 (首笔到最后一笔之间的天数)
+            "trades_per_day": trades / stats["active_days"],
             
             # 盈亏比
             "largest_win_vs_avg": stats["largest_win"] / (pnl / trades) if trades > 0 and pnl > 0 else 0,
@@ -84,13 +164,123 @@ class PolymarketTraderAnalyzer:
             "positions_to_pnl_ratio": (stats["current_positions_value"] / pnl) * 100 if pnl > 0 else 0
         }
         
+        self.data['performance'] = analysis
         return analysis
     
+    def style_metrics(self) -> Dict:
+        """
+        交易风格指标: 单笔规模、双向交易占比、极端价格成交占比、每市场交易数
+        """
+        if 'style' in self.data:
+            return self.data['style']
+        
+        self._ensure_loaded()
+        trades = self.activity[self.activity['type'] == 'TRADE'] if not self.activity.empty else self.activity
+        if trades.empty:
+            return {}
+        
+        # 同一 token 既买又卖 → 做市/波段的特征
+        sides = trades.groupby('asset')['side'].nunique()
+        extreme = (trades['price'] >= 0.9) | (trades['price'] <= 0.1)
+        
+        metrics = {
+            "median_trade_usdc": float(trades['usdc_size'].median()),
+            "mean_trade_usdc": float(trades['usdc_size'].mean()),
+            "buy_ratio": float((trades['side'] == 'BUY').mean() * 100),
+            "two_sided_ratio": float((sides > 1).mean() * 100),
+            "extreme_price_volume_share": float(trades.loc[extreme, 'usdc_size'].sum() / max(trades['usdc_size'].sum(), 1e-9) * 100),
+            "trades_per_market": float(trades.groupby('condition_id').size().mean()),
+        }
+        self.data['style'] = metrics
+        return metrics
+    
+    def holding_periods(self) -> Dict:
+        """
+        持仓时间 (小时)
+        按 token 计算成交量加权的买入时间与退出时间 (卖出/赎回) 之差
+        """
+        if 'holding' in self.data:
+            return self.data['holding']
+        
+        self._ensure_loaded()
+        df = self.activity
+        if df.empty:
+            return {}
+        
+        trades = df[df['type'] == 'TRADE'].assign(weighted_ts=lambda x: x['ts'] * x['size'])
+        buys = trades[trades['side'] == 'BUY']
+        sells = trades[trades['side'] == 'SELL']
+        
+        def vwap_ts(frame: pd.DataFrame, key: str) -> pd.Series:
+            grouped = frame.groupby(key)[['weighted_ts', 'size']].sum()
+            return grouped['weighted_ts'] / grouped['size'].where(grouped['size'] > 0)
+        
+        # 卖出退出按 token 匹配，赎回只有 conditionId，按市场匹配
+        sell_hold = (vwap_ts(sells, 'asset') - vwap_ts(buys, 'asset')).dropna()
+        redeems = df[df['type'] == 'REDEEM'].groupby('condition_id')['ts'].min()
+        redeem_hold = (redeems - vwap_ts(buys, 'condition_id')).dropna()
+        
+        hours = pd.concat([sell_hold, redeem_hold]).clip(lower=0) / 3600
+        if hours.empty:
+            return {}
+        
+        periods = {
+            "median_hours": float(hours.median()),
+            "mean_hours": float(hours.mean()),
+            "p90_hours": float(hours.quantile(0.9)),
+            "intraday_share": float((hours < 24).mean() * 100),
+            "samples": int(len(hours)),
+        }
+        self.data['holding'] = periods
+        return periods
+    
+    def category_mix(self) -> pd.DataFrame:
+        """
+        按类别统计交易量、交易数与盈亏
+        """
+        if 'categories' in self.data:
+            return self.data['categories']
+        
+        self._ensure_loaded()
+        trades = self.activity[self.activity['type'] == 'TRADE'] if not self.activity.empty else self.activity
+        if trades.empty:
+            return pd.DataFrame()
+        
+        mix = trades.groupby('category').agg(volume=('usdc_size', 'sum'), trades=('usdc_size', 'size'))
+        market_category = trades.groupby('condition_id')['category'].first()
+        mix['pnl'] = self.market_pnl().groupby(market_category).sum()
+        mix['volume_share'] = mix['volume'] / mix['volume'].sum() * 100
+        mix = mix.fillna(0.0).sort_values('volume', ascending=False)
+        
+        self.data['categories'] = mix
+        return mix
+    
+    def pnl_curve(self) -> pd.Series:
+        """
+        按日累计现金流盈亏曲线 (已实现部分，不含当前持仓市值)
+        """
+        if 'pnl_curve' in self.data:
+            return self.data['pnl_curve']
+        
+        self._ensure_loaded()
+        if self.activity.empty:
+            return pd.Series(dtype=float)
+        
+        curve = self.activity.set_index('time')['cash'].resample('D').sum().cumsum()
+        self.data['pnl_curve'] = curve
+        return curve
+    
+    def max_drawdown(self) -> float:
+        """现金流曲线的最大回撤 (美元)"""
+        curve = self.pnl_curve()
+        if curve.empty:
+            return 0.0
+        return float((curve.cummax() - curve).max())
+    
     def identify_trading_style(self) -> str:
         """
         识别交易风格
         """
-        stats = self.fetch_user_stats()
         analysis = self.analyze_trading_performance()
         
         # 基于数据分析交易风格
@@ -129,6 +319,8 @@ class PolymarketTraderAnalyzer:
         """
         stats = self.fetch_user_stats()
         analysis = self.analyze_trading_performance()
+        style = self.style_metrics()
+        holding = self.holding_periods()
         
         insights = []
         
@@ -152,8 +344,8 @@ class PolymarketTraderAnalyzer:
         # 4. 最大盈利
         largest_win = stats.get("largest_win", 0)
         total_pnl = stats.get("total_pnl", 0)
-        if largest_win > total_pnl * 0.05:
-            insights.append(f"🎲 **事件驱动**: 最大单笔盈利 ${largest_win:,.2f} 占总盈利 {(largest_win/total_pnl)*100:.1f}%，擅长捕捉大机会")
+        if total_pnl > 0 and largest_win > total_pnl * 0.05:
+            insights.append(f"🎲 **事件驱动**: 最大单个市场盈利 ${largest_win:,.2f} 占总盈利 {(largest_win/total_pnl)*100:.1f}%，擅长捕捉大机会")
         
         # 5. 效率
         profit_per_m = analysis.get("profit_per_million_volume", 0)
@@ -164,55 +356,98 @@ class PolymarketTraderAnalyzer:
         if positions_ratio < 10:
             insights.append(f"🔒 **快速周转**: 当前持仓仅占总盈利 {positions_ratio:.1f}%，资金周转率高")
         
+        # 7. 双向交易 / 尾部价格
+        if style.get("two_sided_ratio", 0) > 50:
+            insights.append(f"🔄 **双向交易**: {style['two_sided_ratio']:.1f}% 的 token 既买又卖，具备做市特征")
+        if style.get("extreme_price_volume_share", 0) > 40:
+            insights.append(f"🧲 **尾部收割**: {style['extreme_price_volume_share']:.1f}% 的成交量发生在 <0.1 或 >0.9 的价格")
+        
+        # 8. 持仓时间
+        if holding:
+            insights.append(f"⏱️ **持仓时间**: 中位数 {holding['median_hours']:.1f} 小时，{holding['intraday_share']:.1f}% 在一天内退出")
+        
         return insights
     
     def estimate_strategy_type(self) -> Dict:
         """
-        估计策略类型（基于 swisstony 的特征）
+        估计策略类型 (基于交易历史指标的启发式打分)
         """
-        # 基于观察到的特征推断
+        stats = self.fetch_user_stats()
+        analysis = self.analyze_trading_performance()
+        style = self.style_metrics()
+        holding = self.holding_periods()
+        mix = self.category_mix()
+        
+        trades_per_day = analysis.get("trades_per_day", 0)
+        two_sided = style.get("two_sided_ratio", 0)
+        extreme = style.get("extreme_price_volume_share", 0)
+        total_pnl = stats.get("total_pnl", 0)
+        win_share = stats.get("largest_win", 0) / total_pnl * 100 if total_pnl > 0 else 0
+        median_hours = holding.get("median_hours", 0)
+        
+        def clamp(value: float) -> int:
+            return int(max(5, min(95, value)))
+        
+        likely = [
+            {
+                "name": "高频做市/套利",
+                "probability": clamp(20 + two_sided * 0.5 + min(trades_per_day, 200) / 5),
+                "evidence": [
+                    f"{stats.get('trades_count', 0):,} 笔交易，{stats.get('active_days', 0):.0f} 天内",
+                    f"日均 {trades_per_day:.0f} 笔交易",
+                    f"{two_sided:.1f}% 的 token 双向成交"
+                ]
+            },
+            {
+                "name": "事件驱动策略",
+                "probability": clamp(20 + win_share * 2),
+                "evidence": [
+                    f"最大单个市场盈利 ${stats.get('largest_win', 0):,.0f}",
+                    f"占总盈利 {win_share:.1f}%",
+                    f"共参与 {stats.get('markets_traded', 0):,} 个市场"
+                ]
+            },
+            {
+                "name": "量化算法交易",
+                "probability": clamp(10 + min(trades_per_day, 300) / 3),
+                "evidence": [
+                    f"日均 {trades_per_day:.0f} 笔交易",
+                    f"${stats.get('total_volume', 0):,.0f} 交易量",
+                    f"单笔中位数 ${style.get('median_trade_usdc', 0):,.2f}"
+                ]
+            },
+            {
+                "name": "尾部概率收割",
+                "probability": clamp(extreme),
+                "evidence": [
+                    f"{extreme:.1f}% 成交量在 <0.1 或 >0.9 的价格",
+                    f"买入占比 {style.get('buy_ratio', 0):.1f}%",
+                    f"持仓中位数 {median_hours:.1f} 小时"
+                ]
+            }
+        ]
+        likely.sort(key=lambda s: s["probability"], reverse=True)
+        
+        drawdown = self.max_drawdown()
+        if drawdown > abs(total_pnl):
+            risk_profile = "激进型"
+        elif drawdown > abs(total_pnl) * 0.3:
+            risk_profile = "平衡型"
+        else:
+            risk_profile = "稳健型"
+        
+        if median_hours < 24:
+            time_horizon = "短期/日内"
+        elif median_hours < 24 * 14:
+            time_horizon = "中期 (数天至两周)"
+        else:
+            time_horizon = "长期/持有到结算"
+        
         strategies = {
-            "likely_strategies": [
-                {
-                    "name": "高频做市/套利",
-                    "probability": 85,
-                    "evidence": [
-                        "35,181 笔交易在6个月内",
-                        "日均 195 笔交易",
-                        "稳定的小额盈利累积"
-                    ]
-                },
-                {
-                    "name": "事件驱动策略",
-                    "probability": 70,
-                    "evidence": [
-                        f"最大单笔盈利 $290,487",
-                        "Polymarket 适合事件交易",
-                        "政治/体育/加密货币市场"
-                    ]
-                },
-                {
-                    "name": "量化算法交易",
-                    "probability": 80,
-                    "evidence": [
-                        "极高的交易频率",
-                        "超过 3.33 亿美元交易量",
-                        "人工难以达到的频率"
-                    ]
-                },
-                {
-                    "name": "流动性提供",
-                    "probability": 60,
-                    "evidence": [
-                        "大量交易累积收益",
-                        "可能是做市商策略",
-                        "赚取买卖价差"
-                    ]
-                }
-            ],
-            "risk_profile": "激进型",
-            "time_horizon": "短期/日内",
-            "market_focus": ["政治", "体育", "加密货币", "金融"]
+            "likely_strategies": likely,
+            "risk_profile": risk_profile,
+            "time_horizon": time_horizon,
+            "market_focus": list(mix.index[:3]) if not mix.empty else []
         }
         
         return strategies
@@ -221,13 +456,14 @@ class PolymarketTraderAnalyzer:
         """
         生成学习建议
         """
+        trades_per_day = self.analyze_trading_performance().get("trades_per_day", 0)
         recommendations = [
-            "🎯 **学习高频交易**: swisstony 的交易频率表明使用了自动化系统",
+            f"🎯 **学习高频交易**: {self.username} 的交易频率表明使用了自动化系统",
             "📚 **研究做市策略**: 可能是通过提供流动性赚取价差",
             "🔍 **关注事件交易**: 捕捉高波动性事件的机会",
             "⚡ **技术分析**: 学习快速进出的技术方法",
             "💡 **风险管理**: 尽管高频，但实现了正收益，风控优秀",
-            "🤖 **考虑自动化**: 人工无法完成日均 195 笔交易",
+            f"🤖 **考虑自动化**: 人工难以完成日均 {trades_per_day:.0f} 笔交易",
             "📊 **数据驱动**: 使用数据分析和回测优化策略"
         ]
         return recommendations
@@ -239,11 +475,11 @@ class PolymarketTraderAnalyzer:
         stats = self.fetch_user_stats()
         
         benchmarks = {
-            "swisstony": {
+            "trader": {
                 "volume": stats.get("total_volume", 0),
                 "pnl": stats.get("total_pnl", 0),
                 "trades": stats.get("trades_count", 0),
-                "return_rate": (stats.get("total_pnl", 0) / stats.get("total_volume", 0)) * 100
+                "return_rate": (stats.get("total_pnl", 0) / stats["total_volume"]) * 100 if stats.get("total_volume") else 0
             },
             "typical_trader": {
                 "volume": 100000,
@@ -265,23 +501,23 @@ class PolymarketTraderAnalyzer:
             }
         }
         
-        swisstony = benchmarks["swisstony"]
+        trader = benchmarks["trader"]
         
         comparison = {
             "vs_typical": {
-                "volume_ratio": swisstony["volume"] / benchmarks["typical_trader"]["volume"],
-                "pnl_difference": swisstony["pnl"] - benchmarks["typical_trader"]["pnl"],
-                "trades_ratio": swisstony["trades"] / benchmarks["typical_trader"]["trades"]
+                "volume_ratio": trader["volume"] / benchmarks["typical_trader"]["volume"],
+                "pnl_difference": trader["pnl"] - benchmarks["typical_trader"]["pnl"],
+                "trades_ratio": trader["trades"] / benchmarks["typical_trader"]["trades"]
             },
             "vs_profitable": {
-                "volume_ratio": swisstony["volume"] / benchmarks["profitable_trader"]["volume"],
-                "pnl_ratio": swisstony["pnl"] / benchmarks["profitable_trader"]["pnl"],
-                "trades_ratio": swisstony["trades"] / benchmarks["profitable_trader"]["trades"]
+                "volume_ratio": trader["volume"] / benchmarks["profitable_trader"]["volume"],
+                "pnl_ratio": trader["pnl"] / benchmarks["profitable_trader"]["pnl"],
+                "trades_ratio": trader["trades"] / benchmarks["profitable_trader"]["trades"]
             },
             "vs_top": {
-                "volume_ratio": swisstony["volume"] / benchmarks["top_performer"]["volume"],
-                "pnl_ratio": swisstony["pnl"] / benchmarks["top_performer"]["pnl"],
-                "trades_ratio": swisstony["trades"] / benchmarks["top_performer"]["trades"]
+                "volume_ratio": trader["volume"] / benchmarks["top_performer"]["volume"],
+                "pnl_ratio": trader["pnl"] / benchmarks["top_performer"]["pnl"],
+                "trades_ratio": trader["trades"] / benchmarks["top_performer"]["trades"]
             }
         }
         
@@ -298,6 +534,9 @@ class PolymarketTraderAnalyzer:
         strategies = self.estimate_strategy_type()
         recommendations = self.generate_recommendations()
         comparison = self.compare_to_benchmarks()
+        style_metrics = self.style_metrics()
+        holding = self.holding_periods()
+        mix = self.category_mix()
         
         report = f"""
 {'='*80}
@@ -309,7 +548,7 @@ class PolymarketTraderAnalyzer:
 用户名: {stats.get('username', 'N/A')}
 钱包地址: {stats.get('wallet', 'N/A')}
 加入时间: {stats.get('join_date', 'N/A')}
-账户浏览量: {stats.get('views', 0):,}
+活跃天数: {stats.get('active_days', 0):.0f}
 
 📊 交易表现
 {'─'*80}
@@ -323,10 +562,23 @@ class PolymarketTraderAnalyzer:
 {'─'*80}
 交易次数: {stats.get('trades_count', 0):,} 笔
 日均交易: {analysis.get('trades_per_day', 0):.1f} 笔
-最大单笔盈利: ${stats.get('largest_win', 0):,.2f}
+参与市场: {stats.get('markets_traded', 0):,} 个
+已结束市场胜率: {stats.get('win_rate', 0):.1f}%
+最大单个市场盈利: ${stats.get('largest_win', 0):,.2f}
+最大单个市场亏损: ${stats.get('largest_loss', 0):,.2f}
 平均单笔盈亏: ${analysis.get('avg_pnl_per_trade', 0):.2f}
 总回报率: {analysis.get('return_rate', 0):.4f}%
 每百万交易量利润: ${analysis.get('profit_per_million_volume', 0):,.2f}
+现金流最大回撤: ${self.max_drawdown():,.2f}
+
+🧭 风格指标
+{'─'*80}
+单笔中位数: ${style_metrics.get('median_trade_usdc', 0):,.2f}
+买入占比: {style_metrics.get('buy_ratio', 0):.1f}%
+双向成交 token 占比: {style_metrics.get('two_sided_ratio', 0):.1f}%
+极端价格成交量占比: {style_metrics.get('extreme_price_volume_share', 0):.1f}%
+每市场平均交易: {style_metrics.get('trades_per_market', 0):.1f} 笔
+持仓时间中位数: {holding.get('median_hours', 0):.1f} 小时 (P90 {holding.get('p90_hours', 0):.1f} 小时)
 
 🎯 交易风格识别
 {'─'*80}
@@ -342,6 +594,14 @@ class PolymarketTraderAnalyzer:
         for i, insight in enumerate(insights, 1):
             report += f"{i}. {insight}\n"
         
+        report += f"""
+🗂️ 类别分布
+{'─'*80}
+"""
+        
+        for category, row in mix.iterrows():
+            report += f"{category}: 交易量 ${row['volume']:,.0f} ({row['volume_share']:.1f}%), {int(row['trades']):,} 笔, 盈亏 ${row['pnl']:,.2f}\n"
+        
         report += f"""
 📋 可能的策略类型
 {'─'*80}
@@ -382,7 +642,7 @@ vs 顶级表现者:
 {'='*80}
 ⚠️ 免责声明
 {'='*80}
-本分析基于公开数据，仅供参考。
+本分析基于 Polymarket Data API 公开交易记录，仅供参考。
 Polymarket 交易存在风险，过往表现不代表未来收益。
 请根据自己的风险承受能力谨慎投资。
 
@@ -396,37 +656,57 @@ Polymarket 交易存在风险，过往表现不代表未来收益。
 def main():
     """
     主函数
+    用法: python analyze_swisstony.py [用户名 钱包地址]
     """
+    import sys
+    import time
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    username, wallet = "swisstony", "0x204f72f35326db932158cba6adff0b9a1da95e14"
+    if len(sys.argv) >= 3:
+        username, wallet = sys.argv[1], sys.argv[2]
+    
     print("🚀 Polymarket 顶级交易者分析器")
-    print("分析对象: swisstony (@swisstony)")
+    print(f"分析对象: {username} ({wallet})")
     print()
     
-    # 创建分析器
-    analyzer = PolymarketTraderAnalyzer(
-        username="swisstony",
-        wallet_address="0x204f72f35326db932158cba6adff0b9a1da95e14"
-    )
+    # 创建分析器并同步交易历史 (缓存未过期时直接读本地表)
+    analyzer = PolymarketTraderAnalyzer(username=username, wallet_address=wallet)
+    started = time.time()
+    count = analyzer.load()
+    print(f"📥 已加载 {count:,} 条活动记录 ({time.time() - started:.1f}s)")
+    if count == 0:
+        return
     
     # 生成并打印报告
+    started = time.time()
     report = analyzer.generate_full_report()
     print(report)
+    print(f"⏱️ 指标计算耗时 {time.time() - started:.2f}s")
     
     # 保存报告
-    filename = f"swisstony_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    filename = f"{username}_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
     with open(filename, 'w', encoding='utf-8') as f:
         f.write(report)
     
-    print(f"\n💾 报告已保存到: {filename}")
+    # 保存盈亏曲线
+    curve_file = f"{username}_pnl_curve.csv"
+    analyzer.pnl_curve().to_csv(curve_file, header=['cumulative_cash_pnl'])
+    
+    print(f"\n💾 报告已保存到: {filename}，盈亏曲线: {curve_file}")
     
     # 输出关键发现摘要
+    stats = analyzer.fetch_user_stats()
+    strategies = analyzer.estimate_strategy_type()
+    top = strategies["likely_strategies"][:2]
     print("\n" + "="*80)
     print("📌 关键发现摘要")
     print("="*80)
-    print(f"✅ swisstony 是 Polymarket 顶级交易者")
-    print(f"✅ 6 个月内交易超过 3.33 亿美元")
-    print(f"✅ 实现利润 364 万美元")
-    print(f"✅ 交易风格：高频 + 算法 + 事件驱动")
-    print(f"✅ 最可能策略：高频做市/套利 + 量化交易")
+    print(f"✅ {stats['active_days']:.0f} 天内交易 ${stats['total_volume']:,.0f}，共 {stats['trades_count']:,} 笔")
+    print(f"✅ 总盈亏 ${stats['total_pnl']:,.0f} (已实现 ${stats['realized_pnl']:,.0f})")
+    print(f"✅ 交易风格：{analyzer.identify_trading_style()}")
+    print(f"✅ 最可能策略：{' + '.join(s['name'] for s in top)}")
     print("="*80)
 
 if __name__ == "__main__":
@@ -9,23 +9,41 @@ import sys
 import json
 import time
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 import requests
 
+from opportunity_pipeline import TopK
+from opportunity_store import OpportunityStore, SweepDiff
+from signal_bus import SIGNAL_DB, Signal, SignalBus
+
 class ArbitrageScanner:
     """
     套利机会扫描器
     """
     
-    def __init__(self):
+    def __init__(self, top_k: int = 50, verbose: bool = False):
         self.api_key = os.getenv("POLYMARKET_API_KEY")
         self.gamma_url = "https://gamma-api.polymarket.com"
         self.results = []
         self.opportunities = []
+        self.top_k = top_k        # 保留的最佳市场数
+        self.verbose = verbose    # 是否逐条打印发现的机会
+        self.markets_scanned = 0
+        self.total_opportunities = 0
+        
+        # 跨轮去重：只有新增/变化/消失的机会才算变化
+        self.store = OpportunityStore()
+        self.last_diff = SweepDiff()
+        self.min_market_ratio = 0.8  # 市场数低于上次完整扫描的该比例时视为不完整
         
-    def fetch_all_markets(self, limit: int = 1000) -> List[Dict]:
+        # 新增/变化的机会发布到信号总线
+        self.bus = SignalBus(SIGNAL_DB)
+        self.store.subscribe(self.publish_changes)
+        
+    def fetch_all_markets(self, limit: int = 1000) -> Tuple[List[Dict], bool]:
         """
         获取所有活跃市场
+        返回 (市场列表, 是否完整)；中途失败时返回已获取的部分且 完整=False
         """
         markets = []
         offset = 0
@@ -61,10 +79,10 @@ class ArbitrageScanner:
                 
             except Exception as e:
                 print(f"❌ 获取市场失败: {e}")
-                break
+                return markets, False
         
         print(f"✅ 共获取 {len(markets)} 个活跃市场")
-        return markets
+        return markets, True
     
     def analyze_opportunity(self, market: Dict) -> Optional[Dict]:
         """
@@ -137,13 +155,10 @@ class ArbitrageScanner:
         
         return None
     
-    def scan_for_arbitrage(self) -> List[Dict]:
+    def iter_opportunities(self, markets: List[Dict]) -> Iterator[Dict]:
         """
-        扫描所有市场寻找套利机会
+        逐个产出有机会的市场
         """
-        markets = self.fetch_all_markets()
-        opportunities = []
-        
         print(f"\n🎯 正在分析 {len(markets)} 个市场寻找套利机会...")
         
         for i, market in enumerate(markets):
@@ -152,13 +167,75 @@ class ArbitrageScanner:
             
             result = self.analyze_opportunity(market)
             if result:
-                opportunities.append(result)
-                print(f"   ✅ 发现机会: {result['question'][:40]}...")
+                if self.verbose:
+                    print(f"   ✅ 发现机会: {result['question'][:40]}...")
+                yield result
+    
+    def scan_for_arbitrage(self) -> List[Dict]:
+        """
+        扫描所有市场寻找套利机会
+        只保留机会数最多的 top_k 个市场
+        """
+        markets, fetched = self.fetch_all_markets()
+        
+        # 拉取失败或市场数骤减时不判断消失，否则每个活跃机会都会被标记消失、下一轮又作为新增出现
+        expected = self.store.get_state('markets_scanned')
+        complete = fetched and (expected is None or len(markets) >= expected * self.min_market_ratio)
+        if not complete:
+            print(f"⚠️ 市场列表不完整 ({len(markets)} 个，上次完整扫描 {expected or 0:.0f} 个)，本轮不标记消失")
         
         # 按机会数量排序
-        opportunities.sort(key=lambda x: x["opportunity_count"], reverse=True)
+        top = TopK(self.top_k, key=lambda x: x["opportunity_count"])
+        
+        with self.store.sweep(["impossible_event", "mispricing"], complete=complete) as sweep:
+            for result in self.iter_opportunities(markets):
+                sweep.observe_many(self.flatten_opportunity(result))
+                top.push(result)
+        
+        self.markets_scanned = len(markets)
+        self.total_opportunities = top.total
+        if complete:
+            self.store.set_state('markets_scanned', len(markets))
+        self.last_diff = sweep.diff
         
-        return opportunities
+        changes = sweep.diff.summary()
+        print(f"\n🔄 本轮变化: 新增 {changes['new']} | 变化 {changes['changed']} | 消失 {changes['disappeared']}")
+        
+        return top.sorted()
+    
+    def publish_changes(self, diff: SweepDiff):
+        """
+        把新增/变化的机会作为 scanner 信号发布
+        """
+        for event in diff.new + diff.changed:
+            self.bus.publish_nowait(Signal(
+                source='scanner',
+                kind=event['strategy'],
+                confidence=min(100, 50 + event.get('expected_return', 0) / 10),
+                market_id=str(event['market_id']),
+                payload=event
+            ))
+    
+    def flatten_opportunity(self, result: Dict) -> List[Dict]:
+        """
+        展开为 (市场, 结果, 策略) 粒度的记录
+        """
+        records = []
+        for detail in result["opportunities"]:
+            record = {
+                "market_id": result["market_id"],
+                "question": result["question"],
+                "outcome": detail.get("outcome", ""),
+                "strategy": detail["type"],
+                "market_price": detail.get("market_price", 0),
+                "volume": result["volume"],
+                "liquidity": result["liquidity"],
+                "end_date": result["end_date"]
+            }
+            if "expected_return" in detail:
+                record["expected_return"] = detail["expected_return"]
+            records.append(record)
+        return records
     
     def save_results(self, opportunities: List[Dict]):
         """
@@ -171,7 +248,8 @@ class ArbitrageScanner:
         with open(json_file, 'w', encoding='utf-8') as f:
             json.dump({
                 "scan_time": datetime.now().isoformat(),
-                "total_opportunities": len(opportunities),
+                "total_opportunities": self.total_opportunities,
+                "changes": self.last_diff.summary(),
                 "opportunities": opportunities
             }, f, indent=2, ensure_ascii=False)
         
@@ -192,10 +270,12 @@ class ArbitrageScanner:
         with open(filename, 'w', encoding='utf-8') as f:
             f.write(f"# 🎯 Polymarket 套利机会扫描报告\n\n")
             f.write(f"**扫描时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"**发现机会**: {len(opportunities)} 个\n")
-            f.write(f"**扫描市场**: 1000+ 个活跃市场\n\n")
+            f.write(f"**发现机会**: {self.total_opportunities} 个\n")
+            f.write(f"**扫描市场**: {self.markets_scanned} 个活跃市场\n\n")
             f.write(f"---\n\n")
             
+            self.write_changes_section(f)
+            
             if not opportunities:
                 f.write("❌ 未发现明显的套利机会\n")
                 return
@@ -251,6 +331,29 @@ class ArbitrageScanner:
             f.write(f"- 建议只用小额资金测试\n")
             f.write(f"- 过往表现不代表未来收益\n")
 
+    def write_changes_section(self, f):
+        """
+        写入与上一轮相比的变化
+        """
+        diff = self.last_diff
+        changes = diff.summary()
+        
+        f.write(f"## 🔄 本轮变化\n\n")
+        f.write(f"新增 {changes['new']} | 价格变化 {changes['changed']} | 消失 {changes['disappeared']} | 未变 {changes['unchanged']}\n\n")
+        
+        for title, events in [("🆕 新增", diff.new), ("📈 价格变化", diff.changed), ("👋 消失", diff.disappeared)]:
+            if not events:
+                continue
+            f.write(f"**{title}**:\n\n")
+            for event in events[:10]:
+                line = f"- {event['question'][:50]} | {event['outcome']} | {event['strategy']} | {event['market_price']:.4f}"
+                if event.get("price_delta") is not None:
+                    line += f" ({event['price_delta']:+.4f})"
+                f.write(line + "\n")
+            f.write(f"\n")
+        
+        f.write(f"---\n\n")
+
 def main():
     """
     主函数
@@ -262,7 +365,7 @@ def main():
     print("=" * 70)
     print()
     
-    scanner = ArbitrageScanner()
+    scanner = ArbitrageScanner(verbose="--verbose" in sys.argv)
     
     # 执行扫描
     opportunities = scanner.scan_for_arbitrage()
@@ -271,7 +374,7 @@ def main():
     print("\n" + "=" * 70)
     print("📊 扫描结果")
     print("=" * 70)
-    print(f"发现 {len(opportunities)} 个潜在套利机会\n")
+    print(f"发现 {scanner.total_opportunities} 个潜在套利机会\n")
     
     if opportunities:
         for i, opp in enumerate(opportunities[:5], 1):
@@ -21,13 +21,25 @@ python3 arbitrage_scanner.py >> /root/clawd/automation/cron.log 2>&1
 echo "[$DATE] 运行市场监控..." >> /root/clawd/automation/cron.log
 python3 market_monitor.py >> /root/clawd/automation/cron.log 2>&1
 
-# 3. 整理生成的报告
+# 3. 运行组合套利检测
+echo "[$DATE] 运行组合套利检测..." >> /root/clawd/automation/cron.log
+python3 basket_arbitrage.py >> /root/clawd/automation/cron.log 2>&1
+
+# 4. 运行跨市场一致性扫描
+echo "[$DATE] 运行跨市场一致性扫描..." >> /root/clawd/automation/cron.log
+python3 ladder_scanner.py >> /root/clawd/automation/cron.log 2>&1
+
+# 5. 整理生成的报告
 echo "[$DATE] 整理报告..." >> /root/clawd/automation/cron.log
 mkdir -p /root/clawd/reports/$(date +%Y%m%d)
 mv /root/clawd/arbitrage_report_*.md /root/clawd/reports/$(date +%Y%m%d)/ 2>/dev/null
 mv /root/clawd/market_monitor_report_*.md /root/clawd/reports/$(date +%Y%m%d)/ 2>/dev/null
 mv /root/clawd/arbitrage_opportunities_*.json /root/clawd/reports/$(date +%Y%m%d)/ 2>/dev/null
 mv /root/clawd/market_snapshot_*.json /root/clawd/reports/$(date +%Y%m%d)/ 2>/dev/null
+mv /root/clawd/basket_report_*.md /root/clawd/reports/$(date +%Y%m%d)/ 2>/dev/null
+mv /root/clawd/basket_opportunities_*.json /root/clawd/reports/$(date +%Y%m%d)/ 2>/dev/null
+mv /root/clawd/ladder_report_*.md /root/clawd/reports/$(date +%Y%m%d)/ 2>/dev/null
+mv /root/clawd/ladder_violations_*.json /root/clawd/reports/$(date +%Y%m%d)/ 2>/dev/null
 
 echo "[$DATE] 扫描完成！" >> /root/clawd/automation/cron.log
 echo "---" >> /root/clawd/automation/cron.log
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Polymarket 组合套利检测器 (Basket Arbitrage)
+互斥结果的 YES 卖价之和 < 1 时，买入全部结果锁定收益；
+买价之和 > 1 时，拆分完整份额后全部卖出锁定收益。
+
+覆盖两类组合:
+1. 单市场多结果 (含二元市场 YES + NO)
+2. neg-risk 事件下各市场的 YES
+"""
+
+import json
+import asyncio
+import aiohttp
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from market_catalog import CatalogFetchError, MarketCatalog, OrderBook, walk_basket
+from signal_bus import SIGNAL_DB, Signal, SignalBus
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('basket_arbitrage.log'),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+
+class BasketArbitrageDetector:
+    """
+    组合套利检测器
+    基于市场目录的 event 索引分组，用真实订单簿计算可执行成本
+    """
+
+    def __init__(self, fee_rate: float = 0.0, min_return: float = 0.005, max_size: float = 5000):
+        self.fee_rate = fee_rate        # 按成交额计的手续费率
+        self.min_return = min_return    # 最低保证收益率
+        self.max_size = max_size        # 单个组合最多份数
+
+    def build_baskets(self, catalog: MarketCatalog) -> List[Dict]:
+        """枚举所有互斥结果组合"""
+        baskets = []
+
+        for market in catalog.markets.values():
+            if len(market.outcomes) >= 2 and len(market.token_ids) == len(market.outcomes):
+                baskets.append({
+                    'type': 'multi_outcome',
+                    'group_id': market.market_id,
+                    'title': market.question,
+                    'legs': [
+                        {'market_id': market.market_id, 'outcome': name, 'token_id': token}
+                        for name, token in zip(market.outcomes, market.token_ids)
+                    ]
+                })
+
+        for event_id, markets in catalog.by_event.items():
+            if len(markets) < 2:
+                continue
+            # augmented 事件可能存在未上架的结果，不构成完整组合
+            if not all(m.neg_risk for m in markets) or any(m.neg_risk_augmented for m in markets):
+                continue
+            if any(not m.yes_token() for m in markets):
+                continue
+
+            baskets.append({
+                'type': 'neg_risk',
+                'group_id': event_id,
+                'title': markets[0].event_title or markets[0].question,
+                'legs': [
+                    {'market_id': m.market_id, 'outcome': m.group_item_title or m.question, 'token_id': m.yes_token()}
+                    for m in markets
+                ]
+            })
+
+        return baskets
+
+    def evaluate(self, basket: Dict, books: Dict[str, OrderBook]) -> List[Dict]:
+        """计算组合的买入/卖出两侧可执行收益"""
+        leg_books = [books.get(leg['token_id']) for leg in basket['legs']]
+        if any(book is None for book in leg_books):
+            return []
+
+        results = []
+        fee = self.fee_rate
+
+        # 买入全部结果: 单价 × (1 + fee) < 1
+        size, cost = walk_basket(
+            [b.asks for b in leg_books],
+            lambda unit: unit * (1 + fee) < 1,
+            self.max_size
+        )
+        if size > 0:
+            fees = cost * fee
+            profit = size - cost - fees
+            results.append(self._result(basket, 'buy_all', leg_books, size, cost, fees, profit, cost + fees))
+
+        # 拆分后卖出全部结果: 单价 × (1 - fee) > 1
+        size, proceeds = walk_basket(
+            [b.bids for b in leg_books],
+            lambda unit: unit * (1 - fee) > 1,
+            self.max_size
+        )
+        if size > 0:
+            fees = proceeds * fee
+            profit = proceeds - fees - size
+            results.append(self._result(basket, 'sell_all', leg_books, size, proceeds, fees, profit, size))
+
+        return [r for r in results if r['net_return'] >= self.min_return]
+
+    def _result(self, basket: Dict, side: str, leg_books: List[OrderBook],
+                size: float, notional: float, fees: float, profit: float, capital: float) -> Dict:
+        if side == 'buy_all':
+            top = sum(b.best_ask for b in leg_books)
+        else:
+            top = sum(b.best_bid for b in leg_books)
+
+        return {
+            'type': basket['type'],
+            'group_id': basket['group_id'],
+            'title': basket['title'],
+            'side': side,
+            'leg_count': len(basket['legs']),
+            'legs': basket['legs'],
+            'top_of_book_sum': round(top, 4),
+            'executable_size': round(size, 2),
+            'notional': round(notional, 2),
+            'fees': round(fees, 4),
+            'guaranteed_profit': round(profit, 2),
+            'net_return': profit / capital if capital > 0 else 0.0,
+            'scan_time': datetime.now().isoformat()
+        }
+
+    async def scan(self, catalog: MarketCatalog, session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+        """一次扫描整个目录，按保证利润排序"""
+        baskets = self.build_baskets(catalog)
+        token_ids = [leg['token_id'] for basket in baskets for leg in basket['legs']]
+        logger.info(f"🧺 共 {len(baskets)} 个互斥组合, {len(set(token_ids))} 个 token")
+
+        books = await catalog.fetch_order_books(token_ids, session)
+
+        opportunities = []
+        for basket in baskets:
+            opportunities.extend(self.evaluate(basket, books))
+
+        # 保证利润同时反映收益率与深度
+        opportunities.sort(key=lambda o: (o['guaranteed_profit'], o['net_return']), reverse=True)
+        logger.info(f"✅ 发现 {len(opportunities)} 个组合套利机会")
+        return opportunities
+
+    def generate_markdown_report(self, opportunities: List[Dict], filename: str):
+        """生成 Markdown 报告"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(f"# 🧺 Polymarket 组合套利扫描报告\n\n")
+            f.write(f"**扫描时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"**发现机会**: {len(opportunities)} 个\n")
+            f.write(f"**手续费率**: {self.fee_rate:.2%}\n\n")
+            f.write(f"---\n\n")
+
+            if not opportunities:
+                f.write("❌ 未发现组合套利机会\n")
+                return
+
+            f.write(f"| 排名 | 组合 | 类型 | 方向 | 盘口和 | 份数 | 保证利润 | 收益率 |\n")
+            f.write(f"|------|------|------|------|--------|------|----------|--------|\n")
+            for i, opp in enumerate(opportunities[:20], 1):
+                f.write(f"| {i} | {opp['title'][:40]} | {opp['type']} | {opp['side']} | "
+                        f"{opp['top_of_book_sum']:.4f} | {opp['executable_size']:,.0f} | "
+                        f"${opp['guaranteed_profit']:,.2f} | {opp['net_return']:.2%} |\n")
+
+            f.write(f"\n## ⚠️ 风险提示\n\n")
+            f.write(f"- 各腿需同时成交，盘口可能在下单前变化\n")
+            f.write(f"- sell_all 需先拆分完整份额 (split) 再卖出\n")
+
+
+async def main():
+    """主函数"""
+    logger.info("🚀 Polymarket 组合套利检测器")
+
+    detector = BasketArbitrageDetector()
+    catalog = MarketCatalog()
+
+    async with aiohttp.ClientSession() as session:
+        try:
+            await catalog.sync(session)
+        except CatalogFetchError as e:
+            # 残缺目录上的扫描结果没有意义，本轮直接放弃
+            logger.error(f"❌ 市场目录拉取不完整，放弃本轮扫描: {e}")
+            return
+        opportunities = await detector.scan(catalog, session)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    json_file = f"basket_opportunities_{timestamp}.json"
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'scan_time': datetime.now().isoformat(),
+            'markets_scanned': len(catalog.markets),
+            'total_opportunities': len(opportunities),
+            'opportunities': opportunities
+        }, f, indent=2, ensure_ascii=False)
+
+    md_file = f"basket_report_{timestamp}.md"
+    detector.generate_markdown_report(opportunities, md_file)
+
+    # 无风险组合套利以高置信度发布到信号总线
+    bus = SignalBus(SIGNAL_DB)
+    for opp in opportunities:
+        bus.publish_nowait(Signal('scanner', opp['type'], 90, market_id=str(opp['group_id']), payload=opp))
+
+    logger.info(f"💾 结果已保存: {json_file}, {md_file}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
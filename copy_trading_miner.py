@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+排行榜钱包跟单信号挖掘
+1. 拉取排行榜前 N 个钱包，并发增量同步交易历史 (trade_history)
+2. 在已结算市场上计算每个钱包的技能指标:
+   - Brier 分数: 钱包在每个市场的资金分配隐含的 YES 概率 vs 结算结果，
+     与同一批成交价格隐含概率的 Brier 分数对比
+   - 择时优势: 每美元成交相对结算价值的收益 (买入为 结果-价格，卖出为 价格-结果)
+3. 高技能钱包新进场的市场按 (市场, 方向) 聚合，发布跟单信号到信号总线
+"""
+
+import os
+import time
+import json
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import aiohttp
+import numpy as np
+import pandas as pd
+
+from market_catalog import CatalogFetchError, MarketCatalog
+from seen_store import SeenStore
+from signal_bus import SIGNAL_DB, Signal, SignalBus
+from trade_history import DATA_API, TradeHistoryFetcher, TradeHistoryStore
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('copy_trading_miner.log'),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_PAGE = 50  # 排行榜接口单页上限
+TRADE_COLUMNS = ['wallet', 'ts', 'side', 'asset', 'condition_id', 'outcome_index',
+                 'size', 'usdc_size', 'price', 'tx_hash', 'title']
+
+
+def skill_metrics(trades: pd.DataFrame, resolutions: Dict[str, tuple],
+                  min_markets: int = 20, prior_markets: int = 20) -> pd.DataFrame:
+    """
+    按钱包计算技能指标 (仅二元且已结算的市场)
+    返回以 wallet 为索引的表: markets, volume, brier, market_brier, brier_skill, edge, skill
+    """
+    columns = ['markets', 'volume', 'brier', 'market_brier', 'brier_skill', 'edge', 'skill']
+    if trades.empty or not resolutions:
+        return pd.DataFrame(columns=columns)
+
+    yes_payout = pd.Series({cid: payouts[0] for cid, (_, payouts) in resolutions.items() if len(payouts) == 2})
+    df = trades[trades['condition_id'].isin(yes_payout.index) & trades['outcome_index'].isin([0, 1])].copy()
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    o_yes = df['condition_id'].map(yes_payout).to_numpy()
+    is_yes = (df['outcome_index'] == 0).to_numpy()
+    is_buy = (df['side'] == 'BUY').to_numpy()
+    price = df['price'].to_numpy()
+    size = df['size'].to_numpy()
+
+    # 择时优势: 成交相对结算价值的盈亏
+    payout = np.where(is_yes, o_yes, 1 - o_yes)
+    df['edge_usdc'] = np.where(is_buy, payout - price, price - payout) * size
+
+    # 买入 YES / 买入 NO 的资金，以及折算到 YES 的成交价
+    df['yes_usdc'] = np.where(is_buy & is_yes, df['usdc_size'], 0.0)
+    df['no_usdc'] = np.where(is_buy & ~is_yes, df['usdc_size'], 0.0)
+    df['buy_usdc'] = df['yes_usdc'] + df['no_usdc']
+    df['yes_price_usdc'] = np.where(is_yes, price, 1 - price) * df['buy_usdc']
+
+    per_market = df.groupby(['wallet', 'condition_id']).agg(
+        yes_usdc=('yes_usdc', 'sum'), no_usdc=('no_usdc', 'sum'), buy_usdc=('buy_usdc', 'sum'),
+        yes_price_usdc=('yes_price_usdc', 'sum'), edge_usdc=('edge_usdc', 'sum'), volume=('usdc_size', 'sum')
+    )
+    per_market = per_market[per_market['buy_usdc'] > 0]
+    o = per_market.index.get_level_values('condition_id').map(yes_payout).to_numpy()
+    implied = per_market['yes_usdc'] / per_market['buy_usdc']       # 钱包资金分配隐含的 YES 概率
+    entry = per_market['yes_price_usdc'] / per_market['buy_usdc']   # 成交价隐含的 YES 概率
+    per_market['brier'] = (implied - o) ** 2
+    per_market['market_brier'] = (entry - o) ** 2
+
+    wallets = per_market.groupby(level='wallet').agg(
+        markets=('brier', 'size'), volume=('volume', 'sum'), edge_usdc=('edge_usdc', 'sum'),
+        brier=('brier', 'mean'), market_brier=('market_brier', 'mean')
+    )
+    wallets['brier_skill'] = 1 - wallets['brier'] / wallets['market_brier'].where(wallets['market_brier'] > 0)
+    wallets['edge'] = wallets['edge_usdc'] / wallets['volume'].where(wallets['volume'] > 0)
+    # 样本少的钱包向 0 收缩
+    shrink = wallets['markets'] / (wallets['markets'] + prior_markets)
+    wallets['skill'] = (wallets['edge'] * shrink).where(wallets['markets'] >= min_markets)
+    return wallets[columns].fillna({'brier_skill': 0.0, 'edge': 0.0})
+
+
+class CopyTradingMiner:
+    """
+    排行榜跟单信号挖掘器
+    """
+
+    def __init__(self, top_n: int = 500, time_period: str = 'MONTH',
+                 min_markets: int = 20, min_skill: float = 0.02,
+                 min_entry_usdc: float = 1000, signal_window: float = 6 * 3600,
+                 store: Optional[TradeHistoryStore] = None, bus: Optional[SignalBus] = None):
+        self.top_n = top_n
+        self.time_period = time_period          # 排行榜周期: DAY / WEEK / MONTH / ALL
+        self.min_markets = min_markets          # 计算技能所需的最少已结算市场数
+        self.min_skill = min_skill              # 收缩后的每美元优势阈值
+        self.min_entry_usdc = min_entry_usdc    # 单个市场方向上的最小进场金额
+        self.signal_window = signal_window      # 只对该时间内的新成交发信号
+
+        self.store = store or TradeHistoryStore()
+        self.fetcher = TradeHistoryFetcher(self.store, max_age=0)
+        self.bus = bus or SignalBus(SIGNAL_DB)
+        self.seen = SeenStore('copy_trade')
+        self.catalog = MarketCatalog()
+
+        self.wallets: List[str] = []
+        self.names: Dict[str, str] = {}
+        self.skills = pd.DataFrame()
+
+    async def fetch_leaderboard(self, session: aiohttp.ClientSession) -> List[Dict]:
+        """按盈利排序的前 top_n 个钱包"""
+        async def fetch_page(offset: int) -> List[Dict]:
+            params = {'timePeriod': self.time_period, 'orderBy': 'PNL',
+                      'limit': LEADERBOARD_PAGE, 'offset': offset}
+            async with session.get(f"{DATA_API}/v1/leaderboard", params=params) as resp:
+                resp.raise_for_status()
+                data = await resp.json()
+                return data if isinstance(data, list) else []
+
+        pages = await asyncio.gather(*(fetch_page(o) for o in range(0, self.top_n, LEADERBOARD_PAGE)))
+        entries = [entry for page in pages for entry in page if entry.get('proxyWallet')]
+        return entries[:self.top_n]
+
+    async def refresh(self) -> Dict[str, int]:
+        """更新钱包列表并增量同步全部交易历史"""
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+            try:
+                entries = await self.fetch_leaderboard(session)
+                self.wallets = [e['proxyWallet'].lower() for e in entries]
+                self.names = {e['proxyWallet'].lower(): e.get('userName') or e.get('name') or '' for e in entries}
+            except Exception as e:
+                # 排行榜失败时沿用上一轮的钱包列表
+                logger.error(f"❌ 获取排行榜失败: {e}")
+            try:
+                await self.catalog.sync(session)
+            except CatalogFetchError as e:
+                # 目录不完整时沿用上一轮的目录
+                logger.error(f"❌ 刷新市场目录失败: {e}")
+
+        started = time.time()
+        added = await self.fetcher.sync_many(self.wallets)
+        logger.info(f"📥 同步 {len(added)}/{len(self.wallets)} 个钱包，新增 {sum(added.values())} 条记录 "
+                    f"({time.time() - started:.1f}s)")
+        return added
+
+    async def update_skills(self) -> pd.DataFrame:
+        """
+        补齐已结算市场的结果并更新技能表
+        只重算有新成交或成交市场有新结算的钱包，其余沿用缓存的指标
+        """
+        await self.fetcher.fetch_resolutions(self.store.traded_conditions(self.wallets))
+
+        fingerprints = {w: f"{fp}:{self.min_markets}" for w, fp in self.store.skill_fingerprints(self.wallets).items()}
+        cached = self.store.load_skills()
+        dirty = [w for w, fp in fingerprints.items() if cached.get(w, (None, None))[0] != fp]
+
+        if dirty:
+            trades = self.store.load_activity_many(dirty, columns=TRADE_COLUMNS)
+            fresh = skill_metrics(trades, self.store.load_resolutions(), min_markets=self.min_markets)
+            metrics = {w: {k: (None if pd.isna(v) else float(v)) for k, v in row.items()}
+                       for w, row in fresh.iterrows()}
+            self.store.save_skills({w: fingerprints[w] for w in dirty}, metrics)
+            cached = self.store.load_skills()
+
+        rows = {w: cached[w][1] for w in fingerprints if w in cached and cached[w][1] is not None}
+        self.skills = pd.DataFrame.from_dict(rows, orient='index', dtype=float)
+        skilled = self.skilled_wallets()
+        logger.info(f"🎯 重算 {len(dirty)}/{len(fingerprints)} 个钱包；{len(self.skills)} 个有已结算样本，"
+                    f"{len(skilled)} 个达到技能阈值")
+        return self.skills
+
+    def skilled_wallets(self) -> pd.DataFrame:
+        if self.skills.empty:
+            return self.skills
+        mask = (self.skills['skill'] >= self.min_skill) & (self.skills['brier_skill'] > 0)
+        return self.skills[mask].sort_values('skill', ascending=False)
+
+    def copy_signals(self, since: float) -> List[Dict]:
+        """高技能钱包在 since 之后买入的未结算市场，按 (市场, 结果) 聚合"""
+        skilled = self.skilled_wallets()
+        if skilled.empty:
+            return []
+
+        trades = self.store.load_activity_many(list(skilled.index), columns=TRADE_COLUMNS, since=int(since))
+        resolved = self.store.load_resolutions()
+        trades = trades[(trades['side'] == 'BUY') & ~trades['condition_id'].isin(resolved)]
+        if trades.empty:
+            return []
+
+        # 整个窗口内的成交一起聚合，未达金额阈值的成交留到后续成交累计后再判断
+        keys = trades['wallet'] + ':' + trades['tx_hash'] + ':' + trades['asset']
+        trades = trades.assign(key=keys, skill=trades['wallet'].map(skilled['skill']),
+                               price_usdc=trades['price'] * trades['usdc_size'])
+        grouped = trades.groupby(['condition_id', 'outcome_index']).agg(
+            usdc=('usdc_size', 'sum'), price_usdc=('price_usdc', 'sum'), wallets=('wallet', 'nunique'),
+            skill=('skill', 'mean'), title=('title', 'first'), last_ts=('ts', 'max'),
+            wallet_list=('wallet', lambda w: sorted(set(w))), keys=('key', list)
+        )
+        grouped = grouped[grouped['usdc'] >= self.min_entry_usdc]
+        
+        # 只发布含有未发过信号的成交的组，并只把发布了的组的成交记为已发
+        emitted = [index for index, group_keys in grouped['keys'].items()
+                   if any(key not in self.seen for key in group_keys)]
+        grouped = grouped.loc[emitted]
+        self.seen.add_many(key for group_keys in grouped['keys'] for key in group_keys)
+
+        signals = []
+        for (condition_id, outcome_index), row in grouped.iterrows():
+            record = self.catalog.by_condition.get(condition_id)
+            outcome = record.outcomes[outcome_index] if record and outcome_index < len(record.outcomes) else str(outcome_index)
+            signals.append({
+                'market_id': record.market_id if record else None,
+                'condition_id': condition_id,
+                'question': record.question if record else row['title'],
+                'outcome': outcome,
+                'direction': 'YES' if outcome_index == 0 else 'NO',
+                'usdc': round(row['usdc'], 2),
+                'avg_price': round(row['price_usdc'] / row['usdc'], 4),
+                'wallets': [{'wallet': w, 'name': self.names.get(w, ''),
+                             'skill': round(float(skilled.at[w, 'skill']), 4)} for w in row['wallet_list']],
+                'mean_skill': round(row['skill'], 4),
+                'last_trade': datetime.fromtimestamp(row['last_ts']).isoformat()
+            })
+
+        signals.sort(key=lambda s: s['usdc'], reverse=True)
+        return signals
+
+    def publish(self, signals: List[Dict]):
+        """进场钱包越多、技能越高，置信度越高"""
+        for signal in signals:
+            confidence = min(100, 40 + 15 * len(signal['wallets']) + 500 * signal['mean_skill'])
+            self.bus.publish_nowait(Signal(
+                source='onchain',
+                kind='copy_trade',
+                confidence=confidence,
+                market_id=signal['market_id'],
+                payload=signal
+            ))
+
+    async def run_once(self) -> List[Dict]:
+        await self.refresh()
+        await self.update_skills()
+
+        signals = self.copy_signals(since=time.time() - self.signal_window)
+        self.publish(signals)
+
+        for signal in signals[:10]:
+            names = ', '.join(w['name'] or w['wallet'][:10] for w in signal['wallets'])
+            logger.info(f"📣 {signal['question'][:60]} → {signal['outcome']} "
+                        f"${signal['usdc']:,.0f} @ {signal['avg_price']:.3f} ({names})")
+        return signals
+
+    def save_skills(self, path: str = "data/wallet_skills.json"):
+        skilled = self.skilled_wallets()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(),
+                'wallets_tracked': len(self.wallets),
+                'skilled': [
+                    dict({k: float(v) for k, v in row.items()}, wallet=wallet, name=self.names.get(wallet, ''))
+                    for wallet, row in skilled.iterrows()
+                ]
+            }, f, indent=2, ensure_ascii=False)
+
+    async def run(self, interval: float = 600):
+        logger.info(f"🚀 跟单信号挖掘启动: 排行榜前 {self.top_n} 个钱包，每 {interval:.0f} 秒刷新")
+        while True:
+            try:
+                signals = await self.run_once()
+                self.save_skills()
+                logger.info(f"✅ 本轮发布 {len(signals)} 个跟单信号")
+            except Exception as e:
+                logger.error(f"❌ 挖掘失败: {e}")
+            await asyncio.sleep(interval)
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='排行榜钱包跟单信号挖掘')
+    parser.add_argument('--top', '-n', type=int, default=500, help='排行榜钱包数量 (默认: 500)')
+    parser.add_argument('--period', '-p', default='MONTH', help='排行榜周期 DAY/WEEK/MONTH/ALL (默认: MONTH)')
+    parser.add_argument('--interval', '-i', type=int, default=600, help='刷新间隔（秒）(默认: 600)')
+    parser.add_argument('--once', action='store_true', help='只运行一轮')
+    args = parser.parse_args()
+
+    os.makedirs('data', exist_ok=True)
+
+    miner = CopyTradingMiner(top_n=args.top, time_period=args.period)
+    if args.once:
+        asyncio.run(miner.run_once())
+        miner.save_skills()
+    else:
+        asyncio.run(miner.run(interval=args.interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Polymarket CTF 交易所事件解码与资金流统计
+
+解码的事件:
+- CTF Exchange / NegRisk CTF Exchange:
+  OrderFilled(bytes32 indexed orderHash, address indexed maker, address indexed taker,
+              uint256 makerAssetId, uint256 takerAssetId,
+              uint256 makerAmountFilled, uint256 takerAmountFilled, uint256 fee)
+- ConditionalTokens:
+  PositionSplit / PositionsMerge(address indexed stakeholder, address collateralToken,
+              bytes32 indexed parentCollectionId, bytes32 indexed conditionId,
+              uint256[] partition, uint256 amount)
+- NegRiskAdapter:
+  PositionSplit / PositionsMerge(address indexed stakeholder, bytes32 indexed conditionId, uint256 amount)
+
+每条 OrderFilled 描述一张订单 (maker 视角) 的成交；assetId 为 0 的一侧是 USDC。
+撮合时 taker 订单的事件中 taker 为交易所合约本身，据此识别主动成交方向。
+data 字段按 (N × 字 × 32 字节) 批量解码，token id 通过目录索引映射到市场。
+"""
+
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from market_catalog import MarketCatalog
+from onchain_ingester import decode_words, to_bytes, topic_address, words_to_float, words_to_int_strings
+
+CONTRACTS = {
+    'ctf_exchange': '0x4bFb41d5B3570DeFd03C39a9A4D8dE6Bd8B8982E',
+    'neg_risk_ctf_exchange': '0xC5d563A36AE78145C45a50134d48A1215220f80a',
+    'neg_risk_adapter': '0xd91E80cF2E7be2e162c6513ceD06f1dD0dA35296',
+    'conditional_tokens': '0x4D97DCd97eC945f40cF65F87097ACe5EA0476045',
+}
+
+EVENT_SIGNATURES = {
+    'OrderFilled': "OrderFilled(bytes32,address,address,uint256,uint256,uint256,uint256,uint256)",
+    'PositionSplit': "PositionSplit(address,address,bytes32,bytes32,uint256[],uint256)",
+    'PositionsMerge': "PositionsMerge(address,address,bytes32,bytes32,uint256[],uint256)",
+    'NegRiskPositionSplit': "PositionSplit(address,bytes32,uint256)",
+    'NegRiskPositionsMerge': "PositionsMerge(address,bytes32,uint256)",
+}
+
+USDC_DECIMALS = 1e6  # USDC 与条件 token 都是 6 位小数
+
+
+def normalize_hex(value) -> str:
+    """HexBytes / bytes / 字符串 → 小写 0x 十六进制"""
+    return '0x' + to_bytes(value).hex()
+
+
+class CTFDecoder:
+    """
+    CTF 事件解码器
+    keccak: 事件签名 → topic 的哈希函数，通常传入 lambda s: w3.keccak(text=s)
+    """
+
+    def __init__(self, keccak: Callable[[str], bytes]):
+        self.topics = {name: normalize_hex(keccak(sig)) for name, sig in EVENT_SIGNATURES.items()}
+        self.exchanges = {
+            CONTRACTS['ctf_exchange'].lower(),
+            CONTRACTS['neg_risk_ctf_exchange'].lower(),
+        }
+
+    def topic_of(self, log: Dict) -> str:
+        return normalize_hex(log['topics'][0])
+
+    def decode_fills(self, logs: List[Dict]) -> List[Dict]:
+        """
+        批量解码 OrderFilled
+        side 为 maker 视角: makerAssetId 为 0 即 maker 付 USDC 买入 token
+        """
+        logs = [log for log in logs if self.topic_of(log) == self.topics['OrderFilled']]
+        if not logs:
+            return []
+
+        words = decode_words((log['data'] for log in logs), 5)
+        maker_asset, taker_asset = words[:, 0], words[:, 1]
+        maker_amount, taker_amount, fee = (words_to_float(words[:, i]) / USDC_DECIMALS for i in (2, 3, 4))
+
+        buy = ~maker_asset.any(axis=1)   # maker 付出的是 USDC
+        token_words = np.where(buy[:, None], taker_asset, maker_asset)
+        token_ids = words_to_int_strings(token_words)
+        size = np.where(buy, taker_amount, maker_amount)
+        usdc = np.where(buy, maker_amount, taker_amount)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price = np.where(size > 0, usdc / size, 0.0)
+
+        fills = []
+        for i, log in enumerate(logs):
+            taker = topic_address(log['topics'][3])
+            fills.append({
+                'block_number': log['blockNumber'],
+                'log_index': log['logIndex'],
+                'tx_hash': normalize_hex(log['transactionHash']),
+                'exchange': str(log['address']).lower(),
+                'maker': topic_address(log['topics'][2]),
+                'taker': taker,
+                'token_id': token_ids[i],
+                'side': 'BUY' if buy[i] else 'SELL',
+                'size': float(size[i]),
+                'usdc': float(usdc[i]),
+                'price': float(price[i]),
+                'fee': float(fee[i]),
+                # taker 为交易所合约时是撮合中的吃单方
+                'aggressor': taker in self.exchanges
+            })
+        return fills
+
+    def decode_position_events(self, logs: List[Dict]) -> List[Dict]:
+        """解码拆分/合并事件 (ConditionalTokens 与 NegRiskAdapter 两种格式)"""
+        kinds = {
+            self.topics['PositionSplit']: ('split', 3, 2),         # (类型, conditionId 所在 topic, amount 所在字)
+            self.topics['PositionsMerge']: ('merge', 3, 2),
+            self.topics['NegRiskPositionSplit']: ('split', 2, 0),
+            self.topics['NegRiskPositionsMerge']: ('merge', 2, 0),
+        }
+
+        events = []
+        for log in logs:
+            kind = kinds.get(self.topic_of(log))
+            if kind is None:
+                continue
+            name, condition_topic, amount_word = kind
+            amount = words_to_float(decode_words([log['data']], 1, amount_word)[:, 0])[0] / USDC_DECIMALS
+            events.append({
+                'block_number': log['blockNumber'],
+                'log_index': log['logIndex'],
+                'tx_hash': normalize_hex(log['transactionHash']),
+                'kind': name,
+                'stakeholder': topic_address(log['topics'][1]),
+                'condition_id': normalize_hex(log['topics'][condition_topic]),
+                'amount': float(amount)
+            })
+        return events
+
+
+class RollingFlow:
+    """
+    滑动窗口内按键累计的买入/卖出金额
+    事件按时间追加，过期的从队首弹出，均摊 O(1)
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self.events: deque = deque()
+        self.totals: Dict[str, List[float]] = {}  # key → [买入, 卖出, 笔数]
+
+    def add(self, ts: float, key: str, buy: float, sell: float):
+        self.events.append((ts, key, buy, sell))
+        total = self.totals.setdefault(key, [0.0, 0.0, 0])
+        total[0] += buy
+        total[1] += sell
+        total[2] += 1
+
+    def expire(self, now: float):
+        cutoff = now - self.window
+        while self.events and self.events[0][0] < cutoff:
+            _, key, buy, sell = self.events.popleft()
+            total = self.totals[key]
+            total[0] -= buy
+            total[1] -= sell
+            total[2] -= 1
+            if total[2] == 0:
+                del self.totals[key]
+
+    def top(self, k: int = 10, by: str = 'net') -> List[Tuple[str, float, float]]:
+        """按净流入绝对值 (net) 或成交额 (volume) 排序"""
+        if by == 'net':
+            key = lambda item: abs(item[1][0] - item[1][1])
+        else:
+            key = lambda item: item[1][0] + item[1][1]
+        ranked = sorted(self.totals.items(), key=key, reverse=True)[:k]
+        return [(k_, t[0], t[1]) for k_, t in ranked]
+
+
+class FlowTracker:
+    """
+    按市场与钱包统计滑动窗口资金流
+    市场净流入只统计主动成交 (aggressor)，以 YES 方向计: 买 YES / 卖 NO 为正
+    钱包流向统计该钱包所有订单
+    成交按 (tx_hash, log_index) 去重: 区块游标未提交时下一轮会重新拉取同一批日志，不能重复累计
+    """
+
+    def __init__(self, catalog: MarketCatalog, windows: Iterable[float] = (3600, 86400)):
+        self.catalog = catalog
+        self.market_flows = {w: RollingFlow(w) for w in windows}
+        self.wallet_flows = {w: RollingFlow(w) for w in windows}
+        self.unmapped = 0
+        self.duplicates = 0
+        self.horizon = max(self.market_flows)          # 已计入成交的键保留到最长窗口过期
+        self.seen: Dict[Tuple[str, int], float] = {}
+        self.seen_order: deque = deque()
+
+    def resolve(self, token_id: str) -> Optional[Tuple[str, int]]:
+        """token id → (market_id, 结果序号)"""
+        record = self.catalog.by_token.get(token_id)
+        if record is None:
+            return None
+        return record.market_id, record.token_ids.index(token_id)
+
+    def add_fills(self, fills: List[Dict], timestamps: Dict[int, int]):
+        for fill in fills:
+            ts = timestamps.get(fill['block_number'])
+            if ts is None:
+                continue
+            key = (fill['tx_hash'], fill['log_index'])
+            if key in self.seen:
+                self.duplicates += 1
+                continue
+            self.seen[key] = ts
+            self.seen_order.append((ts, key))
+
+            buy = fill['usdc'] if fill['side'] == 'BUY' else 0.0
+            sell = fill['usdc'] if fill['side'] == 'SELL' else 0.0
+            for flow in self.wallet_flows.values():
+                flow.add(ts, fill['maker'], buy, sell)
+
+            if not fill['aggressor']:
+                continue
+
+            resolved = self.resolve(fill['token_id'])
+            if resolved is None:
+                self.unmapped += 1
+                continue
+            market_id, outcome = resolved
+
+            # NO 的买入相当于 YES 的卖出
+            yes_buy, yes_sell = (buy, sell) if outcome == 0 else (sell, buy)
+            for flow in self.market_flows.values():
+                flow.add(ts, market_id, yes_buy, yes_sell)
+
+    def expire(self, now: float):
+        for flow in list(self.market_flows.values()) + list(self.wallet_flows.values()):
+            flow.expire(now)
+        cutoff = now - self.horizon
+        while self.seen_order and self.seen_order[0][0] < cutoff:
+            _, key = self.seen_order.popleft()
+            self.seen.pop(key, None)
+
+    def signals(self, window: float, min_flow: float = 25000, k: int = 20) -> List[Dict]:
+        """净流入超过阈值的市场"""
+        results = []
+        for market_id, buy, sell in self.market_flows[window].top(k):
+            net = buy - sell
+            if abs(net) < min_flow:
+                break
+            record = self.catalog.markets.get(market_id)
+            results.append({
+                'market_id': market_id,
+                'question': record.question if record else '',
+                'window': window,
+                'buy_usdc': round(buy, 2),
+                'sell_usdc': round(sell, 2),
+                'net_flow': round(net, 2),
+                'direction': 'YES' if net > 0 else 'NO'
+            })
+        return results
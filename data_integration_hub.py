@@ -9,12 +9,22 @@ Polymarket 外部数据源集成系统
 """
 
 import os
-import json
+import time
+import random
 import asyncio
-import aiohttp
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from feed_poller import FeedPoller
+from market_catalog import MarketCatalog
+from market_search import MarketSearchIndex
+from notifier import NotificationDispatcher
+from poll_divergence import PollDivergenceEngine
+from poll_ingester import PollIngester, PollStore
+from seen_store import SeenStore
+from signal_bus import SIGNAL_DB, Signal, SignalBus
+from sports_ingester import SportsIngester
 
 # 配置日志
 logging.basicConfig(
@@ -27,31 +37,79 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class SourceSchedule:
+    """单个数据源的调度参数与运行状态"""
+    name: str
+    interval: float
+    timeout: float
+    jitter: float = 0.1            # 间隔随机浮动比例
+    max_backoff: float = 3600.0
+    runs: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_duration: float = 0.0
+    last_success: float = 0.0
+    last_count: int = 0
+
+    def record_success(self, duration: float, count: int):
+        self.runs += 1
+        self.consecutive_failures = 0
+        self.last_duration = duration
+        self.last_success = time.time()
+        self.last_count = count
+
+    def record_failure(self, duration: float):
+        self.runs += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_duration = duration
+
+    def next_delay(self) -> float:
+        """下一轮开始前的间隔 (从本轮开始时刻算起)"""
+        delay = self.interval
+        if self.consecutive_failures:
+            delay = min(self.interval * 2 ** (self.consecutive_failures - 1), max(self.max_backoff, self.interval))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
 class DataIntegrationHub:
     """
     外部数据源集成中心
     """
     
-    def __init__(self):
-        self.data_cache = {}
-        self.cache_time = 300  # 5分钟缓存
+    def __init__(self, bus: Optional[SignalBus] = None):
+        self.bus = bus or SignalBus(SIGNAL_DB)
+        self.feed_poller = FeedPoller()
+        
+        # 跨轮次/重启去重: 同一条推文、伤病、新闻只处理一次 (民调由 poll_ingester 的表去重)
+        self.seen = {
+            name: SeenStore(f"hub:{name}")
+            for name in ('twitter', 'espn_events')
+        }
         
         # API 配置
         self.config = {
             'twitter': {
                 'enabled': True,
+                'interval': 60,
+                'timeout': 45,
                 'accounts': ['0xCristal', 'Polymarket', 'PolymarketWhale'],
                 'keywords': ['bought', 'sold', 'long', 'short', 'position', 'polymarket']
             },
             'fivethirtyeight': {
                 'enabled': True,
                 'url': 'https://projects.fivethirtyeight.com/polls/data/polls.json',
-                'check_interval': 3600  # 每小时检查
+                'interval': 3600,  # 每小时检查
+                'timeout': 300
             },
             'espn': {
                 'enabled': True,
                 'url': 'https://site.api.espn.com/apis/site/v2/sports',
-                'sports': ['basketball/nba', 'football/nfl']
+                'sports': ['basketball/nba', 'football/nfl'],
+                'interval': 180,
+                'timeout': 90
             },
             'discord': {
                 'enabled': False,  # 需要 webhook
@@ -63,63 +121,51 @@ class DataIntegrationHub:
                 'chat_id': os.getenv('TELEGRAM_CHAT_ID', '')
             }
         }
+        
+        self.notifier = NotificationDispatcher.from_config(self.config)
+        self.poll_ingester = PollIngester(
+            urls=[self.config['fivethirtyeight']['url']],
+            store=PollStore('data/polls_hub.db'),
+            # 调度器控制采集节奏，这里只防止抖动或手动调用导致过于频繁的请求
+            min_interval=self.config['fivethirtyeight']['interval'] / 2
+        )
+        # 已入库的民调先灌入引擎，重启后均值不从零开始
+        self.divergence_engine = PollDivergenceEngine()
+        self.divergence_engine.add_polls(self.poll_ingester.store.recent(limit=20000))
+        self.pending_races: set = set()   # 有新民调但尚未与市场对比的选举
+        self.catalog = MarketCatalog()
+        self.catalog_refresh = 1800
+        self.catalog_synced = 0.0
+        self.catalog_lock = asyncio.Lock()
+        self.search_index = MarketSearchIndex()
+        self.sports_ingester = SportsIngester(
+            sports=self.config['espn']['sports'],
+            base_url=self.config['espn']['url']
+        )
     
     # ==========================================
     # 1. Twitter 监控
     # ==========================================
     async def fetch_twitter_nitter(self, username: str) -> List[Dict]:
         """
-        使用 nitter 获取推文
+        使用 nitter 获取推文 (订阅未更新时返回空列表)
         """
-        nitter_instances = [
-            "https://nitter.net",
-            "https://nitter.it",
-            "https://nitter.cz",
-        ]
-        
-        tweets = []
-        
-        for instance in nitter_instances:
-            try:
-                url = f"{instance}/{username}/rss"
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, timeout=10) as response:
-                        if response.status == 200:
-                            import xml.etree.ElementTree as ET
-                            data = await response.text()
-                            root = ET.fromstring(data)
-                            
-                            for item in root.findall('.//item')[:10]:
-                                tweet = {
-                                    'username': username,
-                                    'title': item.find('title').text if item.find('title') is not None else '',
-                                    'link': item.find('link').text if item.find('link') is not None else '',
-                                    'pubDate': item.find('pubDate').text if item.find('pubDate') is not None else '',
-                                    'description': item.find('description').text if item.find('description') is not None else ''
-                                }
-                                tweets.append(tweet)
-                            
-                            if tweets:
-                                break
-                                
-            except Exception as e:
-                logger.error(f"Error fetching from {instance}: {e}")
-                continue
-        
-        return tweets
+        tweets = await self.feed_poller.poll([username])
+        return tweets.get(username, [])
     
     async def monitor_twitter_accounts(self) -> List[Dict]:
         """
-        监控多个 Twitter 账号
+        并发监控多个 Twitter 账号，只处理有更新的订阅
         """
         all_tweets = []
         
-        for account in self.config['twitter']['accounts']:
-            logger.info(f"🐦 监控 @{account}...")
-            tweets = await self.fetch_twitter_nitter(account)
-            
-            # 过滤包含关键词的推文
-            for tweet in tweets:
+        accounts = self.config['twitter']['accounts']
+        logger.info(f"🐦 监控 {len(accounts)} 个账号...")
+        updated = await self.feed_poller.poll(accounts)
+        
+        # 过滤包含关键词的推文
+        for tweets in updated.values():
+            for tweet in self.seen['twitter'].filter_new(tweets, key=lambda t: t.get('link') or t.get('title')):
                 text = (tweet.get('title', '') + ' ' + tweet.get('description', '')).lower()
                 
                 for keyword in self.config['twitter']['keywords']:
@@ -155,246 +201,191 @@ class DataIntegrationHub:
     async def fetch_538_polls(self) -> List[Dict]:
         """
         获取 538 民调数据
+        条件请求 + 流式解析，只返回新出现的相关民调 (间隔由 interval 控制)
         """
         try:
-            url = self.config['fivethirtyeight']['url']
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=30) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        # 过滤与 Polymarket 相关的民调
-                        relevant_polls = []
-                        
-                        for poll in data:
-                            # 只关注政治相关的民调
-                            if any(keyword in str(poll).lower() for keyword in 
-                                   ['trump', 'biden', 'election', '2024', 'president']):
-                                
-                                relevant_polls.append({
-                                    'poll_id': poll.get('poll_id'),
-                                    'pollster': poll.get('pollster'),
-                                    'sponsors': poll.get('sponsors'),
-                                    'state': poll.get('state'),
-                                    'question': poll.get('question'),
-                                    'subpopulation': poll.get('subpopulation'),
-                                    'methodology': poll.get('methodology'),
-                                    'population': poll.get('population'),
-                                    'cycle': poll.get('cycle'),
-                                    'results': poll.get('answers', [])
-                                })
-                        
-                        logger.info(f"📊 获取到 {len(relevant_polls)} 个相关民调")
-                        return relevant_polls
-                    
+            return await self.poll_ingester.poll()
         except Exception as e:
             logger.error(f"❌ 获取 538 数据失败: {e}")
         
         return []
     
+    async def refresh_catalog(self, max_age: float = 0.0) -> int:
+        """
+        同步市场目录，供民调偏差和体育事件匹配市场
+        目录已同步且未超过 max_age 秒时跳过；正在同步时等待其完成
+        (调度器按 catalog_refresh 定期刷新，采集任务用 max_age=inf 只确保目录已加载)
+        """
+        async with self.catalog_lock:
+            if not self.catalog_synced or time.time() - self.catalog_synced >= max_age:
+                await self.catalog.sync()
+                self.divergence_engine.sync_catalog(self.catalog)
+                self.sports_ingester.sync_catalog(self.catalog)
+                self.catalog_synced = time.time()
+                # 搜索索引只服务查询，同步被拒绝不影响民调与 ESPN 采集
+                try:
+                    self.search_index.sync_catalog(self.catalog)
+                except Exception as e:
+                    logger.warning(f"⚠️ 搜索索引同步失败，沿用现有索引: {e}")
+                logger.info(f"📚 市场目录已刷新: {len(self.catalog.markets)} 个市场")
+        return len(self.catalog.markets)
+    
     async def analyze_poll_market_divergence(self, polls: List[Dict]) -> List[Dict]:
         """
         分析民调与市场的偏差
+        新民调增量更新所属选举的加权均值，只对受影响的选举重新计算胜率并对比市场价格
+        民调已由 poll_ingester 入库 (不会再次返回)，先加入引擎再刷新目录；
+        目录刷新失败时受影响的选举留到下一轮重新计算
         """
-        divergences = []
+        self.pending_races |= self.divergence_engine.add_polls(polls)
+        if not self.pending_races:
+            return []
         
-        # 这里应该对比 Polymarket 价格
-        # 简化版：标记可能有偏差的数据
+        await self.refresh_catalog(max_age=float('inf'))
+        races, self.pending_races = self.pending_races, set()
+        divergences = self.divergence_engine.divergences(races)
         
-        for poll in polls[:5]:  # 只分析前5个
-            # 假设的逻辑
-            if poll.get('state') == 'National':
-                # 全国民调对比市场价格
-                divergence = {
-                    'poll': poll,
-                    'market_price': None,  # 需要从 Polymarket 获取
-                    'estimated_divergence': 'unknown',
-                    'confidence': 70
-                }
-                divergences.append(divergence)
+        for divergence in divergences:
+            # 偏差越大置信度越高
+            divergence['confidence'] = min(95, 50 + abs(divergence['edge']) * 200)
         
         return divergences
     
     # ==========================================
     # 3. ESPN 体育数据
     # ==========================================
-    async def fetch_espn_injuries(self, sport: str = 'basketball/nba') -> List[Dict]:
+    async def fetch_espn_events(self) -> List[Dict]:
         """
-        获取 ESPN 伤病报告
+        并发获取所有联赛的伤病与新闻事件，并关联到对应球队的未关闭市场
         """
+        await self.refresh_catalog(max_age=float('inf'))
         try:
-            url = f"{self.config['espn']['url']}/{sport}/injuries"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=30) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        injuries = data.get('injuries', [])
-                        
-                        logger.info(f"🏀 获取到 {len(injuries)} 条伤病信息")
-                        return injuries
-                    
+            events = await self.sports_ingester.poll()
         except Exception as e:
             logger.error(f"❌ 获取 ESPN 数据失败: {e}")
+            return []
         
-        return []
-    
-    async def fetch_espn_news(self, sport: str = 'basketball/nba') -> List[Dict]:
-        """
-        获取 ESPN 新闻
-        """
-        try:
-            url = f"{self.config['espn']['url']}/{sport}/news"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=30) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        articles = data.get('articles', [])
-                        
-                        # 过滤重要新闻
-                        important_news = []
-                        for article in articles[:10]:
-                            title = article.get('headline', '').lower()
-                            
-                            # 关键信息：伤病、交易、阵容
-                            if any(keyword in title for keyword in 
-                                   ['injury', 'out', 'trade', 'suspension', 'starting']):
-                                important_news.append(article)
-                        
-                        logger.info(f"📰 获取到 {len(important_news)} 条重要新闻")
-                        return important_news
-                    
-        except Exception as e:
-            logger.error(f"❌ 获取 ESPN 新闻失败: {e}")
-        
-        return []
+        injuries = sum(1 for e in events if e['kind'] == 'injury')
+        linked = sum(1 for e in events if e['market_ids'])
+        logger.info(f"🏀 ESPN: {injuries} 伤病, {len(events) - injuries} 新闻, {linked} 条关联到市场")
+        return events
     
     # ==========================================
     # 4. 通知系统
     # ==========================================
-    async def send_discord_notification(self, message: Dict):
+    def notify(self, message: Dict):
         """
-        发送 Discord 通知
+        发送通知 (Discord / Telegram)
+        只放入后台队列，突发消息会被合并为汇总，不阻塞数据采集
         """
-        if not self.config['discord']['enabled']:
-            return
+        self.notifier.notify(message)
+    
+    # ==========================================
+    # 各数据源的一轮采集
+    # ==========================================
+    async def collect_twitter(self) -> int:
+        tweets = await self.monitor_twitter_accounts()
+        logger.info(f"🐦 Twitter: 发现 {len(tweets)} 条相关推文")
         
-        try:
-            webhook_url = self.config['discord']['webhook_url']
+        for tweet in tweets:
+            await self.bus.publish(Signal('twitter', 'tweet', tweet.get('confidence', 0), payload=tweet))
             
-            payload = {
-                "content": f"🚨 **交易信号 detected!**",
-                "embeds": [{
-                    "title": message.get('title', 'New Signal'),
-                    "description": message.get('description', ''),
-                    "color": 3447003,
-                    "fields": [
-                        {"name": "Source", "value": message.get('source', 'Unknown'), "inline": True},
-                        {"name": "Confidence", "value": f"{message.get('confidence', 0)}/100", "inline": True},
-                        {"name": "Time", "value": datetime.now().strftime('%Y-%m-%d %H:%M:%S'), "inline": False}
-                    ]
-                }]
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(webhook_url, json=payload) as response:
-                    if response.status == 204:
-                        logger.info("✅ Discord 通知已发送")
-                    else:
-                        logger.error(f"❌ Discord 通知失败: {response.status}")
-                        
-        except Exception as e:
-            logger.error(f"❌ 发送 Discord 通知失败: {e}")
+            if tweet.get('confidence', 0) > 70:
+                self.notify({
+                    'title': f"Twitter Signal from @{tweet['username']}",
+                    'description': tweet.get('title', ''),
+                    'source': 'Twitter',
+                    'confidence': tweet.get('confidence', 0)
+                })
+        return len(tweets)
     
-    async def send_telegram_notification(self, message: Dict):
-        """
-        发送 Telegram 通知
-        """
-        if not self.config['telegram']['enabled']:
-            return
+    async def collect_polls(self) -> int:
+        polls = await self.fetch_538_polls()
+        divergences = await self.analyze_poll_market_divergence(polls)
+        logger.info(f"📊 538: 发现 {len(divergences)} 个民调偏差")
         
-        try:
-            bot_token = self.config['telegram']['bot_token']
-            chat_id = self.config['telegram']['chat_id']
-            
-            text = f"""
-🚨 <b>交易信号 detected!</b>
-
-<b>{message.get('title', 'New Signal')}</b>
-
-{message.get('description', '')}
-
-Source: {message.get('source', 'Unknown')}
-Confidence: {message.get('confidence', 0)}/100
-Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-            """
-            
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            payload = {
-                "chat_id": chat_id,
-                "text": text,
-                "parse_mode": "HTML"
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    if response.status == 200:
-                        logger.info("✅ Telegram 通知已发送")
-                    else:
-                        logger.error(f"❌ Telegram 通知失败: {response.status}")
-                        
-        except Exception as e:
-            logger.error(f"❌ 发送 Telegram 通知失败: {e}")
+        for divergence in divergences:
+            await self.bus.publish(Signal('fivethirtyeight', 'poll_divergence',
+                                          divergence['confidence'], market_id=divergence['market_id'],
+                                          payload=divergence))
+        return len(divergences)
+    
+    async def collect_espn(self) -> int:
+        events = await self.fetch_espn_events()
+        
+        published = 0
+        for event in self.seen['espn_events'].filter_new(events, key=lambda e: e['id']):
+            # 伤病按状态严重程度给置信度，一个事件对每个关联市场各发一条
+            base = 40 + 40 * event['severity'] if event['kind'] == 'injury' else 50
+            for market_id in event['market_ids'] or [None]:
+                await self.bus.publish(Signal('espn', event['kind'], base,
+                                              market_id=market_id, payload=event))
+            published += 1
+        return published
     
     # ==========================================
     # 主运行循环
     # ==========================================
+    async def _run_source(self, schedule: SourceSchedule, job: Callable[[], Awaitable[int]]):
+        """
+        单个数据源的调度循环
+        每轮有超时上限，异常只影响本数据源；连续失败时按间隔指数退避
+        """
+        # 错开各数据源的首次运行，避免同时发起请求
+        await asyncio.sleep(random.uniform(0, schedule.jitter * schedule.interval))
+        
+        while True:
+            started = time.time()
+            try:
+                count = await asyncio.wait_for(job(), schedule.timeout)
+                schedule.record_success(time.time() - started, count)
+            except asyncio.TimeoutError:
+                schedule.record_failure(time.time() - started)
+                logger.error(f"❌ {schedule.name} 超过 {schedule.timeout}s 未完成，本轮已取消")
+            except Exception as e:
+                schedule.record_failure(time.time() - started)
+                logger.error(f"❌ {schedule.name} 运行错误: {e}")
+            
+            delay = schedule.next_delay()
+            logger.debug(f"⏱️ {schedule.name} {delay:.0f}s 后再次采集")
+            await asyncio.sleep(max(0.0, delay - (time.time() - started)))
+    
+    def schedules(self) -> List[Tuple[SourceSchedule, Callable[[], Awaitable[int]]]]:
+        """启用的数据源及其调度参数"""
+        jobs = {
+            'twitter': self.collect_twitter,
+            'fivethirtyeight': self.collect_polls,
+            'espn': self.collect_espn,
+        }
+        scheduled = [
+            (SourceSchedule(name, self.config[name]['interval'], self.config[name]['timeout']), job)
+            for name, job in jobs.items() if self.config[name]['enabled']
+        ]
+        # 市场目录单独刷新，不占用民调/体育任务的超时
+        if self.config['fivethirtyeight']['enabled'] or self.config['espn']['enabled']:
+            scheduled.append((SourceSchedule('catalog', self.catalog_refresh, 600),
+                              lambda: self.refresh_catalog(max_age=self.catalog_refresh / 2)))
+        return scheduled
+    
     async def run(self):
         """
         主运行循环
+        每个数据源是独立任务，按各自间隔运行，慢或挂起的数据源不会拖住其他数据源
         """
         logger.info("🚀 启动外部数据源集成系统")
+        self.notifier.start()
         logger.info("=" * 60)
         
-        while True:
-            try:
-                logger.info(f"\n📊 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - 开始数据采集...")
-                
-                # 1. Twitter 监控
-                if self.config['twitter']['enabled']:
-                    tweets = await self.monitor_twitter_accounts()
-                    logger.info(f"🐦 Twitter: 发现 {len(tweets)} 条相关推文")
-                    
-                    for tweet in tweets:
-                        if tweet.get('confidence', 0) > 70:
-                            await self.send_discord_notification({
-                                'title': f"Twitter Signal from @{tweet['username']}",
-                                'description': tweet.get('title', ''),
-                                'source': 'Twitter',
-                                'confidence': tweet.get('confidence', 0)
-                            })
-                
-                # 2. 538 民调
-                if self.config['fivethirtyeight']['enabled']:
-                    polls = await self.fetch_538_polls()
-                    divergences = await self.analyze_poll_market_divergence(polls)
-                    logger.info(f"📊 538: 发现 {len(divergences)} 个民调偏差")
-                
-                # 3. ESPN 体育
-                if self.config['espn']['enabled']:
-                    for sport in self.config['espn']['sports']:
-                        injuries = await self.fetch_espn_injuries(sport)
-                        news = await self.fetch_espn_news(sport)
-                        logger.info(f"🏀 ESPN ({sport}): {len(injuries)} 伤病, {len(news)} 新闻")
-                
-                logger.info(f"✅ 数据采集完成，等待 5 分钟...")
-                await asyncio.sleep(300)  # 5分钟
-                
-            except Exception as e:
-                logger.error(f"❌ 运行错误: {e}")
-                await asyncio.sleep(60)
+        scheduled = self.schedules()
+        for schedule, _ in scheduled:
+            logger.info(f"⏱️ {schedule.name}: 每 {schedule.interval:.0f}s 采集一次 (超时 {schedule.timeout:.0f}s)")
+        
+        try:
+            await asyncio.gather(*(self._run_source(schedule, job) for schedule, job in scheduled))
+        finally:
+            await self.notifier.stop(drain=False)
+            await self.sports_ingester.close()
+            await self.sports_ingester.cache.aclose()
 
 async def main():
     """主函数"""
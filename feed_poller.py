@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Nitter RSS 并发轮询
+- 所有账号共用一个连接池会话并发抓取，总并发与单镜像并发都有上限
+- 按 (账号, 镜像) 保存 ETag / Last-Modified，未更新的订阅返回 304 直接跳过
+- 记录各镜像健康度: 连续失败后指数退避冷却，优先使用延迟低、成功率高的镜像
+"""
+
+import time
+import asyncio
+import logging
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# nitter 实例列表 (部分可能不可用)
+NITTER_INSTANCES = [
+    "https://nitter.net",
+    "https://nitter.it",
+    "https://nitter.cz",
+]
+
+
+@dataclass
+class InstanceHealth:
+    """镜像健康度"""
+    url: str
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    latency: float = 1.0          # 指数平滑的响应时间 (秒)
+    cooldown_until: float = 0.0
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def record_success(self, latency: float):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.latency = 0.8 * self.latency + 0.2 * latency
+
+    def record_failure(self, now: float, base_cooldown: float, max_cooldown: float):
+        self.failures += 1
+        if now < self.cooldown_until:
+            # 冷却前已发出的并发请求失败，不再叠加退避
+            return
+        self.consecutive_failures += 1
+        cooldown = min(base_cooldown * 2 ** (self.consecutive_failures - 1), max_cooldown)
+        self.cooldown_until = now + cooldown
+
+    @property
+    def score(self) -> float:
+        """越小越优先"""
+        total = self.successes + self.failures
+        failure_rate = self.failures / total if total else 0.0
+        return self.latency * (1 + 4 * failure_rate)
+
+
+def parse_rss(data: bytes, username: str, count: int = 20) -> List[Dict]:
+    """解析 nitter RSS 为推文列表"""
+    root = ET.fromstring(data)
+
+    tweets = []
+    for item in root.findall('.//item')[:count]:
+        tweets.append({
+            'username': username,
+            'title': item.findtext('title') or '',
+            'link': item.findtext('link') or '',
+            'pubDate': item.findtext('pubDate') or '',
+            'description': item.findtext('description') or ''
+        })
+    return tweets
+
+
+class FeedPoller:
+    """
+    多账号 RSS 轮询器
+    """
+
+    def __init__(self, instances: Optional[List[str]] = None, concurrency: int = 50,
+                 per_instance: int = 10, timeout: float = 10, count: int = 20,
+                 base_cooldown: float = 60, max_cooldown: float = 3600):
+        self.instances = instances or NITTER_INSTANCES
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.count = count
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+
+        self.health = {url: InstanceHealth(url) for url in self.instances}
+        self.validators: Dict[Tuple[str, str], Dict[str, str]] = {}  # (账号, 镜像) → 条件请求头
+        self.preferred: Dict[str, str] = {}                           # 账号 → 上次成功的镜像
+
+        self._per_instance = per_instance
+        self._instance_limits: Dict[str, asyncio.Semaphore] = {}
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    def ranked_instances(self, username: str) -> List[str]:
+        """按健康度排列可用镜像，上次成功的镜像优先"""
+        now = time.time()
+        available = [h for h in self.health.values() if h.available(now)]
+        if not available:
+            # 全部冷却中时仍尝试最早恢复的一个
+            available = [min(self.health.values(), key=lambda h: h.cooldown_until)]
+
+        ranked = [h.url for h in sorted(available, key=lambda h: h.score)]
+        preferred = self.preferred.get(username)
+        if preferred in ranked:
+            ranked.remove(preferred)
+            ranked.insert(0, preferred)
+        return ranked
+
+    async def fetch_account(self, session: aiohttp.ClientSession, username: str) -> Optional[List[Dict]]:
+        """
+        抓取单个账号
+        返回推文列表；订阅未更新 (304) 返回 None；所有镜像失败返回 []
+        """
+        for instance in self.ranked_instances(username):
+            limit = self._instance_limits.setdefault(instance, asyncio.Semaphore(self._per_instance))
+            headers = self.validators.get((username, instance), {})
+            health = self.health[instance]
+
+            async with limit:
+                started = time.monotonic()
+                try:
+                    async with session.get(f"{instance}/{username}/rss", headers=headers) as response:
+                        if response.status == 304:
+                            health.record_success(time.monotonic() - started)
+                            self.preferred[username] = instance
+                            return None
+
+                        if response.status != 200:
+                            raise aiohttp.ClientResponseError(
+                                response.request_info, (), status=response.status
+                            )
+
+                        data = await response.read()
+                        tweets = parse_rss(data, username, self.count)
+                except (aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError) as e:
+                    health.record_failure(time.time(), self.base_cooldown, self.max_cooldown)
+                    logger.debug(f"Error fetching @{username} from {instance}: {e}")
+                    continue
+
+            health.record_success(time.monotonic() - started)
+            self.preferred[username] = instance
+
+            validators = {}
+            if response.headers.get('ETag'):
+                validators['If-None-Match'] = response.headers['ETag']
+            if response.headers.get('Last-Modified'):
+                validators['If-Modified-Since'] = response.headers['Last-Modified']
+            self.validators[(username, instance)] = validators
+
+            return tweets
+
+        return []
+
+    async def poll(self, accounts: Iterable[str],
+                   session: Optional[aiohttp.ClientSession] = None) -> Dict[str, List[Dict]]:
+        """
+        并发抓取所有账号，只返回有更新的账号
+        未传入 session 时使用轮询器自己的长连接会话
+        """
+        if session is None:
+            if self.session is None or self.session.closed:
+                self.session = self._new_session()
+            session = self.session
+
+        accounts = list(accounts)
+        results = await asyncio.gather(*(self.fetch_account(session, a) for a in accounts))
+
+        updated = {a: tweets for a, tweets in zip(accounts, results) if tweets}
+        unchanged = sum(1 for r in results if r is None)
+        logger.info(f"🐦 轮询 {len(accounts)} 个账号: {len(updated)} 个更新, {unchanged} 个未变化")
+        return updated
+
+    def poll_sync(self, accounts: Iterable[str]) -> Dict[str, List[Dict]]:
+        """供同步代码调用，每次使用临时会话"""
+        async def _run():
+            async with self._new_session() as session:
+                self._instance_limits.clear()
+                return await self.poll(accounts, session)
+        return asyncio.run(_run())
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
@@ -1,102 +1,70 @@
 #!/usr/bin/env python3
 """
 FiveThirtyEight 民调数据集成
-修复数据获取问题
+通过 poll_ingester 条件请求、流式解析并增量入库
 """
 
-import aiohttp
+import time
 import asyncio
 from datetime import datetime
 from typing import List, Dict
 
+from market_catalog import MarketCatalog
+from poll_divergence import PollDivergenceEngine
+from poll_ingester import POLL_URLS, PollFilter, PollIngester, PollStore
+
 class FiveThirtyEightMonitor:
     """538 民调数据监控器"""
     
-    def __init__(self):
+    def __init__(self, check_interval: int = 3600):
         # 正确的 API 端点
-        self.urls = [
-            "https://projects.fivethirtyeight.com/polls-page/data/polls.json",
-            "https://projects.fivethirtyeight.com/2024-election-forecast/data/polls.json"
-        ]
-        self.cache = {}
-        self.cache_time = 3600  # 1小时缓存
-        
-    async def fetch_polls(self) -> List[Dict]:
-        """获取民调数据"""
-        
-        for url in self.urls:
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, timeout=30) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            
-                            # 过滤相关民调
-                            relevant = self._filter_polls(data)
-                            print(f"📊 从 538 获取到 {len(relevant)} 个相关民调")
-                            return relevant
-                            
-            except Exception as e:
-                print(f"❌ 从 {url} 获取失败: {e}")
-                continue
-        
-        return []
-    
-    def _filter_polls(self, data) -> List[Dict]:
-        """过滤相关民调"""
-        relevant = []
+        self.urls = POLL_URLS[1:]
+        self.check_interval = check_interval  # 1小时检查一次
         
-        polls = data if isinstance(data, list) else data.get('polls', [])
+        # 条件请求 + 流式解析，只保留总统选举相关民调，按 poll_id 去重入库
+        self.ingester = PollIngester(
+            urls=self.urls,
+            store=PollStore('data/polls_fivethirtyeight.db'),
+            poll_filter=PollFilter(office_keywords=('president',), candidates=()),
+            min_interval=check_interval
+        )
         
-        for poll in polls:
-            # 检查是否是政治相关
-            state = poll.get('state', '')
-            race_id = str(poll.get('race_id', ''))
-            
-            # 只关注总统选举相关
-            if any(keyword in race_id.lower() for keyword in ['president', '2024']):
-                relevant.append({
-                    'poll_id': poll.get('poll_id'),
-                    'pollster': poll.get('pollster'),
-                    'state': state,
-                    'date': poll.get('end_date'),
-                    'sample_size': poll.get('sample_size'),
-                    'population': poll.get('population'),
-                    'answers': poll.get('answers', []),
-                    'url': poll.get('url')
-                })
+        # 民调均值 vs 市场价格
+        self.engine = PollDivergenceEngine()
+        self.engine.add_polls(self.ingester.store.recent(limit=20000))
+        self.catalog = MarketCatalog()
+        self.catalog_synced = 0.0
+        self.pending_races = set()   # 有新民调但尚未成功对比市场的选举
         
-        return relevant
+    async def fetch_polls(self) -> List[Dict]:
+        """获取新出现的民调数据"""
+        polls = await self.ingester.poll()
+        print(f"📊 从 538 获取到 {len(polls)} 个新的相关民调")
+        return polls
     
     async def analyze_divergence(self, polls: List[Dict]) -> List[Dict]:
-        """分析民调与市场价格的偏差"""
-        divergences = []
-        
-        # 这里应该对比 Polymarket 价格
-        # 简化版示例
+        """
+        分析民调与市场价格的偏差 (只重新计算有新民调的选举)
+        民调已入库不会再次返回，先加入引擎；目录刷新失败时受影响的选举留到下一轮
+        """
+        self.pending_races |= self.engine.add_polls(polls)
+        if not self.pending_races:
+            return []
         
-        for poll in polls[:10]:  # 只分析前10个
-            answers = poll.get('answers', [])
-            
-            if len(answers) >= 2:
-                # 假设第一个和第二个是主要候选人
-                candidate_1 = answers[0]
-                candidate_2 = answers[1]
-                
-                # 计算民调差距
-                poll_diff = abs(candidate_1.get('pct', 0) - candidate_2.get('pct', 0))
-                
-                divergence = {
-                    'poll': poll,
-                    'poll_leader': candidate_1.get('choice'),
-                    'poll_margin': poll_diff,
-                    'market_price': None,  # 需要从 Polymarket 获取
-                    'estimated_edge': 'unknown',
-                    'timestamp': datetime.now().isoformat()
-                }
-                
-                divergences.append(divergence)
+        if time.time() - self.catalog_synced > self.check_interval:
+            try:
+                await self.catalog.sync()
+                self.engine.sync_catalog(self.catalog)
+                self.catalog_synced = time.time()
+            except Exception as e:
+                print(f"❌ 刷新市场目录失败，{len(self.pending_races)} 个选举留待下一轮: {e}")
+                return []
         
+        races, self.pending_races = self.pending_races, set()
+        divergences = self.engine.divergences(races)
+        for divergence in divergences[:10]:
+            print(f"🎯 {divergence['candidate']}: 民调胜率 {divergence['poll_probability']:.1%} "
+                  f"vs 市场 {divergence['market_price']:.1%} ({divergence['question'][:50]})")
         return divergences
     
     async def run(self):
@@ -107,7 +75,7 @@ class FiveThirtyEightMonitor:
             try:
                 polls = await self.fetch_polls()
                 
-                if polls:
+                if polls or self.pending_races:
                     divergences = await self.analyze_divergence(polls)
                     
                     # 保存结果
@@ -116,11 +84,12 @@ class FiveThirtyEightMonitor:
                         json.dump({
                             'timestamp': datetime.now().isoformat(),
                             'poll_count': len(polls),
+                            'total_stored': self.ingester.store.count(),
                             'divergences': divergences
                         }, f, indent=2)
                 
-                print(f"⏰ 等待 1 小时后再次检查...")
-                await asyncio.sleep(3600)
+                print(f"⏰ 等待 {self.check_interval // 60} 分钟后再次检查...")
+                await asyncio.sleep(self.check_interval)
                 
             except Exception as e:
                 print(f"❌ 运行错误: {e}")
@@ -0,0 +1,46 @@
+-- Hummingbot 2.x 交易数据库 (hummingbot/model/order.py, trade_fill.py 由 SQLAlchemy 生成的表结构)
+-- price / amount / trade_fee_in_quote 为 SqliteDecimal(6)，存为 BIGINT (数值 × 10^6)
+CREATE TABLE "Order" (
+	id TEXT NOT NULL,
+	config_file_path TEXT NOT NULL,
+	strategy TEXT NOT NULL,
+	market TEXT NOT NULL,
+	symbol TEXT NOT NULL,
+	base_asset TEXT NOT NULL,
+	quote_asset TEXT NOT NULL,
+	creation_timestamp BIGINT NOT NULL,
+	order_type TEXT NOT NULL,
+	amount BIGINT NOT NULL,
+	leverage INTEGER NOT NULL,
+	price BIGINT NOT NULL,
+	last_status TEXT NOT NULL,
+	last_update_timestamp BIGINT NOT NULL,
+	exchange_order_id TEXT,
+	position TEXT,
+	PRIMARY KEY (id)
+);
+CREATE TABLE "TradeFill" (
+	config_file_path TEXT NOT NULL,
+	strategy TEXT NOT NULL,
+	market TEXT NOT NULL,
+	symbol TEXT NOT NULL,
+	base_asset TEXT NOT NULL,
+	quote_asset TEXT NOT NULL,
+	timestamp BIGINT NOT NULL,
+	order_id TEXT NOT NULL,
+	trade_type TEXT NOT NULL,
+	order_type TEXT NOT NULL,
+	price BIGINT NOT NULL,
+	amount BIGINT NOT NULL,
+	leverage INTEGER NOT NULL,
+	trade_fee JSON NOT NULL,
+	trade_fee_in_quote BIGINT,
+	exchange_trade_id TEXT NOT NULL,
+	position TEXT,
+	PRIMARY KEY (market, order_id, trade_type, exchange_trade_id),
+	FOREIGN KEY(order_id) REFERENCES "Order" (id)
+);
+INSERT INTO "Order" VALUES ('buy-TRUMP-2024-1707206400000001', 'conf_pure_mm_1.yml', 'pure_market_making', 'polymarket', 'TRUMP-2024', 'TRUMP', '2024', 1707206400000, 'LIMIT', 10000000, 1, 530000, 'OrderFilled', 1707206412000, '0x5f1c', 'NIL');
+INSERT INTO "Order" VALUES ('sell-TRUMP-2024-1707206400000002', 'conf_pure_mm_1.yml', 'pure_market_making', 'polymarket', 'TRUMP-2024', 'TRUMP', '2024', 1707206400000, 'LIMIT', 10000000, 1, 550000, 'OrderFilled', 1707206470000, '0x5f1d', 'NIL');
+INSERT INTO "TradeFill" VALUES ('conf_pure_mm_1.yml', 'pure_market_making', 'polymarket', 'TRUMP-2024', 'TRUMP', '2024', 1707206412000, 'buy-TRUMP-2024-1707206400000001', 'BUY', 'LIMIT', 530000, 10000000, 1, '{"percent": "0", "percent_token": null, "flat_fees": []}', 10600, '0xa1', 'NIL');
+INSERT INTO "TradeFill" VALUES ('conf_pure_mm_1.yml', 'pure_market_making', 'polymarket', 'TRUMP-2024', 'TRUMP', '2024', 1707206470000, 'sell-TRUMP-2024-1707206400000002', 'SELL', 'LIMIT', 550000, 4000000, 1, '{"percent": "0", "percent_token": null, "flat_fees": []}', 4400, '0xa2', 'NIL');
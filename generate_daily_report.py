@@ -9,6 +9,8 @@ import json
 import glob
 from datetime import datetime, timedelta
 
+from opportunity_store import OPPORTUNITY_DB, OpportunityStore
+
 class DailyReportGenerator:
     """
     每日报告生成器
@@ -17,6 +19,7 @@ class DailyReportGenerator:
     def __init__(self):
         self.report_dir = "/root/clawd/reports"
         self.today = datetime.now().strftime("%Y%m%d")
+        self.store = OpportunityStore(OPPORTUNITY_DB)
         
     def load_reports(self, date_str: str = None):
         """
@@ -61,6 +64,11 @@ class DailyReportGenerator:
             except:
                 pass
         
+        # 去重后的机会：每小时扫描重复出现的机会只计一次
+        day_start = datetime.strptime(self.today, "%Y%m%d").isoformat()
+        new_opportunities = self.store.count_events("new", day_start)
+        disappeared_opportunities = self.store.count_events("disappeared", day_start)
+        
         for mon_file in monitor_files:
             try:
                 with open(mon_file, 'r') as f:
@@ -86,14 +94,16 @@ class DailyReportGenerator:
             f.write(f"|------|------|\n")
             f.write(f"| 扫描次数 | {len(arbitrage_files)} 次 |\n")
             f.write(f"| 发现机会 | {total_opportunities} 个 |\n")
+            f.write(f"| 新增机会 (去重) | {new_opportunities} 个 |\n")
+            f.write(f"| 消失机会 | {disappeared_opportunities} 个 |\n")
             f.write(f"| 监控市场 | {len(all_markets)} 个 |\n")
             f.write(f"| 扫描时间 | 24 小时 |\n\n")
             
             # 策略建议
             f.write(f"## 🎯 策略建议\n\n")
             
-            if total_opportunities > 0:
-                f.write(f"✅ **今日发现 {total_opportunities} 个套利机会**\n")
+            if new_opportunities > 0:
+                f.write(f"✅ **今日新增 {new_opportunities} 个套利机会**\n")
                 f.write(f"   建议: 查看详细报告，评估风险后小资金测试\n\n")
             else:
                 f.write(f"⚠️ **今日未发现明显套利机会**\n")
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+共享 HTTP 响应缓存
+- 以 URL + 排序后的参数为键，内存 LRU (按字节数限额) + 可选 SQLite 磁盘层 (zlib 压缩)，
+  磁盘层让同一轮 cron 中的不同脚本复用彼此的响应
+- TTL 内直接命中；过期但在 stale_ttl 内先返回旧数据，后台重新验证 (stale-while-revalidate)
+- 同一事件循环中相同请求并发时只发出一次，其余等待同一结果
+- 重新验证带 ETag / Last-Modified，304 只刷新时间；请求失败时有旧数据就返回旧数据
+- 每个条目带内容版本号，正文变化才递增，轮询方据此判断是否有新内容
+- 磁盘层为多进程共享的 WAL 库；磁盘读写出错 (锁超时等) 只当作未命中/未写入，不影响请求
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+from urllib.parse import urlencode
+
+import aiohttp
+import requests
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_DB = "data/http_cache.db"
+
+
+@dataclass
+class CacheEntry:
+    """一条缓存的响应"""
+    key: str
+    data: Any
+    body_hash: str
+    fetched_at: float
+    ttl: float
+    size: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    version: int = 1
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now if now is not None else time.time()) - self.fetched_at
+
+    def fresh(self, now: Optional[float] = None) -> bool:
+        return self.age(now) < self.ttl
+
+
+def cache_key(url: str, params: Optional[Dict] = None) -> str:
+    if not params:
+        return url
+    items = sorted((k, str(v).lower() if isinstance(v, bool) else v) for k, v in params.items())
+    return f"{url}?{urlencode(items, doseq=True)}"
+
+
+class ResponseCache:
+    """
+    JSON 响应缓存
+    ttl / stale_ttl 可按调用覆盖；stale_ttl 为过期后仍可先返回旧数据的时长
+    """
+
+    def __init__(self, default_ttl: float = 300, stale_ttl: Optional[float] = None,
+                 max_bytes: int = 64 * 1024 * 1024, disk_path: Optional[str] = None,
+                 disk_max_age: float = 86400, timeout: float = 30, disk_timeout: float = 5):
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl         # None 表示与 ttl 相同
+        self.max_bytes = max_bytes
+        self.disk_max_age = disk_max_age   # 磁盘层超过该时间的条目会被清理
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+        self.memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.memory_bytes = 0
+        self.stats = {'hits': 0, 'disk_hits': 0, 'stale_hits': 0, 'misses': 0,
+                      'not_modified': 0, 'coalesced': 0, 'errors': 0, 'disk_errors': 0}
+
+        # 进行中的请求只在同一事件循环内共享
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()            # 后台重新验证任务 (保持引用，避免被回收)
+        self._session: Optional[aiohttp.ClientSession] = None   # 后台重新验证共用的连接池，最后一个任务结束时关闭
+        self._writes = 0
+
+        self.conn: Optional[sqlite3.Connection] = None
+        if disk_path:
+            directory = os.path.dirname(disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # cron 中的多个脚本同时读写: WAL 让读写互不阻塞，timeout 等待其他进程的写锁
+            self.conn = sqlite3.connect(disk_path, timeout=disk_timeout)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    body_hash TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    ttl REAL NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    version INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_responses_fetched ON responses (fetched_at);
+            """)
+            self.conn.commit()
+
+    # ---------- 存储层 ----------
+
+    def _remember(self, entry: CacheEntry):
+        old = self.memory.pop(entry.key, None)
+        if old is not None:
+            self.memory_bytes -= old.size
+        self.memory[entry.key] = entry
+        self.memory_bytes += entry.size
+        while self.memory_bytes > self.max_bytes and len(self.memory) > 1:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= evicted.size
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            return entry
+        if self.conn is None:
+            return None
+
+        try:
+            row = self.conn.execute(
+                "SELECT body, body_hash, fetched_at, ttl, etag, last_modified, version FROM responses WHERE key=?",
+                (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.stats['disk_errors'] += 1
+            logger.warning(f"⚠️ 读取磁盘缓存失败，按未命中处理: {e}")
+            return None
+        if row is None:
+            return None
+        body = zlib.decompress(row[0])
+        entry = CacheEntry(key, json.loads(body), row[1], row[2], row[3], len(body), row[4], row[5], row[6])
+        self._remember(entry)
+        self.stats['disk_hits'] += 1
+        return entry
+
+    def _store(self, entry: CacheEntry, body: Optional[bytes]):
+        """body 为 None 表示 304，只更新时间"""
+        self._remember(entry)
+        if self.conn is None:
+            return
+        try:
+            self._store_disk(entry, body)
+        except sqlite3.Error as e:
+            # 只缺少磁盘副本，内存中的条目仍然有效
+            self.stats['disk_errors'] += 1
+            logger.warning(f"⚠️ 写入磁盘缓存失败: {e}")
+            if self.conn.in_transaction:
+                self.conn.rollback()
+
+    def _store_disk(self, entry: CacheEntry, body: Optional[bytes]):
+        if body is None:
+            self.conn.execute("UPDATE responses SET fetched_at=?, ttl=? WHERE key=?",
+                              (entry.fetched_at, entry.ttl, entry.key))
+        else:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, body, body_hash, fetched_at, ttl, etag, last_modified, version) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (entry.key, zlib.compress(body, 1), entry.body_hash, entry.fetched_at, entry.ttl,
+                 entry.etag, entry.last_modified, entry.version)
+            )
+        self._writes += 1
+        if self._writes % 200 == 0:
+            self.conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.disk_max_age,))
+        self.conn.commit()
+
+    def _update(self, key: str, previous: Optional[CacheEntry], status: int, body: bytes,
+                headers, ttl: float) -> CacheEntry:
+        """根据响应生成新条目并写入缓存"""
+        now = time.time()
+        if status == 304 and previous is not None:
+            previous.fetched_at = now
+            previous.ttl = ttl
+            self._store(previous, None)
+            self.stats['not_modified'] += 1
+            return previous
+
+        body_hash = hashlib.sha1(body).hexdigest()
+        version = 1
+        if previous is not None:
+            version = previous.version + (previous.body_hash != body_hash)
+        entry = CacheEntry(key, json.loads(body), body_hash, now, ttl, len(body),
+                           headers.get('ETag'), headers.get('Last-Modified'), version)
+        self._store(entry, body)
+        return entry
+
+    def invalidate(self, url: str, params: Optional[Dict] = None):
+        key = cache_key(url, params)
+        entry = self.memory.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= entry.size
+        if self.conn is not None:
+            try:
+                self.conn.execute("DELETE FROM responses WHERE key=?", (key,))
+                self.conn.commit()
+            except sqlite3.Error as e:
+                self.stats['disk_errors'] += 1
+                logger.warning(f"⚠️ 删除磁盘缓存失败: {e}")
+
+    # ---------- 异步接口 ----------
+
+    @staticmethod
+    def _validators(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    async def _download(self, key: str, url: str, params: Optional[Dict], ttl: float,
+                        session: Optional[aiohttp.ClientSession], headers: Optional[Dict]) -> CacheEntry:
+        previous = self._lookup(key)
+        request_headers = dict(headers or {}, **self._validators(previous))
+
+        async def get(s: aiohttp.ClientSession) -> CacheEntry:
+            async with s.get(url, params=params, headers=request_headers) as response:
+                if response.status != 304:
+                    response.raise_for_status()
+                body = await response.read()
+                return self._update(key, previous, response.status, body, response.headers, ttl)
+
+        if session is None or session.closed:
+            async with aiohttp.ClientSession(timeout=self.timeout) as own_session:
+                return await get(own_session)
+        return await get(session)
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        """进行中的请求与后台会话只属于一个事件循环，换循环时重新开始"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._inflight = {}
+            self._background = set()
+            # 会话在最后一个后台任务结束时 (含循环退出时被取消) 已关闭，这里只丢弃引用
+            self._session = None
+        return loop
+
+    def _start(self, key: str, *args) -> asyncio.Task:
+        """发起请求 (同一键已有进行中的请求时复用)"""
+        loop = self._bind_loop()
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+            return task
+
+        task = loop.create_task(self._download(key, *args))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._inflight.pop(key, None) if self._inflight.get(key) is t else None)
+        return task
+
+    def _pooled_session(self) -> aiohttp.ClientSession:
+        """当前事件循环中缓存自有的长连接会话 (调用方的会话可能在后台刷新前已关闭)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=16, keepalive_timeout=60),
+                timeout=self.timeout
+            )
+        return self._session
+
+    async def _revalidate(self, key: str, url: str, params: Optional[Dict], ttl: float, headers: Optional[Dict]):
+        """后台重新验证，并发的刷新共用缓存自有的连接池"""
+        try:
+            await self._start(key, url, params, ttl, self._pooled_session(), headers)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️ 后台刷新失败 {url}: {e}")
+        finally:
+            self._background.discard(asyncio.current_task())
+            if not self._background:
+                await self.aclose()
+
+    async def fetch(self, url: str, params: Optional[Dict] = None, ttl: Optional[float] = None,
+                    stale_ttl: Optional[float] = None, session: Optional[aiohttp.ClientSession] = None,
+                    headers: Optional[Dict] = None) -> CacheEntry:
+        """返回缓存条目 (data / version / fetched_at)"""
+        ttl = self.default_ttl if ttl is None else ttl
+        stale_ttl = stale_ttl if stale_ttl is not None else (self.stale_ttl if self.stale_ttl is not None else ttl)
+        key = cache_key(url, params)
+        now = time.time()
+
+        entry = self._lookup(key)
+        if entry is not None and entry.age(now) < ttl:
+            self.stats['hits'] += 1
+            return entry
+        if entry is not None and entry.age(now) < ttl + stale_ttl:
+            self.stats['stale_hits'] += 1
+            task = self._bind_loop().create_task(self._revalidate(key, url, params, ttl, headers))
+            self._background.add(task)
+            return entry
+
+        self.stats['misses'] += 1
+        try:
+            return await asyncio.shield(self._start(key, url, params, ttl, session, headers))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            if entry is None:
+                raise
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️ 请求失败，使用 {entry.age():.0f}s 前的缓存: {url} ({e})")
+            return entry
+
+    async def get_json(self, url: str, params: Optional[Dict] = None, **kwargs) -> Any:
+        return (await self.fetch(url, params, **kwargs)).data
+
+    # ---------- 同步接口 (requests) ----------
+
+    def get_json_sync(self, url: str, params: Optional[Dict] = None, ttl: Optional[float] = None,
+                      timeout: float = 30, headers: Optional[Dict] = None) -> Any:
+        """
+        同步脚本使用: 命中则直接返回，否则带条件头请求；失败时有旧数据就返回旧数据
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        key = cache_key(url, params)
+        entry = self._lookup(key)
+        if entry is not None and entry.fresh():
+            self.stats['hits'] += 1
+            return entry.data
+
+        self.stats['misses'] += 1
+        try:
+            response = requests.get(url, params=params, timeout=timeout,
+                                    headers=dict(headers or {}, **self._validators(entry)))
+            if response.status_code != 304:
+                response.raise_for_status()
+            return self._update(key, entry, response.status_code, response.content, response.headers, ttl).data
+        except (requests.RequestException, ValueError) as e:
+            if entry is None:
+                raise
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️ 请求失败，使用 {entry.age():.0f}s 前的缓存: {url} ({e})")
+            return entry.data
+
+    async def aclose(self):
+        """关闭后台重新验证的会话 (在创建它的事件循环中调用)"""
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+_shared: Optional[ResponseCache] = None
+
+
+def shared_cache() -> ResponseCache:
+    """
+    进程内共享的缓存实例
+    磁盘层路径由 HTTP_CACHE_DB 环境变量指定，设为空字符串则只用内存
+    """
+    global _shared
+    if _shared is None:
+        _shared = ResponseCache(disk_path=os.getenv('HTTP_CACHE_DB', HTTP_CACHE_DB) or None)
+    return _shared
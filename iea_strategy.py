@@ -15,7 +15,7 @@ import time
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 from decimal import Decimal, ROUND_HALF_UP
 
@@ -23,6 +23,8 @@ import requests
 from py_clob_client.client import ClobClient
 from py_clob_client.clob_types import ApiCreds, OrderArgs, OrderType
 
+from opportunity_pipeline import TopK, log_opportunity
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -75,6 +77,7 @@ class ImpossibleEventArbitrage:
     MIN_EXPECTED_RETURN = 0.3  # 最小期望收益 30%
     TAKE_PROFIT_THRESHOLD = 0.30  # 获利了结 30%
     STOP_LOSS_THRESHOLD = 0.05    # 止损 5%
+    TOP_K = 50                    # 每轮保留的最佳机会数
     
     def __init__(self):
         """初始化策略"""
@@ -97,6 +100,9 @@ class ImpossibleEventArbitrage:
         )
         self.client.set_api_creds(creds)
         
+        # 最近一轮扫描发现的机会总数
+        self.total_opportunities = 0
+        
         # 持仓管理
         self.positions: List[Position] = []
         self.positions_file = "positions.json"
@@ -247,13 +253,10 @@ class ImpossibleEventArbitrage:
         
         return min(score, 100)
     
-    def find_opportunities(self) -> List[ArbitrageOpportunity]:
+    def iter_opportunities(self, markets: List[Dict]) -> Iterator[ArbitrageOpportunity]:
         """
-        寻找套利机会
+        逐个产出套利机会
         """
-        markets = self.fetch_active_markets()
-        opportunities = []
-        
         logger.info(f"🎯 正在分析 {len(markets)} 个市场寻找套利机会...")
         
         for i, market in enumerate(markets):
@@ -327,31 +330,42 @@ class ImpossibleEventArbitrage:
                         confidence_score=confidence
                     )
                     
-                    opportunities.append(opp)
+                    log_opportunity(logger, "   ✅ 发现机会: %s... 期望收益: %.1f%% 置信度: %s",
+                                    opp.question[:40], opp.expected_return, opp.confidence_score)
                     
-                    logger.info(f"   ✅ 发现机会: {opp.question[:40]}... "
-                              f"期望收益: {opp.expected_return:.1f}% "
-                              f"置信度: {opp.confidence_score}")
+                    yield opp
                     
             except Exception as e:
                 logger.error(f"   ⚠️ 分析市场时出错: {e}")
                 continue
+    
+    def find_opportunities(self) -> List[ArbitrageOpportunity]:
+        """
+        寻找套利机会
+        先排除已持仓的市场，再保留期望收益最高的 TOP_K 个 (已持仓的机会不占名额)
+        """
+        markets = self.fetch_active_markets()
         
-        # 按期望收益排序
-        opportunities.sort(key=lambda x: x.expected_return, reverse=True)
+        top = TopK(self.TOP_K, key=lambda opp: opp.expected_return)
+        top.extend(self.filter_existing_positions(self.iter_opportunities(markets)))
+        self.total_opportunities = top.total
         
-        logger.info(f"\n📊 共发现 {len(opportunities)} 个套利机会")
-        return opportunities
+        logger.info(f"\n📊 共发现 {top.total} 个新套利机会 (保留前 {len(top)} 个)")
+        return top.sorted()
     
-    def filter_existing_positions(self, opportunities: List[ArbitrageOpportunity]) -> List[ArbitrageOpportunity]:
+    def filter_existing_positions(self, opportunities: Iterable[ArbitrageOpportunity]) -> Iterator[ArbitrageOpportunity]:
         """
-        过滤掉已持仓的机会
+        逐个过滤掉已持仓的机会
         """
         existing_markets = {p.market_id for p in self.positions if p.status == 'open'}
-        filtered = [opp for opp in opportunities if opp.market_id not in existing_markets]
+        skipped = 0
+        for opp in opportunities:
+            if opp.market_id in existing_markets:
+                skipped += 1
+                continue
+            yield opp
         
-        logger.info(f"📊 过滤后剩余 {len(filtered)} 个新机会 (已持仓: {len(existing_markets)})")
-        return filtered
+        logger.info(f"📊 跳过已持仓市场的机会 {skipped} 个 (已持仓: {len(existing_markets)})")
     
     def calculate_position_size(self, opportunity: ArbitrageOpportunity) -> float:
         """
@@ -493,15 +507,12 @@ class ImpossibleEventArbitrage:
         logger.info(f"  最小期望收益: {self.MIN_EXPECTED_RETURN*100}%")
         logger.info("=" * 70)
         
-        # 步骤 1: 寻找机会
+        # 步骤 1-2: 寻找机会 (已排除持仓市场)
         opportunities = self.find_opportunities()
         
-        # 步骤 2: 过滤已持仓
-        new_opportunities = self.filter_existing_positions(opportunities)
-        
         # 步骤 3: 执行交易（前 5 个最佳机会）
         executed = 0
-        for opp in new_opportunities[:5]:
+        for opp in opportunities[:5]:
             if self.execute_trade(opp):
                 executed += 1
                 time.sleep(1)  # 避免请求过快
@@ -531,7 +542,7 @@ class ImpossibleEventArbitrage:
             f.write("## 📊 执行摘要\n\n")
             f.write(f"| 指标 | 数值 |\n")
             f.write(f"|------|------|\n")
-            f.write(f"| 发现机会 | {len(opportunities)} 个 |\n")
+            f.write(f"| 发现机会 | {self.total_opportunities} 个 |\n")
             f.write(f"| 执行交易 | {executed} 笔 |\n")
             f.write(f"| 当前持仓 | {len([p for p in self.positions if p.status == 'open'])} 个 |\n")
             f.write(f"| 总交易次数 | {len(self.positions)} 次 |\n\n")
@@ -6,9 +6,10 @@ Kimi 自动策略编写系统
 
 import os
 import json
-import glob
 from datetime import datetime
 
+from opportunity_store import OPPORTUNITY_DB, OpportunityStore
+
 class KimiStrategyWriter:
     """
     自动策略编写器
@@ -17,24 +18,35 @@ class KimiStrategyWriter:
     def __init__(self):
         self.strategy_dir = "/root/clawd/strategies"
         os.makedirs(self.strategy_dir, exist_ok=True)
+        self.store = OpportunityStore(OPPORTUNITY_DB)
         
     def load_latest_opportunities(self):
         """
-        加载最新的套利机会
+        加载上次运行以来新增或价格变化的套利机会
+        通过机会存储的消费者游标读取，不再重复读取整份扫描结果
         """
-        # 查找最新的套利报告
-        files = glob.glob("/root/clawd/arbitrage_opportunities_*.json")
-        if not files:
-            return []
-        
-        latest_file = max(files, key=os.path.getctime)
-        
-        try:
-            with open(latest_file, 'r') as f:
-                data = json.load(f)
-                return data.get("opportunities", [])
-        except:
-            return []
+        events = self.store.poll("strategy_writer", changes=["new", "changed"])
+        
+        # 同一 (市场, 结果, 策略) 只保留最新事件，再按市场聚合
+        latest = {}
+        for event in events:
+            latest[(event["market_id"], event["outcome"], event["strategy"])] = event
+        
+        by_market = {}
+        for event in latest.values():
+            market = by_market.setdefault(event["market_id"], {
+                "market_id": event["market_id"],
+                "question": event.get("question", ""),
+                "opportunities": []
+            })
+            market["opportunities"].append(dict(event, type=event["strategy"]))
+        
+        opportunities = list(by_market.values())
+        for opp in opportunities:
+            opp["opportunity_count"] = len(opp["opportunities"])
+        opportunities.sort(key=lambda x: x["opportunity_count"], reverse=True)
+        
+        return opportunities
     
     def analyze_patterns(self, opportunities):
         """
@@ -187,7 +199,7 @@ if __name__ == "__main__":
         
         # 加载机会
         opportunities = self.load_latest_opportunities()
-        print(f"📊 加载到 {len(opportunities)} 个套利机会")
+        print(f"📊 加载到 {len(opportunities)} 个新增/变化的套利机会")
         
         # 生成策略
         code_file = self.generate_strategy_template(opportunities)
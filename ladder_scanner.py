@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Polymarket 跨市场一致性扫描器
+同一事件下的嵌套市场价格必须单调:
+- 价格阶梯: "BTC above 100k" ≥ "above 110k" ≥ "above 120k"
+- 时间阶梯: "by March" ≤ "by June"
+
+违反单调性时，买入"更可能"一侧的 YES + "更不可能"一侧的 NO，
+到期收益至少为 1，成本 < 1 即为可执行套利。
+"""
+
+import re
+import json
+import asyncio
+import aiohttp
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from market_catalog import CatalogFetchError, MarketCatalog, MarketRecord, OrderBook, walk_basket
+from signal_bus import SIGNAL_DB, Signal, SignalBus
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('ladder_scanner.log'),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+ABOVE_WORDS = r'above|over|greater than|more than|at least|reach|reaches|hit|hits|exceed|exceeds|↑|>'
+BELOW_WORDS = r'below|under|less than|dip to|dips to|fall to|falls to|↓|<'
+
+THRESHOLD_RE = re.compile(
+    rf'(?P<dir>{ABOVE_WORDS}|{BELOW_WORDS})\s*\$?\s*(?P<num>\d[\d,]*(?:\.\d+)?)\s*(?P<unit>k|m|b|thousand|million|billion)?\b',
+    re.IGNORECASE
+)
+BELOW_RE = re.compile(rf'^(?:{BELOW_WORDS})$', re.IGNORECASE)
+DEADLINE_RE = re.compile(r'\b(by|before)\b', re.IGNORECASE)
+
+UNIT_MULTIPLIER = {
+    'k': 1e3, 'thousand': 1e3,
+    'm': 1e6, 'million': 1e6,
+    'b': 1e9, 'billion': 1e9
+}
+
+
+def parse_threshold(text: str) -> Optional[Tuple[str, float]]:
+    """解析阈值，返回 ('above' | 'below', 数值)"""
+    match = THRESHOLD_RE.search(text or '')
+    if not match:
+        return None
+
+    value = float(match.group('num').replace(',', ''))
+    unit = (match.group('unit') or '').lower()
+    value *= UNIT_MULTIPLIER.get(unit, 1)
+
+    direction = 'below' if BELOW_RE.match(match.group('dir')) else 'above'
+    return direction, value
+
+
+def parse_deadline(market: MarketRecord) -> Optional[datetime]:
+    """时间阶梯以市场的 endDate 作为截止日"""
+    if not DEADLINE_RE.search(market.question) or not market.end_date:
+        return None
+    try:
+        return datetime.fromisoformat(market.end_date.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+class LadderConsistencyScanner:
+    """
+    跨市场一致性扫描器
+    每轮扫描只建一次阶梯索引，每条阶梯按"越来越不可能"排序后线性检查
+    """
+
+    def __init__(self, fee_rate: float = 0.0, min_edge: float = 0.01, max_size: float = 5000):
+        self.fee_rate = fee_rate
+        self.min_edge = min_edge
+        self.max_size = max_size
+
+    def build_ladders(self, catalog: MarketCatalog) -> List[Dict]:
+        """
+        按事件分组并解析阈值/日期
+        每条阶梯的 rungs 按概率应当非递增的顺序排列
+        """
+        ladders = []
+
+        for event_id, markets in catalog.by_event.items():
+            if len(markets) < 2:
+                continue
+            markets = [m for m in markets if len(m.token_ids) >= 2]
+
+            # 价格阶梯 (同一事件里可能同时有 ↑ 与 ↓ 两条)
+            by_direction: Dict[str, List[Tuple[float, MarketRecord]]] = {}
+            for market in markets:
+                parsed = parse_threshold(market.group_item_title) or parse_threshold(market.question)
+                if parsed:
+                    by_direction.setdefault(parsed[0], []).append((parsed[1], market))
+
+            for direction, rungs in by_direction.items():
+                if len({value for value, _ in rungs}) < 2:
+                    continue
+                # above: 阈值越高越不可能; below: 阈值越低越不可能
+                rungs.sort(key=lambda r: r[0], reverse=(direction == 'below'))
+                ladders.append(self._ladder(event_id, f"threshold_{direction}", rungs))
+
+            if by_direction:
+                continue
+
+            # 时间阶梯: 截止日越早越不可能
+            dated = [(parse_deadline(m), m) for m in markets]
+            dated = [(d, m) for d, m in dated if d is not None]
+            if len({d for d, _ in dated}) >= 2:
+                dated.sort(key=lambda r: r[0], reverse=True)
+                ladders.append(self._ladder(event_id, 'deadline', dated))
+
+        return ladders
+
+    def _ladder(self, event_id: str, kind: str, rungs: List[Tuple]) -> Dict:
+        return {
+            'event_id': event_id,
+            'kind': kind,
+            'title': rungs[0][1].event_title or rungs[0][1].question,
+            'rungs': [
+                {
+                    'key': key.isoformat() if isinstance(key, datetime) else key,
+                    'market': market
+                }
+                for key, market in rungs
+            ]
+        }
+
+    def find_violations(self, ladder: Dict, books: Dict[str, OrderBook]) -> List[Dict]:
+        """
+        线性扫描: 对每一档 j，与之前 YES 卖价最低的档 i 配对
+        成本 = ask(YES_i) + ask(NO_j)
+        """
+        violations = []
+        best_yes: Optional[Tuple[float, Dict, OrderBook]] = None
+
+        for rung in ladder['rungs']:
+            market = rung['market']
+            yes_book = books.get(market.token_ids[0])
+            no_book = books.get(market.token_ids[1])
+
+            if best_yes is not None and no_book is not None and no_book.best_ask is not None:
+                yes_ask, yes_rung, prev_yes_book = best_yes
+                cost = yes_ask + no_book.best_ask
+                edge = 1 - cost * (1 + self.fee_rate)
+
+                if edge >= self.min_edge:
+                    size, notional = walk_basket(
+                        [prev_yes_book.asks, no_book.asks],
+                        lambda unit: unit * (1 + self.fee_rate) < 1,
+                        self.max_size
+                    )
+                    profit = size - notional * (1 + self.fee_rate)
+                    violations.append({
+                        'type': 'ladder_violation',
+                        'kind': ladder['kind'],
+                        'event_id': ladder['event_id'],
+                        'title': ladder['title'],
+                        'buy_yes': {
+                            'market_id': yes_rung['market'].market_id,
+                            'question': yes_rung['market'].question,
+                            'key': yes_rung['key'],
+                            'ask': yes_ask
+                        },
+                        'buy_no': {
+                            'market_id': market.market_id,
+                            'question': market.question,
+                            'key': rung['key'],
+                            'ask': no_book.best_ask
+                        },
+                        'cost': round(cost, 4),
+                        'edge': round(edge, 4),
+                        'executable_size': round(size, 2),
+                        'guaranteed_profit': round(profit, 2),
+                        'scan_time': datetime.now().isoformat()
+                    })
+
+            if yes_book is not None and yes_book.best_ask is not None:
+                if best_yes is None or yes_book.best_ask < best_yes[0]:
+                    best_yes = (yes_book.best_ask, rung, yes_book)
+
+        return violations
+
+    async def scan(self, catalog: MarketCatalog, session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+        """扫描整个目录"""
+        ladders = self.build_ladders(catalog)
+        token_ids = [t for ladder in ladders for rung in ladder['rungs'] for t in rung['market'].token_ids[:2]]
+        logger.info(f"🪜 共 {len(ladders)} 条阶梯, {len(set(token_ids))} 个 token")
+
+        books = await catalog.fetch_order_books(token_ids, session)
+
+        violations = []
+        for ladder in ladders:
+            violations.extend(self.find_violations(ladder, books))
+
+        violations.sort(key=lambda v: (v['guaranteed_profit'], v['edge']), reverse=True)
+        logger.info(f"✅ 发现 {len(violations)} 个单调性违反")
+        return violations
+
+    def generate_markdown_report(self, violations: List[Dict], filename: str):
+        """生成 Markdown 报告"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(f"# 🪜 Polymarket 跨市场一致性报告\n\n")
+            f.write(f"**扫描时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"**发现违反**: {len(violations)} 个\n\n")
+            f.write(f"---\n\n")
+
+            if not violations:
+                f.write("❌ 未发现单调性违反\n")
+                return
+
+            for i, v in enumerate(violations[:20], 1):
+                f.write(f"### {i}. {v['title']}\n\n")
+                f.write(f"- **类型**: {v['kind']}\n")
+                f.write(f"- **买 YES**: {v['buy_yes']['question']} @ {v['buy_yes']['ask']:.4f}\n")
+                f.write(f"- **买 NO**: {v['buy_no']['question']} @ {v['buy_no']['ask']:.4f}\n")
+                f.write(f"- **成本**: {v['cost']:.4f} | **边际**: {v['edge']:.2%}\n")
+                f.write(f"- **可成交**: {v['executable_size']:,.0f} 份 | **保证利润**: ${v['guaranteed_profit']:,.2f}\n\n")
+
+
+async def main():
+    """主函数"""
+    logger.info("🚀 Polymarket 跨市场一致性扫描器")
+
+    scanner = LadderConsistencyScanner()
+    catalog = MarketCatalog()
+
+    async with aiohttp.ClientSession() as session:
+        try:
+            await catalog.sync(session)
+        except CatalogFetchError as e:
+            # 残缺目录上的扫描结果没有意义，本轮直接放弃
+            logger.error(f"❌ 市场目录拉取不完整，放弃本轮扫描: {e}")
+            return
+        violations = await scanner.scan(catalog, session)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    json_file = f"ladder_violations_{timestamp}.json"
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'scan_time': datetime.now().isoformat(),
+            'markets_scanned': len(catalog.markets),
+            'total_violations': len(violations),
+            'violations': violations
+        }, f, indent=2, ensure_ascii=False)
+
+    md_file = f"ladder_report_{timestamp}.md"
+    scanner.generate_markdown_report(violations, md_file)
+
+    # 单调性违反以高置信度发布到信号总线
+    bus = SignalBus(SIGNAL_DB)
+    for v in violations:
+        bus.publish_nowait(Signal('scanner', v['type'], 90, market_id=str(v['buy_yes']['market_id']), payload=v))
+
+    logger.info(f"💾 结果已保存: {json_file}, {md_file}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+增量日志读取
+记住每个文件已读到的位置，每次只读新增的完整行；
+文件被轮转 (inode 变化) 时先读完旧文件剩余内容再切到新文件，截断时从头读取。
+
+LogWatcher 同时跟踪多个文件: Linux 上用 inotify 监听所在目录，
+没有事件时阻塞等待，空闲几乎不占 CPU；其他平台退化为定时轮询。
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+class FileTailer:
+    """
+    单文件增量读取器
+    """
+
+    def __init__(self, path: str, from_end: bool = False):
+        self.path = str(path)
+        self.from_end = from_end  # 首次打开时跳过已有内容
+        self._file = None
+        self._partial = b''
+
+    @property
+    def offset(self) -> int:
+        return self._file.tell() if self._file else 0
+
+    def _open(self, seek_end: bool) -> bool:
+        try:
+            self._file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        if seek_end:
+            self._file.seek(0, os.SEEK_END)
+        return True
+
+    def read_lines(self) -> List[str]:
+        """返回上次调用以来新增的完整行"""
+        if self._file is None and not self._open(self.from_end):
+            # 之后才出现的文件全部是新内容
+            self.from_end = False
+            return []
+
+        data = self._file.read()
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+
+        current = os.fstat(self._file.fileno())
+        rotated = []
+        if stat is not None and stat.st_ino != current.st_ino:
+            # 轮转: 旧文件已读完，其末尾未换行的内容单独作为一行，再切换到新文件从头读
+            rotated = (self._partial + data).split(b'\n')
+            if not rotated[-1]:
+                rotated.pop()
+            self._partial = b''
+            data = b''
+            self._file.close()
+            self._file = None
+            if self._open(False):
+                data = self._file.read()
+        elif current.st_size < self._file.tell():
+            # 截断
+            self._file.seek(0)
+            self._partial = b''
+            data = self._file.read()
+
+        lines = rotated
+        if data:
+            *complete, self._partial = (self._partial + data).split(b'\n')
+            lines += complete
+        return [line.decode('utf-8', errors='replace').rstrip('\r') for line in lines]
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class _Inotify:
+    """
+    inotify 的最小 ctypes 封装 (无第三方依赖)
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+
+    def add_watch(self, directory: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch 失败: {directory}")
+        return wd
+
+    def read(self, timeout: Optional[float]) -> List[Tuple[int, int, str]]:
+        """等待事件，返回 [(wd, mask, name)]"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + self.EVENT.size <= len(buf):
+            wd, mask, _, length = self.EVENT.unpack_from(buf, offset)
+            offset += self.EVENT.size
+            name = buf[offset:offset + length].rstrip(b'\0').decode('utf-8', errors='replace')
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LogWatcher:
+    """
+    多文件跟踪器，逐行产出 (path, line)，每行只产出一次
+    """
+
+    def __init__(self, paths: Iterable[str], from_end: bool = True, poll_interval: float = 5.0,
+                 use_inotify: bool = True):
+        self.poll_interval = poll_interval
+        self.tailers: Dict[str, FileTailer] = {
+            os.path.abspath(p): FileTailer(os.path.abspath(p), from_end) for p in paths
+        }
+
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[int, str] = {}     # wd → 目录
+        self._unwatched: Set[str] = set(self.tailers)
+
+        if use_inotify and sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+        self._add_watches()
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self._inotify else 'polling'
+
+    def _add_watches(self):
+        """为文件所在目录注册 inotify (目录不存在的文件继续轮询)"""
+        if not self._inotify:
+            return
+
+        watched_dirs = set(self._watches.values())
+        for path in list(self._unwatched):
+            directory = os.path.dirname(path)
+            if directory not in watched_dirs:
+                try:
+                    self._watches[self._inotify.add_watch(directory)] = directory
+                except OSError:
+                    continue
+                watched_dirs.add(directory)
+            self._unwatched.discard(path)
+
+    def _changed_paths(self, timeout: float) -> Iterable[str]:
+        if not self._inotify:
+            time.sleep(timeout)
+            return self.tailers
+
+        events = self._inotify.read(timeout)
+        changed = set(self._unwatched)
+        for wd, mask, name in events:
+            if mask & _Inotify.IN_Q_OVERFLOW:
+                return self.tailers
+            path = os.path.join(self._watches.get(wd, ''), name)
+            if path in self.tailers:
+                changed.add(path)
+
+        if self._unwatched:
+            self._add_watches()
+        return changed
+
+    def read_once(self, paths: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+        """读取指定 (默认全部) 文件的新增行"""
+        lines = []
+        for path in paths if paths is not None else self.tailers:
+            lines.extend((path, line) for line in self.tailers[path].read_lines())
+        return lines
+
+    def follow(self) -> Iterator[Tuple[str, str]]:
+        """持续产出新增行"""
+        yield from self.read_once()
+        while True:
+            yield from self.read_once(self._changed_paths(self.poll_interval))
+
+    def close(self):
+        for tailer in self.tailers.values():
+            tailer.close()
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
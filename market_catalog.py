@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Polymarket 市场目录
+一次拉取全量活跃市场，建立 event→markets / token→market 索引，
+并通过 CLOB /books 接口批量获取订单簿
+"""
+
+import json
+import asyncio
+import aiohttp
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from http_cache import ResponseCache, shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_list(value) -> List:
+    """Gamma 把 outcomes / outcomePrices / clobTokenIds 编码成 JSON 字符串"""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            return parsed if isinstance(parsed, list) else []
+        except ValueError:
+            return []
+    return []
+
+
+def _to_float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class MarketRecord:
+    """标准化后的市场记录"""
+    market_id: str
+    question: str
+    slug: str
+    event_id: str
+    event_slug: str
+    event_title: str
+    neg_risk: bool
+    neg_risk_augmented: bool
+    outcomes: List[str]
+    prices: List[float]
+    token_ids: List[str]
+    liquidity: float
+    volume: float
+    end_date: str
+    group_item_title: str
+    condition_id: str = ""
+    raw: Dict = field(repr=False, default_factory=dict)
+
+    @classmethod
+    def from_gamma(cls, market: Dict) -> 'MarketRecord':
+        """从 Gamma /markets 返回的原始数据构造"""
+        outcomes = _parse_list(market.get('outcomes'))
+        prices = [_to_float(p) for p in _parse_list(market.get('outcomePrices'))]
+        token_ids = [str(t) for t in _parse_list(market.get('clobTokenIds'))]
+
+        # 兼容旧版 outcomes 为 [{'name':..., 'price':...}] 的格式
+        if outcomes and isinstance(outcomes[0], dict):
+            prices = prices or [_to_float(o.get('price')) for o in outcomes]
+            token_ids = token_ids or [str(o.get('token_id', '')) for o in outcomes]
+            outcomes = [str(o.get('name', '')) for o in outcomes]
+        else:
+            outcomes = [str(o) for o in outcomes]
+
+        events = market.get('events') or []
+        event = events[0] if events and isinstance(events[0], dict) else {}
+
+        return cls(
+            market_id=str(market.get('id', '')),
+            question=market.get('question', '') or '',
+            slug=market.get('slug', '') or '',
+            event_id=str(event.get('id', '')),
+            event_slug=event.get('slug', '') or '',
+            event_title=event.get('title', '') or '',
+            neg_risk=bool(market.get('negRisk') or event.get('negRisk')),
+            neg_risk_augmented=bool(event.get('negRiskAugmented')),
+            outcomes=outcomes,
+            prices=prices,
+            token_ids=token_ids,
+            liquidity=_to_float(market.get('liquidity')),
+            volume=_to_float(market.get('volume')),
+            end_date=market.get('endDate', '') or '',
+            group_item_title=market.get('groupItemTitle', '') or '',
+            condition_id=(market.get('conditionId', '') or '').lower(),
+            raw=market
+        )
+
+    def yes_token(self) -> Optional[str]:
+        """二元市场的 YES token"""
+        return self.token_ids[0] if self.token_ids else None
+
+
+@dataclass
+class OrderBook:
+    """单个 token 的订单簿，bids 降序 / asks 升序"""
+    token_id: str
+    bids: List[Tuple[float, float]]
+    asks: List[Tuple[float, float]]
+
+    @classmethod
+    def from_clob(cls, book: Dict) -> 'OrderBook':
+        bids = [(_to_float(l.get('price')), _to_float(l.get('size'))) for l in book.get('bids', [])]
+        asks = [(_to_float(l.get('price')), _to_float(l.get('size'))) for l in book.get('asks', [])]
+        bids.sort(key=lambda l: l[0], reverse=True)
+        asks.sort(key=lambda l: l[0])
+        return cls(token_id=str(book.get('asset_id', '')), bids=bids, asks=asks)
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bids[0][0] if self.bids else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.asks[0][0] if self.asks else None
+
+
+def walk_basket(ladders: List[List[Tuple[float, float]]], accept, max_size: float) -> Tuple[float, float]:
+    """
+    同步吃掉每条腿的盘口，直到组合单价不再满足 accept
+    返回 (可成交份数, 总金额)
+    """
+    if not ladders or any(not ladder for ladder in ladders):
+        return 0.0, 0.0
+
+    idx = [0] * len(ladders)
+    remaining = [ladder[0][1] for ladder in ladders]
+    size = 0.0
+    value = 0.0
+
+    while size < max_size:
+        unit_price = sum(ladder[i][0] for ladder, i in zip(ladders, idx))
+        if not accept(unit_price):
+            break
+
+        qty = min(min(remaining), max_size - size)
+        if qty <= 0:
+            break
+
+        size += qty
+        value += unit_price * qty
+
+        exhausted = False
+        for leg, ladder in enumerate(ladders):
+            remaining[leg] -= qty
+            if remaining[leg] <= 1e-9:
+                idx[leg] += 1
+                if idx[leg] >= len(ladder):
+                    exhausted = True
+                    break
+                remaining[leg] = ladder[idx[leg]][1]
+        if exhausted:
+            break
+
+    return size, value
+
+
+class CatalogFetchError(Exception):
+    """目录未能完整拉取 (某页失败或结果明显缩水)，调用方应沿用上一次的目录"""
+
+
+class MarketCatalog:
+    """
+    全量市场目录
+    每轮扫描 sync() 一次，之后所有扫描器共用索引
+    任一页面失败时 sync() 抛出 CatalogFetchError 且不改动现有索引，
+    避免下游 (关联索引、篮子扫描、搜索索引) 在残缺目录上重建
+    """
+
+    def __init__(self, page_size: int = 500, concurrency: int = 4,
+                 cache: Optional[ResponseCache] = None, page_ttl: float = 60,
+                 retries: int = 3, min_ratio: float = 0.5):
+        self.gamma_url = "https://gamma-api.polymarket.com"
+        self.clob_url = "https://clob.polymarket.com"
+        self.page_size = page_size
+        self.concurrency = concurrency
+        # 多个进程/模块在同一轮里同步目录时共用页面响应
+        self.cache = cache or shared_cache()
+        self.page_ttl = page_ttl
+        self.retries = retries
+        self.min_ratio = min_ratio   # 新目录少于现有目录的该比例时视为拉取不完整
+
+        self.markets: Dict[str, MarketRecord] = {}
+        self.by_event: Dict[str, List[MarketRecord]] = {}
+        self.by_token: Dict[str, MarketRecord] = {}
+        self.by_condition: Dict[str, MarketRecord] = {}
+
+    async def _fetch_page(self, session: aiohttp.ClientSession, offset: int) -> List[Dict]:
+        params = {
+            'closed': 'false',
+            'archived': 'false',
+            'limit': self.page_size,
+            'offset': offset
+        }
+        for attempt in range(self.retries):
+            try:
+                # 不返回过期页面: 新旧页面混用时分页边界会重复或漏掉市场
+                page = await self.cache.get_json(
+                    f"{self.gamma_url}/markets", params, ttl=self.page_ttl, stale_ttl=0, session=session
+                )
+                if not isinstance(page, list):
+                    raise ValueError(f"意外的响应格式: {type(page).__name__}")
+                return page
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    raise CatalogFetchError(f"offset={offset}: {e}") from e
+                logger.warning(f"⚠️ 获取市场失败，重试 ({e}, offset={offset})")
+                await asyncio.sleep(2 ** attempt)
+        return []
+
+    async def fetch_all(self, session: aiohttp.ClientSession) -> List[Dict]:
+        """按批并发翻页，直到出现不满页；任一页重试后仍失败则抛出 CatalogFetchError"""
+        markets = []
+        offset = 0
+
+        while True:
+            offsets = [offset + i * self.page_size for i in range(self.concurrency)]
+            pages = await asyncio.gather(*(self._fetch_page(session, o) for o in offsets))
+
+            done = False
+            for page in pages:
+                markets.extend(page)
+                if len(page) < self.page_size:
+                    done = True
+                    break
+
+            if done:
+                break
+            offset += self.concurrency * self.page_size
+
+        return markets
+
+    def load(self, raw_markets: List[Dict]):
+        """用原始市场数据重建索引"""
+        self.markets = {}
+        self.by_event = {}
+        self.by_token = {}
+        self.by_condition = {}
+
+        for market in raw_markets:
+            record = MarketRecord.from_gamma(market)
+            if not record.market_id:
+                continue
+
+            self.markets[record.market_id] = record
+            if record.event_id:
+                self.by_event.setdefault(record.event_id, []).append(record)
+            for token_id in record.token_ids:
+                if token_id:
+                    self.by_token[token_id] = record
+            if record.condition_id:
+                self.by_condition[record.condition_id] = record
+
+    async def sync(self, session: Optional[aiohttp.ClientSession] = None) -> int:
+        """
+        拉取全量目录并重建索引，返回市场数量
+        拉取失败或市场数相比现有目录骤减时抛出 CatalogFetchError，现有索引保持不变
+        """
+        if session is None:
+            async with aiohttp.ClientSession() as own_session:
+                raw = await self.fetch_all(own_session)
+        else:
+            raw = await self.fetch_all(session)
+
+        if self.markets and len(raw) < len(self.markets) * self.min_ratio:
+            raise CatalogFetchError(f"目录只有 {len(raw)} 个市场 (现有 {len(self.markets)} 个)，疑似不完整")
+
+        self.load(raw)
+        logger.info(f"📚 市场目录: {len(self.markets)} 个市场, {len(self.by_event)} 个事件")
+        return len(self.markets)
+
+    async def fetch_order_books(self, token_ids: List[str],
+                                session: Optional[aiohttp.ClientSession] = None,
+                                batch_size: int = 100) -> Dict[str, OrderBook]:
+        """
+        批量获取订单簿
+        使用 POST /books，每批 batch_size 个 token，批次间并发
+        """
+        if session is None:
+            async with aiohttp.ClientSession() as own_session:
+                return await self.fetch_order_books(token_ids, own_session, batch_size)
+
+        unique = list(dict.fromkeys(t for t in token_ids if t))
+        batches = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch_batch(batch: List[str]) -> List[Dict]:
+            async with semaphore:
+                try:
+                    async with session.post(
+                        f"{self.clob_url}/books",
+                        json=[{'token_id': t} for t in batch],
+                        timeout=aiohttp.ClientTimeout(total=30)
+                    ) as response:
+                        if response.status == 200:
+                            return await response.json()
+                        logger.error(f"❌ 获取订单簿失败: HTTP {response.status}")
+                except Exception as e:
+                    logger.error(f"❌ 获取订单簿失败: {e}")
+                return []
+
+        results = await asyncio.gather(*(fetch_batch(b) for b in batches))
+
+        books = {}
+        for result in results:
+            for raw_book in result or []:
+                book = OrderBook.from_clob(raw_book)
+                if book.token_id:
+                    books[book.token_id] = book
+
+        logger.info(f"📖 获取到 {len(books)}/{len(unique)} 个订单簿")
+        return books
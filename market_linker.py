@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+推文/新闻 → 市场 实体链接
+对所有未关闭市场的问题文本维护倒排索引 (词 → {market_id: 词频})，
+按 BM25 为候选市场打分。目录同步时只重建变化的市场，无需全量重建。
+"""
+
+import re
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from market_catalog import MarketCatalog, MarketRecord
+
+TOKEN_RE = re.compile(r'[a-z0-9]+|[一-鿿]+')
+
+STOPWORDS = frozenset("""
+a an the of in on at to for by with from and or is are be will was were it its this that
+as than vs if what who which when how do does did has have had not no yes before after
+""".split())
+
+# 信号 payload 中可能包含文本的字段
+TEXT_FIELDS = ('text', 'title', 'headline', 'description', 'question')
+
+
+def tokenize(text: str) -> List[str]:
+    """小写分词，去掉停用词与单字符英文词"""
+    return [
+        t for t in TOKEN_RE.findall(text.lower())
+        if t not in STOPWORDS and (len(t) > 1 or not t.isascii())
+    ]
+
+
+def payload_text(payload: Dict) -> str:
+    """拼接信号 payload 中的文本字段"""
+    return ' '.join(str(payload[f]) for f in TEXT_FIELDS if payload.get(f))
+
+
+class MarketLinker:
+    """
+    BM25 倒排索引
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, min_score: float = 5.0,
+                 max_df_ratio: float = 0.2):
+        self.k1 = k1
+        self.b = b
+        self.min_score = min_score        # 低于该分数不认为关联
+        self.max_df_ratio = max_df_ratio  # 出现在过多市场中的词不参与检索
+
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_texts: Dict[str, str] = {}
+        self.questions: Dict[str, str] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @staticmethod
+    def document_text(record: MarketRecord) -> str:
+        parts = [record.question, record.group_item_title, record.event_title]
+        return ' '.join(p for p in parts if p)
+
+    def add(self, market_id: str, text: str, question: str = ""):
+        """加入或更新一个市场"""
+        if self.doc_texts.get(market_id) == text:
+            return
+        self.remove(market_id)
+
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+
+        for token, tf in counts.items():
+            self.postings.setdefault(token, {})[market_id] = tf
+
+        self.doc_lengths[market_id] = len(tokens)
+        self.doc_texts[market_id] = text
+        self.questions[market_id] = question or text
+        self.total_length += len(tokens)
+
+    def remove(self, market_id: str):
+        text = self.doc_texts.pop(market_id, None)
+        if text is None:
+            return
+
+        for token in set(tokenize(text)):
+            docs = self.postings.get(token)
+            if docs is not None:
+                docs.pop(market_id, None)
+                if not docs:
+                    del self.postings[token]
+
+        self.total_length -= self.doc_lengths.pop(market_id)
+        self.questions.pop(market_id, None)
+
+    def sync(self, records: Iterable[MarketRecord]) -> Dict[str, int]:
+        """
+        与目录同步: 新增/变化的市场重建，消失的市场移除
+        """
+        seen = set()
+        added = 0
+        for record in records:
+            seen.add(record.market_id)
+            text = self.document_text(record)
+            if self.doc_texts.get(record.market_id) != text:
+                self.add(record.market_id, text, record.question)
+                added += 1
+
+        gone = [m for m in self.doc_texts if m not in seen]
+        for market_id in gone:
+            self.remove(market_id)
+
+        return {'updated': added, 'removed': len(gone), 'total': len(self)}
+
+    def sync_catalog(self, catalog: MarketCatalog) -> Dict[str, int]:
+        return self.sync(catalog.markets.values())
+
+    def search(self, text: str, k: int = 5) -> List[Tuple[str, float]]:
+        """返回得分最高的 k 个 (market_id, score)"""
+        n = len(self.doc_lengths)
+        if n == 0:
+            return []
+
+        avgdl = self.total_length / n
+        max_df = max(1, int(n * self.max_df_ratio))
+        scores: Dict[str, float] = {}
+
+        for token in set(tokenize(text)):
+            docs = self.postings.get(token)
+            if not docs or len(docs) > max_df:
+                continue
+
+            df = len(docs)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for market_id, tf in docs.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[market_id] / avgdl)
+                scores[market_id] = scores.get(market_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        return ranked[:k]
+
+    def link(self, text: str) -> Optional[Tuple[str, float]]:
+        """返回最佳匹配市场，分数不足返回 None"""
+        candidates = self.search(text, k=1)
+        if candidates and candidates[0][1] >= self.min_score:
+            return candidates[0]
+        return None
@@ -2,13 +2,18 @@
 """
 Polymarket 实时市场监控器
 监控特定市场和整体市场动态
+关注列表与热门市场都从本地搜索索引 (market_search) 查询，覆盖全量目录；
+索引过期时才同步一次市场目录
 """
 
 import os
 import json
 import time
+import asyncio
 from datetime import datetime
-import requests
+
+from market_catalog import MarketCatalog
+from market_search import MarketSearchIndex
 
 class MarketMonitor:
     """
@@ -17,7 +22,6 @@ class MarketMonitor:
     
     def __init__(self):
         self.api_key = os.getenv("POLYMARKET_API_KEY")
-        self.gamma_url = "https://gamma-api.polymarket.com"
         self.watchlist = [
             "Will Trump",
             "Bitcoin",
@@ -27,31 +31,29 @@ class MarketMonitor:
             "Election"
         ]
         self.history_file = "market_history.json"
+        self.search_index = MarketSearchIndex()
+        self.index_max_age = 600  # 索引在该时间内同步过 (本脚本或 data_integration_hub) 就不再拉取目录
+        
+    def refresh_index(self) -> int:
+        """
+        索引过期时同步市场目录，返回索引中的市场数
+        同步失败时继续使用已有索引
+        """
+        if self.search_index.age() > self.index_max_age:
+            try:
+                catalog = MarketCatalog()
+                asyncio.run(catalog.sync())
+                self.search_index.sync_catalog(catalog)
+            except Exception as e:
+                print(f"❌ 同步市场目录失败: {e}")
+        return self.search_index.count()
         
     def fetch_market_by_keyword(self, keyword: str) -> list:
         """
-        根据关键词获取市场
+        根据关键词获取市场 (全文索引，按交易量排序)
         """
         try:
-            url = f"{self.gamma_url}/markets"
-            params = {
-                "closed": "false",
-                "active": "true",
-                "limit": 50
-            }
-            
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            
-            markets = response.json()
-            # 过滤包含关键词的市场
-            filtered = [
-                m for m in markets 
-                if keyword.lower() in m.get("question", "").lower()
-            ]
-            
-            return filtered[:10]  # 返回前10个
-            
+            return self.search_index.search(keyword, limit=10, order='volume')
         except Exception as e:
             print(f"❌ 获取市场失败: {e}")
             return []
@@ -61,19 +63,7 @@ class MarketMonitor:
         获取热门市场
         """
         try:
-            url = f"{self.gamma_url}/markets"
-            params = {
-                "closed": "false",
-                "limit": 20,
-                "order": "volume",  # 按交易量排序
-                "sort": "desc"
-            }
-            
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            
-            return response.json()
-            
+            return self.search_index.top(limit=20, order='volume')
         except Exception as e:
             print(f"❌ 获取热门市场失败: {e}")
             return []
@@ -200,6 +190,9 @@ class MarketMonitor:
         print("=" * 70)
         print()
         
+        print("🔎 正在检查市场索引...")
+        print(f"✅ 索引中共 {self.refresh_index()} 个市场\n")
+        
         # 获取热门市场
         print("🔥 正在获取热门市场...")
         trending = self.fetch_trending_markets()
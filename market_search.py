@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+本地市场搜索索引
+- SQLite FTS5 (porter 词干) 索引 问题 / 标签 / 事件标题 / 描述，bm25 加权排序，
+  election 与 elections 互相匹配
+- 标签与分类另建普通索引，可单独或与关键词组合过滤
+- sync_catalog() 与 MarketCatalog 增量同步: 价格/成交量每次更新，文本变化的市场才重建全文索引行，
+  消失的市场删除；目录为空或相比索引骤减时拒绝同步，保留现有索引
+- 查询只读本地库，不请求接口
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from market_catalog import CatalogFetchError, MarketCatalog, MarketRecord
+
+logger = logging.getLogger(__name__)
+
+MARKET_SEARCH_DB = "data/market_search.db"
+
+# bm25 列权重: question, tags, event_title, description
+COLUMN_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+
+def market_tags(record: MarketRecord) -> List[str]:
+    """市场与所属事件的标签 (Gamma 返回 [{'label':..., 'slug':...}] 或字符串)"""
+    tags = []
+    sources = [record.raw.get('tags') or []]
+    for event in record.raw.get('events') or []:
+        if isinstance(event, dict):
+            sources.append(event.get('tags') or [])
+    for source in sources:
+        for tag in source:
+            label = tag.get('label') or tag.get('slug') if isinstance(tag, dict) else tag
+            if label and str(label) not in tags:
+                tags.append(str(label))
+    return tags
+
+
+def match_expression(keyword: str) -> Optional[str]:
+    """关键词 → FTS5 短语查询 (去掉 FTS 语法字符，避免用户输入被当成运算符)"""
+    tokens = re.findall(r'\w+', keyword.lower())
+    if not tokens:
+        return None
+    return '"' + ' '.join(tokens) + '"'
+
+
+class MarketSearchIndex:
+    """
+    市场全文索引
+    """
+
+    ORDERS = {
+        'rank': 'score',
+        'volume': 'm.volume DESC',
+        'liquidity': 'm.liquidity DESC',
+        'end_date': "m.end_date = '', m.end_date",
+    }
+
+    def __init__(self, db_path: str = MARKET_SEARCH_DB, min_ratio: float = 0.5):
+        self.db_path = db_path
+        self.min_ratio = min_ratio   # 目录市场数低于索引的该比例时视为不完整
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS markets (
+                id INTEGER PRIMARY KEY,
+                market_id TEXT UNIQUE NOT NULL,
+                question TEXT,
+                category TEXT,
+                event_slug TEXT,
+                volume REAL,
+                liquidity REAL,
+                end_date TEXT,
+                text_hash TEXT,
+                data TEXT,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_markets_category ON markets (category COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_markets_volume ON markets (volume);
+
+            CREATE TABLE IF NOT EXISTS market_tags (
+                tag TEXT NOT NULL COLLATE NOCASE,
+                market_id TEXT NOT NULL,
+                PRIMARY KEY (tag, market_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_market_tags_market ON market_tags (market_id);
+
+            CREATE VIRTUAL TABLE IF NOT EXISTS market_fts USING fts5(
+                question, tags, event_title, description, tokenize='porter unicode61'
+            );
+
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value REAL
+            );
+        """)
+        self.conn.commit()
+
+    # ---------- 同步 ----------
+
+    @staticmethod
+    def _document(record: MarketRecord, tags: List[str]) -> Dict:
+        """报告直接使用的精简市场数据 (outcomes 带价格)"""
+        return {
+            'id': record.market_id,
+            'question': record.question,
+            'slug': record.slug,
+            'event_slug': record.event_slug,
+            'event_title': record.event_title,
+            'volume': record.volume,
+            'liquidity': record.liquidity,
+            'endDate': record.end_date,
+            'category': record.raw.get('category') or '',
+            'tags': tags,
+            'outcomes': [
+                {'name': name, 'price': record.prices[i] if i < len(record.prices) else 0.0}
+                for i, name in enumerate(record.outcomes)
+            ],
+        }
+
+    def sync(self, records: Iterable[MarketRecord]) -> Dict[str, int]:
+        """
+        与目录同步: 所有市场更新价格等字段，文本变化的重建全文索引，消失的删除
+        目录为空或市场数低于索引的 min_ratio 时抛出 CatalogFetchError，索引与同步时间保持不变
+        (每个进程的目录都是新建的，MarketCatalog 自身的缩水检查覆盖不到持久化的索引)
+        """
+        existing = {
+            market_id: (rowid, text_hash)
+            for rowid, market_id, text_hash in self.conn.execute("SELECT id, market_id, text_hash FROM markets")
+        }
+        unique = {}
+        for record in records:
+            if record.market_id and record.market_id not in unique:
+                unique[record.market_id] = record
+        if not unique or len(unique) < len(existing) * self.min_ratio:
+            raise CatalogFetchError(f"目录只有 {len(unique)} 个市场 (索引中 {len(existing)} 个)，拒绝同步")
+
+        now = time.time()
+        seen = set(unique)
+        updated = 0
+
+        with self.conn:
+            for record in unique.values():
+                tags = market_tags(record)
+                description = record.raw.get('description') or ''
+                event_title = ' '.join(p for p in (record.group_item_title, record.event_title) if p)
+                text = (record.question, ' '.join(tags), event_title, description)
+                text_hash = hashlib.sha1('\x1f'.join(text).encode()).hexdigest()
+                document = self._document(record, tags)
+
+                row = (record.question, document['category'], record.event_slug, record.volume,
+                       record.liquidity, record.end_date, text_hash, json.dumps(document, ensure_ascii=False), now)
+                previous = existing.get(record.market_id)
+                if previous is None:
+                    rowid = self.conn.execute(
+                        "INSERT INTO markets (question, category, event_slug, volume, liquidity, end_date, "
+                        "text_hash, data, updated_at, market_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        row + (record.market_id,)
+                    ).lastrowid
+                else:
+                    rowid = previous[0]
+                    self.conn.execute(
+                        "UPDATE markets SET question=?, category=?, event_slug=?, volume=?, liquidity=?, "
+                        "end_date=?, text_hash=?, data=?, updated_at=? WHERE id=?",
+                        row + (rowid,)
+                    )
+                    if previous[1] == text_hash:
+                        continue
+                    self.conn.execute("DELETE FROM market_fts WHERE rowid=?", (rowid,))
+                    self.conn.execute("DELETE FROM market_tags WHERE market_id=?", (record.market_id,))
+
+                self.conn.execute(
+                    "INSERT INTO market_fts (rowid, question, tags, event_title, description) VALUES (?, ?, ?, ?, ?)",
+                    (rowid,) + text
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO market_tags (tag, market_id) VALUES (?, ?)",
+                    [(tag, record.market_id) for tag in tags]
+                )
+                updated += 1
+
+            gone = [(market_id, rowid) for market_id, (rowid, _) in existing.items() if market_id not in seen]
+            self.conn.executemany("DELETE FROM market_fts WHERE rowid=?", [(rowid,) for _, rowid in gone])
+            self.conn.executemany("DELETE FROM market_tags WHERE market_id=?", [(m,) for m, _ in gone])
+            self.conn.executemany("DELETE FROM markets WHERE id=?", [(rowid,) for _, rowid in gone])
+            self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('synced_at', ?)", (now,))
+
+        return {'updated': updated, 'removed': len(gone), 'total': len(seen)}
+
+    def sync_catalog(self, catalog: MarketCatalog) -> Dict[str, int]:
+        stats = self.sync(catalog.markets.values())
+        logger.info(f"🔎 搜索索引: 更新 {stats['updated']} | 移除 {stats['removed']} | 共 {stats['total']}")
+        return stats
+
+    def age(self) -> float:
+        """距上次同步的秒数 (从未同步为 inf)"""
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key='synced_at'").fetchone()
+        return time.time() - row[0] if row else float('inf')
+
+    # ---------- 查询 ----------
+
+    def search(self, keyword: Optional[str] = None, tag: Optional[str] = None,
+               category: Optional[str] = None, limit: int = 10, order: str = 'rank') -> List[Dict]:
+        """
+        关键词 / 标签 / 分类 组合查询，返回市场数据 (附 score，仅关键词查询时有意义)
+        order: rank (bm25 相关度) / volume / liquidity / end_date
+        """
+        where, params = [], []
+        expression = match_expression(keyword) if keyword else None
+        if keyword and expression is None:
+            return []
+
+        if expression:
+            source = "market_fts JOIN markets m ON m.id = market_fts.rowid"
+            score = f"bm25(market_fts, {', '.join(map(str, COLUMN_WEIGHTS))})"
+            where.append("market_fts MATCH ?")
+            params.append(expression)
+        else:
+            source = "markets m"
+            score = "0.0"
+            if order == 'rank':
+                order = 'volume'
+
+        if tag:
+            where.append("m.market_id IN (SELECT market_id FROM market_tags WHERE tag = ?)")
+            params.append(tag)
+        if category:
+            where.append("m.category = ? COLLATE NOCASE")
+            params.append(category)
+
+        sql = f"SELECT m.data, {score} AS score FROM {source}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {self.ORDERS.get(order, 'score')}, m.volume DESC LIMIT ?"
+        params.append(limit)
+
+        results = []
+        for data, score in self.conn.execute(sql, params):
+            market = json.loads(data)
+            market['score'] = round(-score, 4)   # bm25 越小越相关，取反后越大越相关
+            results.append(market)
+        return results
+
+    def top(self, limit: int = 20, order: str = 'volume') -> List[Dict]:
+        """全目录按成交量 (或流动性) 排序"""
+        return self.search(limit=limit, order=order)
+
+    def tags(self, limit: int = 50) -> List[Dict]:
+        """市场数最多的标签"""
+        rows = self.conn.execute(
+            "SELECT tag, COUNT(*) AS n FROM market_tags GROUP BY tag COLLATE NOCASE ORDER BY n DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [{'tag': tag, 'markets': n} for tag, n in rows]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM markets").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
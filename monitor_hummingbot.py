@@ -2,57 +2,340 @@
 """
 Hummingbot 监控脚本
 实时监控做市表现
+
+数据来源 (优先级从高到低):
+1. hummingbot_data/*.sqlite 中的 TradeFill / Order 表，按 rowid 增量读取
+2. hummingbot_logs/*.log 中的下单与成交日志，按字节偏移增量读取
+
+成交解析为结构化记录后按交易对累计 持仓 / 成本 / 已实现与未实现盈亏 /
+成交率 / 买卖价差收益，每分钟只处理新增部分。
 """
 
-import json
+import re
 import time
+import sqlite3
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
-def monitor_performance():
-    """监控 Hummingbot 表现"""
-    
+from log_tailer import FileTailer
+
+# 2024-01-01 12:00:00,123 - 1234 - hummingbot.xxx - INFO - message
+LOG_LINE_RE = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})[,.]?\d* - \d+ - \S+ - (\w+) - (.*)$')
+CREATED_RE = re.compile(r'Created (\S+) (BUY|SELL) order (\S+) for ([\d.]+) (\S+) at ([\d.]+)')
+FILLED_RE = re.compile(r'The (BUY|SELL) order (\S+) amounting to ([\d.]+)/([\d.]+) (\S+) has been filled at ([\d.]+)')
+
+
+@dataclass
+class Fill:
+    """一笔成交"""
+    timestamp: float
+    market: str
+    side: str
+    amount: float
+    price: float
+    order_id: str = ""
+    fee: float = 0.0
+
+
+@dataclass
+class MarketStats:
+    """单个交易对的累计表现 (平均成本法)"""
+    market: str
+    orders: int = 0
+    fills: int = 0
+    buy_volume: float = 0.0
+    sell_volume: float = 0.0
+    buy_notional: float = 0.0
+    sell_notional: float = 0.0
+    position: float = 0.0
+    avg_cost: float = 0.0
+    realized_pnl: float = 0.0
+    fees: float = 0.0
+    last_price: float = 0.0
+
+    def apply(self, fill: Fill):
+        self.fills += 1
+        self.fees += fill.fee
+        self.last_price = fill.price
+        signed = fill.amount if fill.side == 'BUY' else -fill.amount
+
+        if fill.side == 'BUY':
+            self.buy_volume += fill.amount
+            self.buy_notional += fill.amount * fill.price
+        else:
+            self.sell_volume += fill.amount
+            self.sell_notional += fill.amount * fill.price
+
+        if self.position == 0 or (self.position > 0) == (signed > 0):
+            # 加仓: 更新平均成本
+            total = abs(self.position) + fill.amount
+            self.avg_cost = (abs(self.position) * self.avg_cost + fill.amount * fill.price) / total
+            self.position += signed
+            return
+
+        # 减仓 / 反手: 平掉的部分计入已实现盈亏
+        closed = min(abs(self.position), fill.amount)
+        direction = 1 if self.position > 0 else -1
+        self.realized_pnl += closed * (fill.price - self.avg_cost) * direction
+        self.position += signed
+        if abs(self.position) < 1e-12:
+            self.position = 0.0
+            self.avg_cost = 0.0
+        elif (self.position > 0) != (direction > 0):
+            self.avg_cost = fill.price
+
+    @property
+    def unrealized_pnl(self) -> float:
+        return self.position * (self.last_price - self.avg_cost)
+
+    @property
+    def total_pnl(self) -> float:
+        return self.realized_pnl + self.unrealized_pnl - self.fees
+
+    @property
+    def fill_rate(self) -> Optional[float]:
+        return self.fills / self.orders if self.orders else None
+
+    @property
+    def spread_captured(self) -> Optional[float]:
+        """平均卖价 - 平均买价"""
+        if not self.buy_volume or not self.sell_volume:
+            return None
+        return self.sell_notional / self.sell_volume - self.buy_notional / self.buy_volume
+
+
+class PerformanceTracker:
+    """
+    按交易对汇总成交表现
+    """
+
+    def __init__(self, recent: int = 5):
+        self.markets: Dict[str, MarketStats] = {}
+        self.order_markets: Dict[str, str] = {}  # client_order_id → 交易对
+        self.errors = 0
+        self.recent_fills = deque(maxlen=recent)
+
+    def stats(self, market: str) -> MarketStats:
+        if market not in self.markets:
+            self.markets[market] = MarketStats(market)
+        return self.markets[market]
+
+    def add_order(self, order_id: str, market: str):
+        self.order_markets[order_id] = market
+        self.stats(market).orders += 1
+
+    def add_fill(self, fill: Fill):
+        self.stats(fill.market).apply(fill)
+        self.recent_fills.append(fill)
+
+    def feed_log_line(self, line: str, orders: bool = True):
+        """解析一行 Hummingbot 日志；orders=False 时只统计错误"""
+        match = LOG_LINE_RE.match(line)
+        if not match:
+            return
+        stamp, level, message = match.groups()
+
+        if level in ('ERROR', 'CRITICAL'):
+            self.errors += 1
+        if not orders:
+            return
+
+        created = CREATED_RE.search(message)
+        if created:
+            _, _, order_id, _, market, _ = created.groups()
+            self.add_order(order_id, market)
+            return
+
+        filled = FILLED_RE.search(message)
+        if filled:
+            side, order_id, amount, _, _, price = filled.groups()
+            self.add_fill(Fill(
+                timestamp=datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S').timestamp(),
+                market=self.order_markets.get(order_id, 'unknown'),
+                side=side,
+                amount=float(amount),
+                price=float(price),
+                order_id=order_id
+            ))
+
+    def totals(self) -> Dict:
+        stats = list(self.markets.values())
+        orders = sum(s.orders for s in stats)
+        fills = sum(s.fills for s in stats)
+        return {
+            'orders': orders,
+            'fills': fills,
+            'fill_rate': fills / orders if orders else None,
+            'errors': self.errors,
+            'realized_pnl': sum(s.realized_pnl for s in stats),
+            'unrealized_pnl': sum(s.unrealized_pnl for s in stats),
+            'fees': sum(s.fees for s in stats),
+            'total_pnl': sum(s.total_pnl for s in stats)
+        }
+
+
+class TradeDBReader:
+    """
+    Hummingbot 交易数据库增量读取 (TradeFill / Order 表)
+    price / amount / trade_fee_in_quote 为 SqliteDecimal(6): 以 BIGINT 存放 数值×10^6，
+    旧版本数据库为 FLOAT 原值，按列声明类型决定是否缩放
+    """
+
+    DECIMAL_COLUMNS = ('price', 'amount', 'trade_fee_in_quote')
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.last_fill_rowid = 0
+        self.last_order_rowid = 0
+        self._scales: Optional[Dict[str, int]] = None   # 列名 → 除数 (列不存在时不含该键)
+
+    def _fill_scales(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        if self._scales is None:
+            columns = {r[1]: (r[2] or '').upper() for r in conn.execute("PRAGMA table_info(TradeFill)")}
+            self._scales = {
+                name: 10 ** 6 if 'INT' in columns[name] else 1
+                for name in self.DECIMAL_COLUMNS if name in columns
+            }
+        return self._scales
+
+    def read_fills(self, conn: sqlite3.Connection) -> List[Tuple[int, Fill]]:
+        """TradeFill 中 rowid 大于游标的成交 (不推进游标)"""
+        scales = self._fill_scales(conn)
+        fee = 'trade_fee_in_quote' if 'trade_fee_in_quote' in scales else '0'
+
+        fills = []
+        for rowid, symbol, ts, order_id, side, price, amount, fee_quote in conn.execute(
+            f"SELECT rowid, symbol, timestamp, order_id, trade_type, price, amount, {fee} "
+            f"FROM TradeFill WHERE rowid > ? ORDER BY rowid",
+            (self.last_fill_rowid,)
+        ):
+            fills.append((rowid, Fill(
+                timestamp=ts / 1000,
+                market=symbol,
+                side=side.upper(),
+                amount=float(amount) / scales['amount'],
+                price=float(price) / scales['price'],
+                order_id=order_id,
+                fee=float(fee_quote or 0) / scales.get('trade_fee_in_quote', 1)
+            )))
+        return fills
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def read(self, tracker: PerformanceTracker):
+        conn = self.connect()
+        try:
+            tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+            if 'Order' in tables:
+                for rowid, order_id, symbol in conn.execute(
+                    'SELECT rowid, id, symbol FROM "Order" WHERE rowid > ? ORDER BY rowid',
+                    (self.last_order_rowid,)
+                ):
+                    tracker.add_order(order_id, symbol)
+                    self.last_order_rowid = rowid
+
+            if 'TradeFill' in tables:
+                for rowid, fill in self.read_fills(conn):
+                    tracker.add_fill(fill)
+                    self.last_fill_rowid = rowid
+        finally:
+            conn.close()
+
+
+class HummingbotMonitor:
+    """
+    增量监控: 每轮只处理新增的日志行与数据库记录
+    """
+
+    def __init__(self, log_dir: str = "hummingbot_files/hummingbot_logs",
+                 data_dir: str = "hummingbot_files/hummingbot_data"):
+        self.log_dir = Path(log_dir)
+        self.data_dir = Path(data_dir)
+        self.tracker = PerformanceTracker()
+        self.tailers: Dict[Path, FileTailer] = {}
+        self.db_readers: Dict[Path, TradeDBReader] = {}
+
+    def update(self) -> List[Path]:
+        """读取新增数据，返回当前监控的日志文件"""
+        for db in self.data_dir.glob("*.sqlite") if self.data_dir.exists() else []:
+            if db not in self.db_readers:
+                self.db_readers[db] = TradeDBReader(db)
+            try:
+                self.db_readers[db].read(self.tracker)
+            except sqlite3.Error as e:
+                print(f"⚠️ 读取 {db.name} 失败: {e}")
+
+        # 有交易数据库时日志只用于统计错误，避免重复计数
+        parse_orders = not self.db_readers
+
+        log_files = list(self.log_dir.glob("*.log")) if self.log_dir.exists() else []
+        for path in log_files:
+            if path not in self.tailers:
+                self.tailers[path] = FileTailer(path)
+            for line in self.tailers[path].read_lines():
+                self.tracker.feed_log_line(line, orders=parse_orders)
+
+        return log_files
+
+
+def print_performance(monitor: HummingbotMonitor, log_files: List[Path]):
+    """打印当前累计表现"""
     print("📊 Hummingbot 性能监控")
     print("=" * 50)
-    
-    log_dir = Path("hummingbot_files/hummingbot_logs")
-    
-    if not log_dir.exists():
-        print("❌ 日志目录不存在，Hummingbot 可能未运行")
-        return
-    
-    # 读取最新日志
-    log_files = list(log_dir.glob("*.log"))
-    
-    if not log_files:
-        print("⏳ 暂无日志文件")
+
+    if not log_files and not monitor.db_readers:
+        print("❌ 暂无日志或交易数据库，Hummingbot 可能未运行")
         return
-    
-    latest_log = max(log_files, key=lambda p: p.stat().st_mtime)
-    
-    print(f"📄 监控日志: {latest_log.name}")
-    print(f"⏰ 更新时间: {datetime.fromtimestamp(latest_log.stat().st_mtime)}")
-    
-    # 统计关键指标
-    with open(latest_log, 'r') as f:
-        lines = f.readlines()
-    
-    fills = [l for l in lines if 'filled' in l.lower()]
-    orders = [l for l in lines if 'order' in l.lower()]
-    errors = [l for l in lines if 'error' in l.lower()]
-    
+
+    if log_files:
+        latest_log = max(log_files, key=lambda p: p.stat().st_mtime)
+        print(f"📄 监控日志: {latest_log.name} (共 {len(log_files)} 个)")
+        print(f"⏰ 更新时间: {datetime.fromtimestamp(latest_log.stat().st_mtime)}")
+    if monitor.db_readers:
+        print(f"🗄️ 交易数据库: {', '.join(p.name for p in monitor.db_readers)}")
+
+    totals = monitor.tracker.totals()
+    fill_rate = f"{totals['fill_rate']:.1%}" if totals['fill_rate'] is not None else "N/A"
+
     print(f"\n📈 统计:")
-    print(f"   总订单: {len(orders)}")
-    print(f"   成交: {len(fills)}")
-    print(f"   错误: {len(errors)}")
-    
-    if fills:
+    print(f"   总订单: {totals['orders']}")
+    print(f"   成交: {totals['fills']} (成交率 {fill_rate})")
+    print(f"   错误: {totals['errors']}")
+    print(f"   已实现盈亏: ${totals['realized_pnl']:.2f}")
+    print(f"   未实现盈亏: ${totals['unrealized_pnl']:.2f}")
+    print(f"   手续费: ${totals['fees']:.2f}")
+    print(f"   净盈亏: ${totals['total_pnl']:.2f}")
+
+    if monitor.tracker.markets:
+        print(f"\n💼 分市场:")
+        for stats in sorted(monitor.tracker.markets.values(), key=lambda s: -s.fills):
+            spread = f"{stats.spread_captured:.4f}" if stats.spread_captured is not None else "N/A"
+            print(f"   {stats.market}: 成交 {stats.fills}/{stats.orders} | 库存 {stats.position:.2f} "
+                  f"@ {stats.avg_cost:.4f} | 价差收益 {spread} | 盈亏 ${stats.total_pnl:.2f}")
+
+    if monitor.tracker.recent_fills:
         print(f"\n✅ 最近成交:")
-        for fill in fills[-3:]:
-            print(f"   {fill.strip()}")
+        for fill in monitor.tracker.recent_fills:
+            print(f"   {datetime.fromtimestamp(fill.timestamp):%H:%M:%S} {fill.market} "
+                  f"{fill.side} {fill.amount} @ {fill.price}")
+
+
+def monitor_performance(monitor: Optional[HummingbotMonitor] = None) -> HummingbotMonitor:
+    """监控 Hummingbot 表现"""
+    monitor = monitor or HummingbotMonitor()
+    log_files = monitor.update()
+    print_performance(monitor, log_files)
+    return monitor
+
 
 if __name__ == "__main__":
+    monitor = HummingbotMonitor()
     while True:
-        monitor_performance()
+        monitor_performance(monitor)
         print(f"\n⏳ {datetime.now().strftime('%H:%M:%S')} - 等待 60 秒...")
         time.sleep(60)
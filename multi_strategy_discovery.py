@@ -17,9 +17,11 @@ import asyncio
 import aiohttp
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from dataclasses import dataclass
 
+from opportunity_pipeline import TopK, merge_top_k, log_opportunity
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -54,6 +56,7 @@ class MultiStrategyDiscovery:
         self.api_key = os.getenv("POLYMARKET_API_KEY")
         self.gamma_url = "https://gamma-api.polymarket.com"
         self.all_opportunities = []
+        self.top_k = 20  # 报告保留的最佳机会数
         
         # 策略参数（进一步优化）
         self.params = {
@@ -314,50 +317,42 @@ class MultiStrategyDiscovery:
         markets = await self.fetch_markets()
         logger.info(f"📊 获取到 {len(markets)} 个市场")
         
-        all_opportunities = []
+        # 每个策略一个有界堆，只保留期望收益最高的 top_k 个
+        strategies = [
+            ('IEA', '不可能事件套利 (IEA)', self.strategy_iea),
+            ('Value', '价值发现 (Value)', self.strategy_value),
+            ('Liquid', '高流动性套利 (Liquid)', self.strategy_liquid)
+        ]
+        heaps = {}
         
-        # 并行运行3种策略
-        logger.info("\n🎯 运行策略1: 不可能事件套利 (IEA)")
-        iea_count = 0
-        for market in markets:
-            opps = self.strategy_iea(market)
-            all_opportunities.extend(opps)
-            iea_count += len(opps)
-        logger.info(f"   发现 {iea_count} 个机会")
+        for i, (name, label, strategy) in enumerate(strategies, 1):
+            logger.info(f"\n🎯 运行策略{i}: {label}")
+            heap = TopK(self.top_k, key=lambda x: x.expected_return)
+            heap.extend(self._iter_strategy(strategy, markets))
+            heaps[name] = heap
+            logger.info(f"   发现 {heap.total} 个机会")
         
-        logger.info("\n🎯 运行策略2: 价值发现 (Value)")
-        value_count = 0
-        for market in markets:
-            opps = self.strategy_value(market)
-            all_opportunities.extend(opps)
-            value_count += len(opps)
-        logger.info(f"   发现 {value_count} 个机会")
-        
-        logger.info("\n🎯 运行策略3: 高流动性套利 (Liquid)")
-        liquid_count = 0
-        for market in markets:
-            opps = self.strategy_liquid(market)
-            all_opportunities.extend(opps)
-            liquid_count += len(opps)
-        logger.info(f"   发现 {liquid_count} 个机会")
-        
-        # 排序：按期望收益
-        all_opportunities.sort(key=lambda x: x.expected_return, reverse=True)
+        # 合并各策略 Top-K：按期望收益
+        top_opportunities = merge_top_k(heaps.values(), self.top_k, key=lambda x: x.expected_return)
         
         results = {
             'timestamp': datetime.now().isoformat(),
             'markets_scanned': len(markets),
-            'total_opportunities': len(all_opportunities),
-            'by_strategy': {
-                'IEA': iea_count,
-                'Value': value_count,
-                'Liquid': liquid_count
-            },
-            'top_opportunities': [self._opp_to_dict(opp) for opp in all_opportunities[:20]]
+            'total_opportunities': sum(heap.total for heap in heaps.values()),
+            'by_strategy': {name: heap.total for name, heap in heaps.items()},
+            'top_opportunities': [self._opp_to_dict(opp) for opp in top_opportunities]
         }
         
         return results
     
+    def _iter_strategy(self, strategy, markets: List[Dict]) -> Iterator[Opportunity]:
+        """逐个产出某个策略在所有市场上的机会"""
+        for market in markets:
+            for opp in strategy(market):
+                log_opportunity(logger, "   [%s] %s %s @ %.1f%%",
+                                opp.strategy, opp.question, opp.outcome, opp.current_price * 100)
+                yield opp
+    
     def _opp_to_dict(self, opp: Opportunity) -> Dict:
         """转换Opportunity为字典"""
         return {
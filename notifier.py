@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+后台通知分发
+- notify() 只把消息放入各渠道队列，不等待网络，监控循环不会被慢 webhook 阻塞
+- 每个渠道一个后台任务: 聚合 coalesce_window 内的突发消息为一条汇总 (Discord 多个 embed / Telegram 拼接文本)
+- 令牌桶按渠道限速 (Discord webhook 约 5 次/2 秒，Telegram 单聊天约 1 次/秒)
+- 429 按服务器给出的 retry_after 等待，5xx 与网络错误指数退避重试，其他 4xx 直接放弃
+- 所有渠道共用一个连接池会话
+
+本地压测: python notifier.py --bench 500 (启动模拟 Discord webhook，含 429 限流)
+"""
+
+import time
+import random
+import asyncio
+import logging
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime
+from html import escape
+from typing import Dict, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TokenBucket:
+    """令牌桶: 每秒补充 rate 个令牌，最多积攒 capacity 个"""
+    rate: float
+    capacity: float
+    tokens: float = field(default=-1.0)
+    updated: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self):
+        if self.tokens < 0:
+            self.tokens = self.capacity
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """服务器要求等待时清空令牌，seconds 后才恢复"""
+        self._refill()
+        self.tokens = -seconds * self.rate
+
+
+class Channel:
+    """
+    通知渠道基类
+    子类给出 URL、单条汇总最多包含的消息数、限速参数，以及把一批消息格式化为请求体
+    """
+
+    name = 'channel'
+    max_batch = 10
+    ok_status = (200, 204)
+
+    def __init__(self, rate: float, burst: float):
+        self.bucket = TokenBucket(rate, burst)
+
+    @property
+    def url(self) -> str:
+        raise NotImplementedError
+
+    def payload(self, messages: List[Dict]) -> Dict:
+        raise NotImplementedError
+
+    def split(self, messages: List[Dict]) -> List[List[Dict]]:
+        """一批消息超出单个请求的限制时拆成多次发送"""
+        return [messages]
+
+    @staticmethod
+    def retry_after(response: aiohttp.ClientResponse, body: Dict) -> float:
+        """429 时服务器要求等待的秒数"""
+        value = body.get('retry_after') or (body.get('parameters') or {}).get('retry_after')
+        if value is None:
+            value = response.headers.get('Retry-After', 1)
+        try:
+            return max(float(value), 0.0)
+        except (TypeError, ValueError):
+            return 1.0
+
+
+class DiscordChannel(Channel):
+    """Discord webhook: 一条消息最多 10 个 embed，所有 embed 的文本合计不超过 6000 字符"""
+
+    name = 'discord'
+    max_batch = 10
+    max_embed_chars = 6000
+
+    def __init__(self, webhook_url: str, rate: float = 2.5, burst: float = 5):
+        super().__init__(rate, burst)
+        self.webhook_url = webhook_url
+
+    @property
+    def url(self) -> str:
+        return self.webhook_url
+
+    @staticmethod
+    def embed(m: Dict) -> Dict:
+        """单个 embed (各字段按 Discord 的单项上限截断，单个 embed 不会超过总上限)"""
+        return {
+            "title": m.get('title', 'New Signal')[:256],
+            "description": m.get('description', '')[:2048],
+            "color": 3447003,
+            "fields": [
+                {"name": "Source", "value": str(m.get('source', 'Unknown'))[:1024], "inline": True},
+                {"name": "Confidence", "value": f"{m.get('confidence', 0)}/100", "inline": True},
+                {"name": "Time", "value": m['time'], "inline": False}
+            ]
+        }
+
+    @staticmethod
+    def embed_chars(embed: Dict) -> int:
+        """Discord 计入 6000 上限的字符数: 标题、描述、字段名与值"""
+        return (len(embed['title']) + len(embed['description'])
+                + sum(len(f['name']) + len(f['value']) for f in embed['fields']))
+
+    def split(self, messages: List[Dict]) -> List[List[Dict]]:
+        """按顺序装入，合计字符数将超过上限时开始新的一条"""
+        parts: List[List[Dict]] = []
+        chars = 0
+        for m in messages:
+            size = self.embed_chars(self.embed(m))
+            if not parts or chars + size > self.max_embed_chars:
+                parts.append([])
+                chars = 0
+            parts[-1].append(m)
+            chars += size
+        return parts
+
+    def payload(self, messages: List[Dict]) -> Dict:
+        content = "🚨 **交易信号 detected!**" if len(messages) == 1 else f"🚨 **{len(messages)} 条交易信号**"
+        return {"content": content, "embeds": [self.embed(m) for m in messages]}
+
+
+class TelegramChannel(Channel):
+    """Telegram bot: 多条消息拼接为一条，文本上限 4096 字符"""
+
+    name = 'telegram'
+    max_batch = 20
+    max_length = 4096
+
+    def __init__(self, bot_token: str, chat_id: str, rate: float = 1.0, burst: float = 3,
+                 api_url: str = "https://api.telegram.org"):
+        super().__init__(rate, burst)
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.api_url = api_url.rstrip('/')
+
+    @property
+    def url(self) -> str:
+        return f"{self.api_url}/bot{self.bot_token}/sendMessage"
+
+    # 单条消息上限，留出汇总标题与分隔符的位置
+    max_part = max_length - 100
+
+    @classmethod
+    def _format(cls, m: Dict) -> str:
+        """单条消息的 HTML 文本，描述按转义后的长度截断，整条不超过 max_part"""
+        head = f"<b>{escape(m.get('title', 'New Signal')[:256])}</b>\n"
+        tail = (f"\nSource: {escape(str(m.get('source', 'Unknown'))[:256])} | "
+                f"Confidence: {m.get('confidence', 0)}/100 | {m['time']}")
+        budget = cls.max_part - len(head) - len(tail)
+        description = m.get('description', '')
+        if len(escape(description)) > budget:
+            # 截断原文再转义，避免切断 &amp; 等实体
+            description = description[:budget - 1]
+            while len(escape(description)) > budget - 1:
+                description = description[:-max(1, (len(escape(description)) - budget + 1) // 6)]
+            description += '…'
+        return head + escape(description) + tail
+
+    def split(self, messages: List[Dict]) -> List[List[Dict]]:
+        """按顺序装入，拼接后将超过上限时开始新的一条"""
+        parts: List[List[Dict]] = []
+        length = 0
+        for m in messages:
+            size = len(self._format(m)) + 2
+            if not parts or length + size > self.max_part:
+                parts.append([])
+                length = 0
+            parts[-1].append(m)
+            length += size
+        return parts
+
+    def payload(self, messages: List[Dict]) -> Dict:
+        header = "🚨 <b>交易信号 detected!</b>" if len(messages) == 1 else f"🚨 <b>{len(messages)} 条交易信号</b>"
+        text = "\n\n".join([header] + [self._format(m) for m in messages])
+        return {"chat_id": self.chat_id, "text": text, "parse_mode": "HTML"}
+
+
+class NotificationDispatcher:
+    """
+    通知分发器
+    """
+
+    def __init__(self, channels: List[Channel], coalesce_window: float = 2.0,
+                 max_queue: int = 1000, retries: int = 4, timeout: float = 15):
+        self.channels = channels
+        self.coalesce_window = coalesce_window   # 收到第一条后再等待该时间收集同批消息
+        self.max_queue = max_queue               # 队列满时丢弃最旧的消息
+        self.retries = retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.tasks: List[asyncio.Task] = []
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.stats = {c.name: {'queued': 0, 'sent': 0, 'requests': 0, 'retries': 0,
+                               'rate_limited': 0, 'dropped': 0, 'failed': 0} for c in channels}
+
+    @classmethod
+    def from_config(cls, config: Dict, **kwargs) -> 'NotificationDispatcher':
+        """按 data_integration_hub 的 discord / telegram 配置创建启用的渠道"""
+        channels: List[Channel] = []
+        discord = config.get('discord', {})
+        if discord.get('enabled') and discord.get('webhook_url'):
+            channels.append(DiscordChannel(discord['webhook_url']))
+        telegram = config.get('telegram', {})
+        if telegram.get('enabled') and telegram.get('bot_token') and telegram.get('chat_id'):
+            channels.append(TelegramChannel(telegram['bot_token'], telegram['chat_id']))
+        return cls(channels, **kwargs)
+
+    def start(self):
+        """在当前事件循环中启动各渠道的后台任务"""
+        if self.tasks:
+            return
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=8, keepalive_timeout=60),
+            timeout=self.timeout
+        )
+        for channel in self.channels:
+            self.queues[channel.name] = asyncio.Queue(maxsize=self.max_queue)
+            self.tasks.append(asyncio.create_task(self._worker(channel)))
+        if self.channels:
+            logger.info(f"📣 通知分发已启动: {', '.join(c.name for c in self.channels)}")
+
+    def notify(self, message: Dict):
+        """放入所有渠道的队列后立即返回"""
+        message = dict(message, time=message.get('time') or datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        for channel in self.channels:
+            queue = self.queues.get(channel.name)
+            if queue is None:
+                continue
+            if queue.full():
+                queue.get_nowait()
+                queue.task_done()
+                self.stats[channel.name]['dropped'] += 1
+            queue.put_nowait(message)
+            self.stats[channel.name]['queued'] += 1
+
+    async def _collect(self, channel: Channel, queue: asyncio.Queue) -> List[Dict]:
+        """等待第一条消息，再在 coalesce_window 内收集最多 max_batch 条"""
+        batch = [await queue.get()]
+        deadline = time.monotonic() + self.coalesce_window
+        while len(batch) < channel.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # 窗口内积压超过一批时，剩下的立即进入下一批
+        while len(batch) < channel.max_batch and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+
+    async def _send(self, channel: Channel, batch: List[Dict]) -> bool:
+        stats = self.stats[channel.name]
+        payload = channel.payload(batch)
+
+        for attempt in range(self.retries):
+            await channel.bucket.acquire()
+            stats['requests'] += 1
+            try:
+                async with self.session.post(channel.url, json=payload) as response:
+                    if response.status in channel.ok_status:
+                        return True
+                    if response.status == 429:
+                        try:
+                            body = await response.json(content_type=None)
+                        except ValueError:
+                            body = {}
+                        wait = channel.retry_after(response, body if isinstance(body, dict) else {})
+                        stats['rate_limited'] += 1
+                        channel.bucket.pause(wait)
+                        logger.warning(f"⚠️ {channel.name} 限流，{wait:.1f}s 后重试")
+                        continue
+                    if response.status < 500:
+                        logger.error(f"❌ {channel.name} 通知失败: {response.status} {await response.text()}")
+                        return False
+                    error = f"HTTP {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+
+            stats['retries'] += 1
+            delay = min(2 ** attempt, 30) * (0.5 + random.random())
+            logger.warning(f"⚠️ {channel.name} 通知失败 ({error})，{delay:.1f}s 后重试")
+            await asyncio.sleep(delay)
+        return False
+
+    async def _worker(self, channel: Channel):
+        queue = self.queues[channel.name]
+        stats = self.stats[channel.name]
+        while True:
+            batch = await self._collect(channel, queue)
+            try:
+                for part in channel.split(batch):
+                    try:
+                        if await self._send(channel, part):
+                            stats['sent'] += len(part)
+                            logger.info(f"✅ {channel.name} 通知已发送 ({len(part)} 条)")
+                        else:
+                            stats['failed'] += len(part)
+                    except Exception as e:
+                        stats['failed'] += len(part)
+                        logger.error(f"❌ 发送 {channel.name} 通知失败: {e}")
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def stop(self, drain: bool = True, timeout: float = 30):
+        """停止后台任务；drain 时先等待队列发送完毕 (最多 timeout 秒)"""
+        if drain and self.queues:
+            try:
+                await asyncio.wait_for(asyncio.gather(*(q.join() for q in self.queues.values())), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ 通知队列未在超时内发送完毕")
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.queues = {}
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+# ==========================================
+# 本地 webhook 模拟与压测
+# ==========================================
+async def run_stub_benchmark(messages: int = 500, burst_interval: float = 0.0,
+                             stub_rate: float = 2.5, stub_burst: int = 5, port: int = 8799) -> Dict:
+    """
+    启动模拟 Discord webhook (超过 stub_rate 时返回 429 + retry_after)，
+    推入 messages 条通知并统计请求数、限流次数与耗时
+    """
+    from aiohttp import web
+
+    received = {'requests': 0, 'embeds': 0, 'rejected': 0}
+    server_bucket = TokenBucket(stub_rate, stub_burst)
+
+    async def webhook(request: web.Request) -> web.Response:
+        body = await request.json()
+        server_bucket._refill()
+        if server_bucket.tokens < 1:
+            received['rejected'] += 1
+            return web.json_response({'retry_after': (1 - server_bucket.tokens) / stub_rate}, status=429)
+        server_bucket.tokens -= 1
+        received['requests'] += 1
+        received['embeds'] += len(body.get('embeds', []))
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_post('/webhook', webhook)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+
+    dispatcher = NotificationDispatcher(
+        [DiscordChannel(f"http://127.0.0.1:{port}/webhook")], coalesce_window=0.5, max_queue=messages
+    )
+    dispatcher.start()
+    start = time.perf_counter()
+    for i in range(messages):
+        dispatcher.notify({'title': f'Signal {i}', 'description': 'bench', 'source': 'bench', 'confidence': 80})
+        if burst_interval:
+            await asyncio.sleep(burst_interval)
+    enqueue_time = time.perf_counter() - start
+    await dispatcher.stop(drain=True, timeout=600)
+    elapsed = time.perf_counter() - start
+    await runner.cleanup()
+
+    return {
+        'messages': messages,
+        'enqueue_ms': round(enqueue_time * 1000, 2),
+        'elapsed_s': round(elapsed, 2),
+        'delivered': received['embeds'],
+        'requests': received['requests'],
+        'rejected_429': received['rejected'],
+        'stats': dispatcher.stats['discord'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="通知分发本地压测")
+    parser.add_argument('--bench', type=int, default=500, help="推送的消息数")
+    parser.add_argument('--interval', type=float, default=0.0, help="两条消息之间的间隔 (秒)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    result = asyncio.run(run_stub_benchmark(args.bench, args.interval))
+    print(f"📣 {result['messages']} 条消息，入队 {result['enqueue_ms']}ms，全部送达用时 {result['elapsed_s']}s")
+    print(f"   请求 {result['requests']} 次，送达 {result['delivered']} 条，429 {result['rejected_429']} 次")
+    print(f"   {result['stats']}")
+
+
+if __name__ == "__main__":
+    main()
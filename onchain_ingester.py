@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+链上日志增量采集
+- 持久化最后处理的区块，每轮只拉取新区块
+- 区块区间切块并发 get_logs，节点报结果过多/区间过大时自动减半，成功后逐步放大
+- 事件 data 批量解码 (NumPy)，按金额过滤后才查询区块时间
+- 区块时间戳带 LRU 缓存并发批量查询
+"""
+
+import os
+import json
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 节点对查询范围/结果数量的限制错误关键字
+RANGE_ERROR_HINTS = ('limit', 'too many', 'too large', 'range', 'exceed', 'response size', '-32005')
+
+
+def is_range_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(hint in message for hint in RANGE_ERROR_HINTS)
+
+
+def to_bytes(value) -> bytes:
+    """HexBytes / bytes / '0x..' 字符串统一为 bytes"""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    text = str(value)
+    return bytes.fromhex(text[2:] if text.startswith('0x') else text)
+
+
+def decode_words(datas: Iterable, n_words: int, first: int = 0) -> np.ndarray:
+    """
+    批量取出每条日志 data 中从第 first 个开始的 n_words 个 32 字节字
+    返回 (N, n_words, 32) 的 uint8 数组，长度不足的补零
+    """
+    size = n_words * 32
+    chunks = [to_bytes(data)[first * 32:first * 32 + size].ljust(size, b'\0') for data in datas]
+    if not chunks:
+        return np.zeros((0, n_words, 32), dtype=np.uint8)
+    return np.frombuffer(b''.join(chunks), dtype=np.uint8).reshape(-1, n_words, 32)
+
+
+def words_to_float(words: np.ndarray) -> np.ndarray:
+    """uint256 字 → float64；超出 uint64 的值记为 inf (远大于任何金额阈值)"""
+    overflow = words[..., :24].any(axis=-1)
+    low = np.ascontiguousarray(words[..., 24:]).view('>u8')[..., 0].astype(np.float64)
+    return np.where(overflow, np.inf, low)
+
+
+def words_to_int_strings(words: np.ndarray) -> List[str]:
+    """uint256 字 → 十进制字符串 (用于 256 位的 token id)"""
+    return [str(int.from_bytes(w.tobytes(), 'big')) for w in words.reshape(-1, 32)]
+
+
+def decode_uint256_words(datas: Iterable, word: int = 0) -> np.ndarray:
+    """批量解码每条日志 data 中第 word 个 uint256 为 float64"""
+    return words_to_float(decode_words(datas, 1, word)[:, 0])
+
+
+def topic_address(topic) -> str:
+    """indexed address topic → 0x 地址"""
+    return '0x' + to_bytes(topic)[-20:].hex()
+
+
+class BlockTimestampCache:
+    """
+    区块时间戳缓存
+    """
+
+    def __init__(self, w3, max_size: int = 10000, workers: int = 8):
+        self.w3 = w3
+        self.max_size = max_size
+        self.workers = workers
+        self._cache: "OrderedDict[int, int]" = OrderedDict()
+
+    def get_many(self, block_numbers: Iterable[int]) -> Dict[int, int]:
+        """批量获取时间戳，未缓存的并发查询"""
+        wanted = set(block_numbers)
+        result = {}
+        missing = []
+        for number in wanted:
+            if number in self._cache:
+                self._cache.move_to_end(number)
+                result[number] = self._cache[number]
+            else:
+                missing.append(number)
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(missing))) as pool:
+                fetched = pool.map(lambda n: (n, self.w3.eth.get_block(n)['timestamp']), missing)
+                for number, ts in fetched:
+                    result[number] = ts
+                    self._cache[number] = ts
+
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+        return result
+
+
+class LogIngester:
+    """
+    单个合约 + 事件主题的增量日志采集器
+    """
+
+    def __init__(self, w3, address: Union[str, List[str]], topics: List, name: str,
+                 cursor_path: str = "data/onchain_cursor.json",
+                 start_lookback: int = 1800, confirmations: int = 5,
+                 chunk_size: int = 2000, min_chunk: int = 10, max_chunk: int = 20000,
+                 workers: int = 4, max_range: int = 100000):
+        self.w3 = w3
+        self.address = address               # 单个地址或地址列表
+        self.topics = topics
+        self.name = name                    # 游标文件中的键
+        self.cursor_path = cursor_path
+        self.start_lookback = start_lookback  # 无游标时回看的区块数
+        self.confirmations = confirmations    # 只处理已确认的区块，避免重组
+        self.chunk_size = chunk_size
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.workers = workers
+        self.max_range = max_range            # 单轮最多处理的区块数，落后太多时分多轮追上
+
+        self.cursor: Optional[int] = self._load_cursor()
+        self.pending: Optional[int] = None
+
+    def _load_cursor(self) -> Optional[int]:
+        try:
+            with open(self.cursor_path, 'r') as f:
+                return json.load(f).get(self.name)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save_cursor(self, block: int):
+        state = {}
+        try:
+            with open(self.cursor_path, 'r') as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        state[self.name] = block
+
+        directory = os.path.dirname(self.cursor_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.cursor_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.cursor_path)
+        self.cursor = block
+
+    def _get_logs(self, start: int, end: int) -> List:
+        """拉取 [start, end]，范围过大时二分"""
+        try:
+            logs = self.w3.eth.get_logs({
+                'fromBlock': start,
+                'toBlock': end,
+                'address': self.address,
+                'topics': self.topics
+            })
+        except Exception as e:
+            if not is_range_error(e) or end - start + 1 <= self.min_chunk:
+                raise
+            # 缩小后续切块，再把本区间二分
+            self.chunk_size = max(self.min_chunk, (end - start + 1) // 2)
+            middle = (start + end) // 2
+            return self._get_logs(start, middle) + self._get_logs(middle + 1, end)
+
+        self.chunk_size = min(self.max_chunk, int(self.chunk_size * 1.25) + 1)
+        return list(logs)
+
+    def ranges(self, start: int, end: int) -> List[Tuple[int, int]]:
+        step = max(self.chunk_size, 1)
+        return [(s, min(s + step - 1, end)) for s in range(start, end + 1, step)]
+
+    def poll(self) -> List:
+        """
+        拉取上次游标之后的全部已确认日志，按 (区块, 序号) 排序
+        处理完成后调用 commit() 推进游标，处理失败时下一轮会重新拉取
+        """
+        latest = self.w3.eth.block_number - self.confirmations
+        start = self.cursor + 1 if self.cursor is not None else latest - self.start_lookback
+        if start > latest:
+            return []
+        latest = min(latest, start + self.max_range - 1)
+
+        ranges = self.ranges(start, latest)
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(ranges))) as pool:
+            chunks = list(pool.map(lambda r: self._get_logs(*r), ranges))
+
+        logs = [log for chunk in chunks for log in chunk]
+        logs.sort(key=lambda log: (log['blockNumber'], log['logIndex']))
+
+        logger.info(f"⛓️ {self.name}: 区块 {start}-{latest} ({len(ranges)} 段), {len(logs)} 条日志")
+        self.pending = latest
+        return logs
+
+    def commit(self):
+        """把游标推进到上次 poll 的末尾"""
+        if self.pending is not None:
+            self._save_cursor(self.pending)
+            self.pending = None
@@ -5,8 +5,10 @@
 """
 
 import os
+import time
+import asyncio
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 try:
     from web3 import Web3
@@ -15,10 +17,17 @@ except ImportError:
     os.system("pip install web3 -q")
     from web3 import Web3
 
+from ctf_decoder import CONTRACTS, CTFDecoder, FlowTracker
+from market_catalog import MarketCatalog
+from onchain_ingester import BlockTimestampCache, LogIngester, decode_uint256_words, topic_address
+from signal_bus import SIGNAL_DB, Signal, SignalBus
+
 class OnChainMonitor:
     """链上数据监控器"""
     
-    def __init__(self):
+    def __init__(self, bus: Optional[SignalBus] = None, catalog_refresh: float = 1800):
+        self.bus = bus or SignalBus(SIGNAL_DB)
+        
         # Polygon RPC 节点
         self.rpc_urls = [
             "https://polygon-rpc.com",
@@ -27,14 +36,22 @@ class OnChainMonitor:
         ]
         
         self.w3 = None
+        self.ingester: Optional[LogIngester] = None
+        self.fill_ingester: Optional[LogIngester] = None
+        self.position_ingester: Optional[LogIngester] = None
+        self.decoder: Optional[CTFDecoder] = None
+        self.block_times: Optional[BlockTimestampCache] = None
         self.connect()
         
         # Polymarket 相关合约地址
-        self.contracts = {
-            'ctf_exchange': '0x...',  # 需要实际地址
-            'neg_risk_adapter': '0x...',
-            'usdc': '0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174'
-        }
+        self.contracts = dict(CONTRACTS, usdc='0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174')
+        
+        # token id → 市场 的目录，定期刷新
+        self.catalog = MarketCatalog()
+        self.catalog_refresh = catalog_refresh
+        self.catalog_synced = 0.0
+        self.flows = FlowTracker(self.catalog)
+        self.published_flow: Dict = {}  # (market_id, window) → 上次发布的净流入
     
     def connect(self):
         """连接 RPC 节点"""
@@ -52,77 +69,196 @@ class OnChainMonitor:
         print("❌ 无法连接到任何 Polygon 节点")
         return False
     
-    def get_usdc_transfers(self, hours: int = 1) -> List[Dict]:
-        """获取 USDC 大额转账"""
+    def get_usdc_transfers(self, hours: int = 1, min_amount: float = 10000) -> List[Dict]:
+        """
+        获取 USDC 大额转账
+        增量读取上次处理之后的新区块；首次运行回看 hours 小时
+        """
         if not self.w3:
             return []
         
-        # USDC Transfer 事件主题
-        transfer_topic = self.w3.keccak(text="Transfer(address,address,uint256)").hex()
+        if self.ingester is None:
+            # USDC Transfer 事件主题
+            transfer_topic = self.w3.keccak(text="Transfer(address,address,uint256)").hex()
+            blocks_per_hour = 1800  # ~2秒一个区块
+            self.ingester = LogIngester(
+                self.w3, self.contracts['usdc'], [transfer_topic], name='usdc_transfer',
+                start_lookback=hours * blocks_per_hour
+            )
+            self.block_times = BlockTimestampCache(self.w3)
         
         try:
-            # 获取最新区块
-            latest = self.w3.eth.block_number
-            blocks_per_hour = 1800  # ~2秒一个区块
-            from_block = latest - (hours * blocks_per_hour)
+            logs = self.ingester.poll()
+            
+            # 批量解码金额 (USDC 有 6 位小数)，只保留 >= min_amount 的转账
+            amounts = decode_uint256_words(log['data'] for log in logs) / 1e6
+            # (超出 uint64 的金额解码为 inf，USDC 不可能出现，视为异常数据丢弃)
+            large = [(log, amount) for log, amount in zip(logs, amounts) if min_amount <= amount < float('inf')]
             
-            # 获取日志
-            logs = self.w3.eth.get_logs({
-                'fromBlock': from_block,
-                'toBlock': 'latest',
-                'address': self.contracts['usdc'],
-                'topics': [transfer_topic]
-            })
+            # 只为大额转账查询区块时间
+            times = self.block_times.get_many(log['blockNumber'] for log, _ in large)
             
             transfers = []
-            for log in logs:
-                # 解析转账金额
-                amount = int(log['data'], 16) / 1e6  # USDC 有 6 位小数
-                
-                if amount >= 10000:  # 只关注 >= $10,000
-                    transfers.append({
-                        'tx_hash': log['transactionHash'].hex(),
-                        'amount': amount,
-                        'block_number': log['blockNumber'],
-                        'timestamp': datetime.now().isoformat()
-                    })
+            for log, amount in large:
+                transfers.append({
+                    'tx_hash': log['transactionHash'].hex(),
+                    'from': topic_address(log['topics'][1]),
+                    'to': topic_address(log['topics'][2]),
+                    'amount': float(amount),
+                    'block_number': log['blockNumber'],
+                    'timestamp': datetime.fromtimestamp(times[log['blockNumber']]).isoformat()
+                })
             
-            print(f"📊 发现 {len(transfers)} 个大额 USDC 转账 (>=$10K)")
+            print(f"📊 发现 {len(transfers)} 个大额 USDC 转账 (>=${min_amount / 1000:.0f}K)")
             return transfers
             
         except Exception as e:
+            # 不推进游标，下一轮重新拉取
+            self.ingester.pending = None
             print(f"❌ 获取转账失败: {e}")
             return []
     
+    def refresh_catalog(self):
+        """按间隔刷新市场目录 (token id 映射)"""
+        if time.time() - self.catalog_synced < self.catalog_refresh:
+            return
+        try:
+            count = asyncio.run(self.catalog.sync())
+            self.catalog_synced = time.time()
+            print(f"📚 市场目录已刷新: {count} 个市场")
+        except Exception as e:
+            print(f"❌ 刷新市场目录失败: {e}")
+    
+    def get_exchange_flow(self, hours: int = 1, min_flow: float = 25000) -> Dict:
+        """
+        解码 CTF 交易所成交与拆分/合并事件，更新市场/钱包滑动窗口资金流
+        返回 {'signals': 超过阈值的市场资金流, 'positions': 大额拆分/合并}
+        """
+        if not self.w3:
+            return {'signals': [], 'positions': []}
+        
+        if self.decoder is None:
+            self.decoder = CTFDecoder(lambda sig: self.w3.keccak(text=sig))
+            topics = self.decoder.topics
+            exchanges = [Web3.to_checksum_address(self.contracts[k])
+                         for k in ('ctf_exchange', 'neg_risk_ctf_exchange')]
+            position_sources = [Web3.to_checksum_address(self.contracts[k])
+                                for k in ('conditional_tokens', 'neg_risk_adapter')]
+            self.fill_ingester = LogIngester(
+                self.w3, exchanges, [[topics['OrderFilled']]], name='ctf_fills',
+                start_lookback=hours * 1800
+            )
+            self.position_ingester = LogIngester(
+                self.w3, position_sources,
+                [[topics[k] for k in ('PositionSplit', 'PositionsMerge',
+                                      'NegRiskPositionSplit', 'NegRiskPositionsMerge')]],
+                name='ctf_positions', start_lookback=hours * 1800
+            )
+            if self.block_times is None:
+                self.block_times = BlockTimestampCache(self.w3)
+        
+        self.refresh_catalog()
+        
+        try:
+            fills = self.decoder.decode_fills(self.fill_ingester.poll())
+            positions = [
+                event for event in self.decoder.decode_position_events(self.position_ingester.poll())
+                if event['amount'] >= min_flow
+            ]
+            
+            blocks = {fill['block_number'] for fill in fills} | {e['block_number'] for e in positions}
+            times = self.block_times.get_many(blocks)
+            
+            self.flows.add_fills(fills, times)
+            self.flows.expire(time.time())
+            
+            for event in positions:
+                record = self.catalog.by_condition.get(event['condition_id'])
+                event['market_id'] = record.market_id if record else None
+                event['timestamp'] = datetime.fromtimestamp(times[event['block_number']]).isoformat()
+            
+            signals = [s for window in self.flows.market_flows
+                       for s in self.flows.signals(window, min_flow=min_flow)]
+            print(f"📊 解码 {len(fills)} 笔成交, {len(positions)} 笔大额拆分/合并, "
+                  f"{len(signals)} 个资金流信号 (未映射 token {self.flows.unmapped})")
+            return {'signals': signals, 'positions': positions}
+            
+        except Exception as e:
+            # 两个游标都不推进，下一轮重新拉取
+            self.fill_ingester.pending = None
+            self.position_ingester.pending = None
+            print(f"❌ 解码交易所事件失败: {e}")
+            return {'signals': [], 'positions': []}
+    
     def get_block_timestamp(self, block_number: int) -> datetime:
         """获取区块时间戳"""
         if not self.w3:
             return datetime.now()
         
         try:
-            block = self.w3.eth.get_block(block_number)
-            return datetime.fromtimestamp(block['timestamp'])
-        except:
+            if self.block_times is None:
+                self.block_times = BlockTimestampCache(self.w3)
+            return datetime.fromtimestamp(self.block_times.get_many([block_number])[block_number])
+        except Exception:
             return datetime.now()
     
     def monitor(self):
         """监控链上活动"""
         print("🚀 启动链上数据监控")
         
-        import time
         while True:
             try:
                 # 获取大额转账
                 transfers = self.get_usdc_transfers(hours=1)
                 
+                # CTF 交易所成交资金流
+                flow = self.get_exchange_flow(hours=1)
+                
                 # 保存数据
-                if transfers:
+                if transfers or flow['signals'] or flow['positions']:
                     import json
                     with open('data/onchain_activity.json', 'w') as f:
                         json.dump({
                             'timestamp': datetime.now().isoformat(),
-                            'transfers': transfers
+                            'transfers': transfers,
+                            'flow_signals': flow['signals'],
+                            'positions': flow['positions']
                         }, f, indent=2)
+                    
+                    # 大额转账发布到信号总线，金额越大置信度越高
+                    for transfer in transfers:
+                        self.bus.publish_nowait(Signal(
+                            source='onchain',
+                            kind='usdc_transfer',
+                            confidence=min(100, 50 + transfer['amount'] / 10000),
+                            payload=transfer
+                        ))
+                
+                # 单市场净流入按窗口发布，净流入越大置信度越高
+                # 同一市场只在首次超过阈值、方向反转或净流入再增长 50% 时重复发布
+                for signal in flow['signals']:
+                    key = (signal['market_id'], signal['window'])
+                    last = self.published_flow.get(key)
+                    net = signal['net_flow']
+                    if last is not None and last * net > 0 and abs(net) < abs(last) * 1.5:
+                        continue
+                    self.published_flow[key] = net
+                    self.bus.publish_nowait(Signal(
+                        source='onchain',
+                        kind='smart_money_flow',
+                        confidence=min(100, 50 + abs(signal['net_flow']) / 5000),
+                        market_id=signal['market_id'],
+                        payload=signal
+                    ))
+                
+                # 回落到阈值以下的市场下次超过时重新发布
+                active = {(s['market_id'], s['window']) for s in flow['signals']}
+                self.published_flow = {k: v for k, v in self.published_flow.items() if k in active}
+                
+                # 处理完成后再推进区块游标
+                for ingester in (self.ingester, self.fill_ingester, self.position_ingester):
+                    if ingester is not None:
+                        ingester.commit()
                 
                 print(f"⏰ 等待 5 分钟...")
                 time.sleep(300)
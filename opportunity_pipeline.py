@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+机会流水线工具
+扫描器以生成器逐个产出机会，由有界堆保留 Top-K，
+避免收集全部候选再整体排序；逐条机会日志默认只在 DEBUG 级别输出。
+"""
+
+import os
+import heapq
+import logging
+from itertools import count
+from typing import Callable, Generic, Iterable, List, TypeVar
+
+T = TypeVar('T')
+
+# 逐条机会日志级别，可通过环境变量 OPPORTUNITY_LOG_LEVEL=INFO 打开
+OPPORTUNITY_LOG_LEVEL = logging.getLevelName(os.getenv('OPPORTUNITY_LOG_LEVEL', 'DEBUG').upper())
+if not isinstance(OPPORTUNITY_LOG_LEVEL, int):
+    OPPORTUNITY_LOG_LEVEL = logging.DEBUG
+
+
+class TopK(Generic[T]):
+    """
+    有界小顶堆，只保留 key 最大的 k 个元素
+    push 为 O(log k)，total 记录看到的候选总数
+    """
+
+    def __init__(self, k: int, key: Callable[[T], float]):
+        self.k = k
+        self.key = key
+        self.total = 0
+        self._heap = []
+        self._seq = count()
+
+    def push(self, item: T):
+        self.total += 1
+        entry = (self.key(item), next(self._seq), item)
+
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def extend(self, items: Iterable[T]) -> 'TopK[T]':
+        for item in items:
+            self.push(item)
+        return self
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __iter__(self):
+        return (item for _, _, item in self._heap)
+
+    def sorted(self) -> List[T]:
+        """按 key 降序返回保留的元素"""
+        return [item for _, _, item in sorted(self._heap, key=lambda e: (-e[0], e[1]))]
+
+
+def merge_top_k(heaps: Iterable[TopK[T]], k: int, key: Callable[[T], float]) -> List[T]:
+    """合并多个策略的 Top-K，取全局前 k 个"""
+    merged = TopK(k, key)
+    for heap in heaps:
+        merged.extend(heap)
+    return merged.sorted()
+
+
+def log_opportunity(logger: logging.Logger, msg: str, *args):
+    """按配置级别输出单条机会日志，未启用时不做字符串格式化"""
+    if logger.isEnabledFor(OPPORTUNITY_LOG_LEVEL):
+        logger.log(OPPORTUNITY_LOG_LEVEL, msg, *args)
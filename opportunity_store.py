@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+套利机会存储 (SQLite)
+以 (market_id, outcome, strategy) 为键记录首次/最近出现时间与价格变化，
+每轮扫描只产出 新增 / 变化 / 消失 三类事件。
+
+下游有两种订阅方式:
+1. 进程内: subscribe(callback)，每轮扫描结束时回调 SweepDiff
+2. 跨进程: poll(consumer)，按消费者游标读取上次以来的事件
+"""
+
+import os
+import json
+import sqlite3
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 扫描器与下游 (策略编写器、日报) 共用的库，按模块所在目录定位，不依赖运行时工作目录
+OPPORTUNITY_DB = os.getenv(
+    'OPPORTUNITY_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'opportunities.db')
+)
+
+
+@dataclass
+class SweepDiff:
+    """一轮扫描的变化"""
+    new: List[Dict] = field(default_factory=list)
+    changed: List[Dict] = field(default_factory=list)
+    disappeared: List[Dict] = field(default_factory=list)
+    unchanged: int = 0
+
+    def summary(self) -> Dict:
+        return {
+            'new': len(self.new),
+            'changed': len(self.changed),
+            'disappeared': len(self.disappeared),
+            'unchanged': self.unchanged
+        }
+
+    def __bool__(self) -> bool:
+        return bool(self.new or self.changed or self.disappeared)
+
+
+class Sweep:
+    """
+    一轮扫描
+    边扫描边 observe，结束时计算消失的机会并提交事务
+    complete=False (市场拉取失败或不完整) 时不标记消失，避免下一轮把它们全部当作新增
+    """
+
+    def __init__(self, store: 'OpportunityStore', strategies: Iterable[str], complete: bool = True):
+        self.store = store
+        self.strategies = list(strategies)
+        self.complete = complete
+        self.seen = set()
+        self.diff = SweepDiff()
+        self.timestamp = datetime.now().isoformat()
+
+    def observe(self, opp: Dict):
+        """记录一条机会，需包含 market_id / outcome / strategy / market_price"""
+        key = (str(opp['market_id']), str(opp.get('outcome', '')), opp['strategy'])
+        if key in self.seen:
+            return
+        self.seen.add(key)
+
+        price = float(opp.get('market_price') or 0)
+        row = self.store.conn.execute(
+            "SELECT price FROM opportunities WHERE market_id=? AND outcome=? AND strategy=? AND active=1",
+            key
+        ).fetchone()
+
+        payload = json.dumps(opp, ensure_ascii=False, default=str)
+
+        if row is None:
+            self.store.conn.execute(
+                """INSERT INTO opportunities
+                   (market_id, outcome, strategy, question, price, payload, first_seen, last_seen, active)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+                   ON CONFLICT(market_id, outcome, strategy) DO UPDATE SET
+                   question=excluded.question, price=excluded.price, payload=excluded.payload,
+                   first_seen=excluded.first_seen, last_seen=excluded.last_seen, active=1""",
+                key + (opp.get('question', ''), price, payload, self.timestamp, self.timestamp)
+            )
+            self._emit('new', key, opp, price, None)
+            return
+
+        delta = price - row[0]
+        self.store.conn.execute(
+            "UPDATE opportunities SET price=?, payload=?, last_seen=? WHERE market_id=? AND outcome=? AND strategy=?",
+            (price, payload, self.timestamp) + key
+        )
+        if abs(delta) >= self.store.price_tolerance:
+            self._emit('changed', key, opp, price, delta)
+        else:
+            self.diff.unchanged += 1
+
+    def observe_many(self, opps: Iterable[Dict]):
+        for opp in opps:
+            self.observe(opp)
+
+    def close(self):
+        """把本轮未出现的活跃机会标记为消失 (不完整的扫描只提交新增/变化)"""
+        if self.strategies and self.complete:
+            placeholders = ','.join('?' * len(self.strategies))
+            rows = self.store.conn.execute(
+                f"SELECT market_id, outcome, strategy, price, payload FROM opportunities "
+                f"WHERE active=1 AND strategy IN ({placeholders})",
+                self.strategies
+            ).fetchall()
+
+            for market_id, outcome, strategy, price, payload in rows:
+                key = (market_id, outcome, strategy)
+                if key in self.seen:
+                    continue
+                self.store.conn.execute(
+                    "UPDATE opportunities SET active=0 WHERE market_id=? AND outcome=? AND strategy=?", key
+                )
+                self._emit('disappeared', key, json.loads(payload), price, None)
+
+        self.store.conn.commit()
+
+    def _emit(self, change: str, key: Tuple, opp: Dict, price: float, delta: Optional[float]):
+        event = dict(opp, change=change, price_delta=delta, timestamp=self.timestamp)
+        getattr(self.diff, change).append(event)
+        self.store.conn.execute(
+            """INSERT INTO opportunity_events
+               (ts, change, market_id, outcome, strategy, price, price_delta, payload)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (self.timestamp, change) + key + (price, delta, json.dumps(event, ensure_ascii=False, default=str))
+        )
+
+    def __enter__(self) -> 'Sweep':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.store.conn.rollback()
+            return False
+        self.close()
+        for callback in self.store.subscribers:
+            callback(self.diff)
+        return False
+
+
+class OpportunityStore:
+    """
+    机会去重存储
+    """
+
+    def __init__(self, db_path: str = OPPORTUNITY_DB, price_tolerance: float = 0.005):
+        self.db_path = db_path
+        self.price_tolerance = price_tolerance  # 价格变化超过该值才算"变化"
+        self.subscribers: List[Callable[[SweepDiff], None]] = []
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path)
+        self._init_schema()
+
+    def _init_schema(self):
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS opportunities (
+                market_id TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                question TEXT,
+                price REAL,
+                payload TEXT,
+                first_seen TEXT,
+                last_seen TEXT,
+                active INTEGER DEFAULT 1,
+                PRIMARY KEY (market_id, outcome, strategy)
+            );
+            CREATE TABLE IF NOT EXISTS opportunity_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT NOT NULL,
+                change TEXT NOT NULL,
+                market_id TEXT,
+                outcome TEXT,
+                strategy TEXT,
+                price REAL,
+                price_delta REAL,
+                payload TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_opportunity_events_ts ON opportunity_events (ts);
+            CREATE TABLE IF NOT EXISTS consumer_cursors (
+                consumer TEXT PRIMARY KEY,
+                last_event_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS store_state (
+                key TEXT PRIMARY KEY,
+                value REAL
+            );
+        """)
+        self.conn.commit()
+
+    def sweep(self, strategies: Iterable[str], complete: bool = True) -> Sweep:
+        """开始一轮扫描，strategies 为本轮覆盖的策略（用于判断消失）"""
+        return Sweep(self, strategies, complete)
+
+    def get_state(self, key: str) -> Optional[float]:
+        row = self.conn.execute("SELECT value FROM store_state WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: float):
+        self.conn.execute("INSERT OR REPLACE INTO store_state (key, value) VALUES (?, ?)", (key, value))
+        self.conn.commit()
+
+    def subscribe(self, callback: Callable[[SweepDiff], None]):
+        """进程内订阅每轮扫描的变化"""
+        self.subscribers.append(callback)
+
+    def poll(self, consumer: str, changes: Optional[Iterable[str]] = None) -> List[Dict]:
+        """读取消费者上次以来的事件并推进游标"""
+        row = self.conn.execute(
+            "SELECT last_event_id FROM consumer_cursors WHERE consumer=?", (consumer,)
+        ).fetchone()
+        last_id = row[0] if row else 0
+
+        rows = self.conn.execute(
+            "SELECT id, change, payload FROM opportunity_events WHERE id > ? ORDER BY id", (last_id,)
+        ).fetchall()
+
+        if rows:
+            self.conn.execute(
+                """INSERT INTO consumer_cursors (consumer, last_event_id) VALUES (?, ?)
+                   ON CONFLICT(consumer) DO UPDATE SET last_event_id=excluded.last_event_id""",
+                (consumer, rows[-1][0])
+            )
+            self.conn.commit()
+
+        wanted = set(changes) if changes else None
+        return [json.loads(payload) for _, change, payload in rows if wanted is None or change in wanted]
+
+    def count_events(self, change: str, since: str) -> int:
+        """统计某时间以来某类事件的数量"""
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM opportunity_events WHERE change=? AND ts >= ?", (change, since)
+        ).fetchone()
+        return row[0]
+
+    def active(self, strategy: Optional[str] = None) -> List[Dict]:
+        """当前仍活跃的机会"""
+        query = "SELECT payload, first_seen, last_seen FROM opportunities WHERE active=1"
+        params: Tuple = ()
+        if strategy:
+            query += " AND strategy=?"
+            params = (strategy,)
+
+        return [
+            dict(json.loads(payload), first_seen=first_seen, last_seen=last_seen)
+            for payload, first_seen, last_seen in self.conn.execute(query, params)
+        ]
+
+    def close(self):
+        self.conn.close()
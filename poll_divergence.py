@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+民调均值 vs 市场价格 偏差引擎
+- 每个选举 (race) 按候选人维护指数衰减的民调均值，权重为 sqrt(样本量)，
+  新民调到来只更新所属选举，O(候选人数)
+- 领先者与第二名的差距按正态误差模型换算为胜率
+  (误差 = 历史系统性民调误差 与 有效样本抽样误差 的合成)
+- 通过市场目录的 BM25 索引 (MarketLinker) 找到对应市场，取 YES 价格对比；
+  全国民调只对应普选票市场 (选举人团/提名在内的"赢得大选"市场与全国得票差距无直接关系)
+- 偏差按 |胜率 - 市场价格| 排序
+"""
+
+import math
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from market_catalog import MarketCatalog, MarketRecord
+from market_linker import MarketLinker
+from unified_data_fusion import DecayedAggregate
+
+PARTY_WORDS = {
+    'REP': ('republican', 'gop'),
+    'DEM': ('democrat', 'democratic'),
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%y', '%m/%d/%Y')
+
+
+def parse_poll_date(value: str) -> Optional[float]:
+    """538 的日期可能是 2024-11-03 或 11/3/24"""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def normal_cdf(x: float) -> float:
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+
+class RaceAverage:
+    """
+    单个选举的民调均值
+    """
+
+    def __init__(self, key: str, state: str, office_type: str, cycle: str):
+        self.key = key
+        self.state = state
+        self.office_type = office_type
+        self.cycle = cycle
+        self.candidates: Dict[str, DecayedAggregate] = {}
+        self.parties: Dict[str, str] = {}
+        self.sample = DecayedAggregate()  # 衰减后的样本量之和 (有效样本量)
+        self.polls = 0
+        self.latest = 0.0
+
+    def add(self, poll: Dict, ts: float, decay: float, window: float):
+        n = poll.get('sample_size')
+        try:
+            n = max(float(n), 1.0)
+        except (TypeError, ValueError):
+            n = 600.0  # 未给出样本量时按常见规模计
+
+        for answer in poll['answers']:
+            if answer['pct'] is None or not answer['choice']:
+                continue
+            aggregate = self.candidates.setdefault(answer['choice'], DecayedAggregate())
+            aggregate.add(answer['pct'], ts, decay, window, weight=math.sqrt(n))
+            if answer['party']:
+                self.parties[answer['choice']] = answer['party']
+
+        self.sample.add(0.0, ts, decay, window, weight=n)
+        self.polls += 1
+        self.latest = max(self.latest, ts)
+
+    def averages(self, now: float, decay: float, window: float) -> List[Tuple[str, float]]:
+        """当前各候选人的加权均值 (降序)"""
+        result = []
+        for name, aggregate in self.candidates.items():
+            state = aggregate.read(now, decay, window)
+            if state is not None:
+                result.append((name, state['confidence']))
+        return sorted(result, key=lambda x: x[1], reverse=True)
+
+    def effective_sample(self, now: float, decay: float, window: float) -> float:
+        state = self.sample.read(now, decay, window)
+        return state['signals'] if state else 0.0
+
+
+class PollDivergenceEngine:
+    """
+    民调-市场偏差引擎
+    """
+
+    def __init__(self, half_life: float = 14 * 86400, window: float = 90 * 86400,
+                 polling_error: float = 4.0, min_edge: float = 0.05,
+                 linker: Optional[MarketLinker] = None):
+        self.decay = math.log(2) / half_life
+        self.window = window                  # 超过该时间的民调不再计入
+        self.polling_error = polling_error    # 差距的系统性误差 (百分点)
+        self.min_edge = min_edge              # 报告的最小偏差
+        self.linker = linker or MarketLinker(min_score=3.0)
+        self.catalog: Optional[MarketCatalog] = None
+
+        self.races: Dict[str, RaceAverage] = {}
+        self.dirty: set = set()
+        self.estimates: Dict[str, Dict] = {}                        # race → 最近一次的胜率估计
+        self.matches: Dict[Tuple[str, str], Optional[str]] = {}    # (race, 候选人) → market_id
+
+    @staticmethod
+    def race_key(poll: Dict) -> str:
+        key = poll['race_id'] or f"{poll['cycle']}|{poll['office_type']}|{poll['state']}"
+        # 前两名同党视为初选，与大选分开统计
+        parties = [a['party'] for a in sorted(poll['answers'], key=lambda a: a['pct'] or 0, reverse=True)[:2]]
+        if len(parties) == 2 and parties[0] and parties[0] == parties[1]:
+            key += f"|primary:{parties[0]}"
+        return key
+
+    def sync_catalog(self, catalog: MarketCatalog) -> Dict[str, int]:
+        """目录刷新后重建索引，市场匹配结果失效"""
+        self.catalog = catalog
+        self.matches = {}
+        return self.linker.sync_catalog(catalog)
+
+    def add_poll(self, poll: Dict) -> str:
+        ts = parse_poll_date(poll.get('date', '')) or time.time()
+        key = self.race_key(poll)
+        race = self.races.get(key)
+        if race is None:
+            race = self.races[key] = RaceAverage(key, poll['state'], poll['office_type'], poll['cycle'])
+        race.add(poll, ts, self.decay, self.window)
+        self.dirty.add(key)
+        return key
+
+    def add_polls(self, polls: List[Dict]) -> set:
+        """加入一批新民调，返回受影响的选举"""
+        return {self.add_poll(poll) for poll in polls if poll.get('answers')}
+
+    def estimate(self, key: str, now: Optional[float] = None) -> Optional[Dict]:
+        """计算一个选举的领先者胜率，结果缓存到下次有新民调"""
+        now = now if now is not None else time.time()
+        if key not in self.dirty and key in self.estimates:
+            return self.estimates[key]
+
+        race = self.races[key]
+        averages = race.averages(now, self.decay, self.window)
+        self.dirty.discard(key)
+        if len(averages) < 2:
+            self.estimates.pop(key, None)
+            return None
+
+        (leader, leader_pct), (runner_up, runner_pct) = averages[:2]
+        margin = leader_pct - runner_pct
+        n_eff = race.effective_sample(now, self.decay, self.window)
+        sampling = 100 / math.sqrt(n_eff) if n_eff > 0 else self.polling_error
+        sigma = math.sqrt(self.polling_error ** 2 + sampling ** 2)
+        leader_prob = normal_cdf(margin / sigma)
+
+        self.estimates[key] = {
+            'race': key,
+            'state': race.state,
+            'office_type': race.office_type,
+            'cycle': race.cycle,
+            'polls': race.polls,
+            'effective_sample': round(n_eff),
+            'averages': {name: round(pct, 2) for name, pct in averages},
+            'margin': round(margin, 2),
+            'sigma': round(sigma, 2),
+            'probabilities': {leader: leader_prob, runner_up: 1 - leader_prob},
+            'parties': {name: race.parties.get(name, '') for name in (leader, runner_up)},
+            'latest_poll': datetime.fromtimestamp(race.latest).isoformat()
+        }
+        return self.estimates[key]
+
+    def match_market(self, estimate: Dict, candidate: str) -> Optional[MarketRecord]:
+        """在目录中找到 "候选人/政党 赢得该选举" 的市场"""
+        if self.catalog is None:
+            return None
+
+        cache_key = (estimate['race'], candidate)
+        if cache_key not in self.matches:
+            self.matches[cache_key] = self._search_market(estimate, candidate)
+        market_id = self.matches[cache_key]
+        return self.catalog.markets.get(market_id) if market_id else None
+
+    def _search_market(self, estimate: Dict, candidate: str) -> Optional[str]:
+        surname = candidate.split()[-1].lower()
+        names = (surname,) + PARTY_WORDS.get(estimate['parties'].get(candidate, ''), ())
+        state = estimate['state'].lower()
+        national = state in ('', 'national')
+        office = 'presidential' if 'president' in estimate['office_type'].lower() else estimate['office_type']
+
+        if national:
+            query = f"{estimate['cycle']} {office} popular vote winner {candidate}"
+        else:
+            query = f"{estimate['cycle']} {estimate['state']} {office} election winner {candidate}"
+        for market_id, _ in self.linker.search(query, k=20):
+            record = self.catalog.markets.get(market_id)
+            if record is None:
+                continue
+            text = self.linker.document_text(record).lower()
+            if estimate['cycle'] and estimate['cycle'] not in text:
+                continue
+            if national and 'popular vote' not in text:
+                continue
+            if not national and state not in text:
+                continue
+            # 候选人/政党需要出现在问题或分组标题中
+            if any(name in text for name in names):
+                return market_id
+        return None
+
+    def divergences(self, races: Optional[set] = None, now: Optional[float] = None) -> List[Dict]:
+        """
+        计算偏差并按大小排序
+        races 为空时遍历全部选举 (未变化的选举直接用缓存的胜率，只重新读取市场价格)
+        """
+        results = []
+        for key in (races if races is not None else list(self.races)):
+            estimate = self.estimate(key, now)
+            if estimate is None:
+                continue
+
+            for candidate, prob in estimate['probabilities'].items():
+                record = self.match_market(estimate, candidate)
+                if record is None or not record.prices:
+                    continue
+                price = record.prices[0]
+                edge = prob - price
+                if abs(edge) < self.min_edge:
+                    continue
+                results.append({
+                    'race': key,
+                    'candidate': candidate,
+                    'market_id': record.market_id,
+                    'question': record.question,
+                    'poll_probability': round(prob, 4),
+                    'market_price': price,
+                    'edge': round(edge, 4),
+                    'direction': 'YES' if edge > 0 else 'NO',
+                    'margin': estimate['margin'],
+                    'polls': estimate['polls'],
+                    'effective_sample': estimate['effective_sample'],
+                    'latest_poll': estimate['latest_poll']
+                })
+
+        results.sort(key=lambda d: abs(d['edge']), reverse=True)
+        return results
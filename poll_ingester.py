@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+538 民调增量采集
+- 条件请求: 记录每个 URL 的 ETag / Last-Modified，未变化时服务器返回 304，不下载正文
+- 流式解析: 安装了 ijson 时边下载边逐条解析，不把整个 JSON 读入内存；未安装时退化为整体解析
+- 结构化过滤: 按 office_type / race_id / 候选人字段判断，不再对整条记录做 str() 关键词匹配
+- 紧凑存储: 只保存相关民调的标准化字段，以 (poll_id, question_id) 为主键，
+  每轮只返回此前未见过的民调
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+_fallback_warned = False
+
+POLL_URLS = [
+    "https://projects.fivethirtyeight.com/polls/data/polls.json",
+    "https://projects.fivethirtyeight.com/polls-page/data/polls.json",
+    "https://projects.fivethirtyeight.com/2024-election-forecast/data/polls.json",
+]
+
+POLL_COLUMNS = (
+    'poll_id', 'question_id', 'pollster', 'sponsors', 'state', 'race_id', 'office_type',
+    'cycle', 'question', 'population', 'subpopulation', 'methodology', 'sample_size',
+    'date', 'url', 'answers'
+)
+
+
+def _text(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ', '.join(str(v.get('name', v)) if isinstance(v, dict) else str(v) for v in value)
+    return str(value)
+
+
+def normalize_poll(poll: Dict) -> Dict:
+    """原始记录 → 标准化字段 (只保留分析需要的部分)"""
+    answers = []
+    for answer in poll.get('answers') or []:
+        if not isinstance(answer, dict):
+            continue
+        try:
+            pct = float(answer.get('pct'))
+        except (TypeError, ValueError):
+            pct = None
+        answers.append({
+            'choice': answer.get('choice') or answer.get('answer') or answer.get('candidate_name') or '',
+            'party': answer.get('party') or '',
+            'pct': pct,
+        })
+
+    return {
+        'poll_id': str(poll.get('poll_id') or poll.get('id') or ''),
+        'question_id': str(poll.get('question_id') or ''),
+        'pollster': _text(poll.get('pollster')),
+        'sponsors': _text(poll.get('sponsors')),
+        'state': _text(poll.get('state')) or 'National',
+        'race_id': _text(poll.get('race_id')),
+        'office_type': _text(poll.get('office_type') or poll.get('type')),
+        'cycle': _text(poll.get('cycle')),
+        'question': _text(poll.get('question')),
+        'population': _text(poll.get('population')),
+        'subpopulation': _text(poll.get('subpopulation')),
+        'methodology': _text(poll.get('methodology')),
+        'sample_size': poll.get('sample_size'),
+        'date': _text(poll.get('end_date') or poll.get('date')),
+        'url': _text(poll.get('url')),
+        'answers': answers,
+    }
+
+
+class PollFilter:
+    """
+    结构化字段过滤
+    office_keywords: office_type / race_id 中包含任一关键词即相关
+    candidates: 任一选项为这些候选人即相关
+    min_cycle: 只保留该选举周期及之后的民调
+    """
+
+    def __init__(self, office_keywords: Iterable[str] = ('president',),
+                 candidates: Iterable[str] = ('trump', 'biden', 'harris', 'vance', 'newsom'),
+                 min_cycle: Optional[int] = None):
+        self.office_keywords = tuple(k.lower() for k in office_keywords)
+        self.candidates = frozenset(c.lower() for c in candidates)
+        self.min_cycle = min_cycle
+
+    def __call__(self, poll: Dict) -> bool:
+        if self.min_cycle is not None:
+            try:
+                if int(poll['cycle']) < self.min_cycle:
+                    return False
+            except (TypeError, ValueError):
+                pass
+
+        office = (poll['office_type'] + ' ' + poll['race_id']).lower()
+        if any(keyword in office for keyword in self.office_keywords):
+            return True
+
+        # 选项可能是 "Trump" 或 "Donald Trump"，按词匹配
+        for answer in poll['answers']:
+            if self.candidates.intersection(answer['choice'].lower().split()):
+                return True
+        return False
+
+
+class PollStore:
+    """
+    民调与 HTTP 缓存状态存储
+    insert_new 只把此前未入库的民调返回给调用方，ETag 也按库保存，
+    因此每个消费者 (融合中心、538 监控) 需要各自的库，共用时先入库的一方会吞掉另一方的新民调
+    """
+
+    def __init__(self, db_path: str = "data/polls.db"):
+        self.db_path = db_path
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS polls (
+                poll_id TEXT NOT NULL,
+                question_id TEXT NOT NULL,
+                pollster TEXT,
+                sponsors TEXT,
+                state TEXT,
+                race_id TEXT,
+                office_type TEXT,
+                cycle TEXT,
+                question TEXT,
+                population TEXT,
+                subpopulation TEXT,
+                methodology TEXT,
+                sample_size REAL,
+                date TEXT,
+                url TEXT,
+                answers TEXT,
+                first_seen REAL NOT NULL,
+                PRIMARY KEY (poll_id, question_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_polls_first_seen ON polls (first_seen);
+
+            CREATE TABLE IF NOT EXISTS http_state (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def http_state(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        row = self.conn.execute("SELECT etag, last_modified FROM http_state WHERE url=?", (url,)).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def save_http_state(self, url: str, etag: Optional[str], last_modified: Optional[str]):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO http_state (url, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?)",
+            (url, etag, last_modified, time.time())
+        )
+        self.conn.commit()
+
+    def insert_new(self, polls: List[Dict]) -> List[Dict]:
+        """写入民调，返回此前不存在的记录"""
+        now = time.time()
+        new = []
+        for poll in polls:
+            row = tuple(
+                json.dumps(poll[c], ensure_ascii=False) if c == 'answers' else poll[c]
+                for c in POLL_COLUMNS
+            )
+            cursor = self.conn.execute(
+                f"INSERT OR IGNORE INTO polls ({', '.join(POLL_COLUMNS)}, first_seen) "
+                f"VALUES ({', '.join('?' * len(POLL_COLUMNS))}, ?)",
+                row + (now,)
+            )
+            if cursor.rowcount:
+                new.append(poll)
+        self.conn.commit()
+        return new
+
+    def recent(self, limit: int = 100) -> List[Dict]:
+        """最近入库的民调"""
+        rows = self.conn.execute(
+            f"SELECT {', '.join(POLL_COLUMNS)} FROM polls ORDER BY first_seen DESC LIMIT ?", (limit,)
+        ).fetchall()
+        polls = []
+        for row in rows:
+            poll = dict(zip(POLL_COLUMNS, row))
+            poll['answers'] = json.loads(poll['answers'] or '[]')
+            polls.append(poll)
+        return polls
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM polls").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class _PrefixedStream:
+    """把已读出的开头字节放回流前面，供 ijson 异步读取"""
+
+    def __init__(self, prefix: bytes, stream: aiohttp.StreamReader):
+        self.prefix = prefix
+        self.stream = stream
+
+    async def read(self, n: int = -1) -> bytes:
+        # ijson 先用 read(0) 探测 bytes/str，不能在这里交出缓存的开头
+        if n == 0:
+            return b''
+        if self.prefix:
+            data, self.prefix = self.prefix, b''
+            return data
+        return await self.stream.read(n)
+
+
+async def iter_polls(response: aiohttp.ClientResponse) -> AsyncIterator[Dict]:
+    """
+    逐条产出响应中的原始民调
+    顶层可能是数组，也可能是 {"polls": [...]}
+    """
+    if ijson is None:
+        global _fallback_warned
+        if not _fallback_warned:
+            _fallback_warned = True
+            logger.warning("⚠️ 未安装 ijson，民调数据整体读入内存后解析 (pip install ijson 可流式解析)")
+        data = json.loads(await response.read())
+        polls = data if isinstance(data, list) else data.get('polls', [])
+        for poll in polls:
+            yield poll
+        return
+
+    head = b''
+    while not head.strip():
+        chunk = await response.content.read(1024)
+        if not chunk:
+            return
+        head += chunk
+    prefix = 'item' if head.lstrip()[:1] == b'[' else 'polls.item'
+
+    async for poll in ijson.items(_PrefixedStream(head, response.content), prefix, use_float=True):
+        yield poll
+
+
+class PollIngester:
+    """
+    538 民调增量采集器
+    """
+
+    def __init__(self, urls: Optional[List[str]] = None, store: Optional[PollStore] = None,
+                 poll_filter: Optional[PollFilter] = None, min_interval: float = 3600,
+                 timeout: float = 60):
+        self.urls = urls or POLL_URLS
+        self.store = store or PollStore()
+        self.filter = poll_filter or PollFilter()
+        self.min_interval = min_interval   # 两次请求的最小间隔
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.last_fetch = 0.0
+        self.stats = {'not_modified': 0, 'parsed': 0, 'relevant': 0, 'new': 0}
+
+    async def _fetch_url(self, session: aiohttp.ClientSession, url: str) -> Optional[List[Dict]]:
+        """条件请求一个 URL；304 返回 []，失败返回 None"""
+        etag, last_modified = self.store.http_state(url)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304:
+                self.stats['not_modified'] += 1
+                logger.info(f"📊 538 数据未变化 (304): {url}")
+                return []
+            if response.status != 200:
+                logger.warning(f"⚠️ 538 返回 {response.status}: {url}")
+                return None
+
+            relevant = []
+            parsed = 0
+            async for raw in iter_polls(response):
+                parsed += 1
+                if not isinstance(raw, dict):
+                    continue
+                poll = normalize_poll(raw)
+                if poll['poll_id'] and self.filter(poll):
+                    relevant.append(poll)
+
+            # 整个正文处理完才记录 ETag，中途失败下次仍会完整下载
+            self.store.save_http_state(url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            self.stats['parsed'] += parsed
+            self.stats['relevant'] += len(relevant)
+            logger.info(f"📊 538: 解析 {parsed} 条，相关 {len(relevant)} 条 ({url})")
+            return relevant
+
+    async def poll(self, session: Optional[aiohttp.ClientSession] = None, force: bool = False) -> List[Dict]:
+        """
+        返回新出现的相关民调
+        距上次请求不足 min_interval 时直接返回 []；依次尝试各 URL，第一个成功的为准
+        """
+        if not force and time.time() - self.last_fetch < self.min_interval:
+            return []
+
+        if session is None:
+            async with aiohttp.ClientSession(timeout=self.timeout) as own_session:
+                return await self.poll(own_session, force=True)
+
+        for url in self.urls:
+            try:
+                relevant = await self._fetch_url(session, url)
+            except Exception as e:
+                logger.error(f"❌ 从 {url} 获取失败: {e}")
+                continue
+            if relevant is None:
+                continue
+
+            self.last_fetch = time.time()
+            new = self.store.insert_new(relevant)
+            self.stats['new'] += len(new)
+            if new:
+                logger.info(f"📊 538: 新增 {len(new)} 个民调 (共 {self.store.count()} 个)")
+            return new
+
+        return []
@@ -18,12 +18,19 @@ import asyncio
 import aiohttp
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from decimal import Decimal
 import pandas as pd
 import numpy as np
 
+from http_cache import shared_cache
+from market_catalog import MarketRecord
+from opportunity_pipeline import TopK, log_opportunity
+from position_ledger import PositionLedger
+from price_history import PriceHistoryStore
+from quote_engine import QuoteEngine
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -60,11 +67,10 @@ class ImpossibleEventStrategy(TradingStrategy):
             expected_return=2.0,  # 200%
             time_horizon="long"
         )
+        self.total_opportunities = 0
     
-    async def find_opportunities(self, markets: List[Dict]) -> List[Dict]:
-        """寻找不可能事件机会"""
-        opportunities = []
-        
+    def iter_opportunities(self, markets: List[Dict]) -> Iterator[Dict]:
+        """逐个产出不可能事件机会"""
         for market in markets:
             try:
                 outcomes = market.get('outcomes', [])
@@ -83,7 +89,9 @@ class ImpossibleEventStrategy(TradingStrategy):
                             expected_return = (real_prob / price - 1)
                             
                             if expected_return > 1.0:  # >100% 期望收益
-                                opportunities.append({
+                                log_opportunity(logger, "   IEA: %s %s @ %.2f%%",
+                                                market.get('question'), outcome.get('name'), price * 100)
+                                yield {
                                     'market_id': market.get('id'),
                                     'question': market.get('question'),
                                     'outcome': outcome.get('name'),
@@ -92,11 +100,16 @@ class ImpossibleEventStrategy(TradingStrategy):
                                     'estimated_prob': real_prob,
                                     'expected_return': expected_return,
                                     'confidence': self._calculate_confidence(market)
-                                })
+                                }
             except Exception as e:
                 continue
-        
-        return sorted(opportunities, key=lambda x: x['expected_return'], reverse=True)
+    
+    async def find_opportunities(self, markets: List[Dict], top_k: int = 10) -> List[Dict]:
+        """寻找不可能事件机会，只保留期望收益最高的 top_k 个"""
+        top = TopK(top_k, key=lambda x: x['expected_return'])
+        top.extend(self.iter_opportunities(markets))
+        self.total_opportunities = top.total
+        return top.sorted()
     
     def _estimate_real_probability(self, market: Dict, outcome: Dict) -> float:
         """估计真实概率"""
@@ -142,7 +155,7 @@ class MarketMakingStrategy(TradingStrategy):
     做市策略
     源自 swisstony 高频做市模式
     """
-    def __init__(self):
+    def __init__(self, history: PriceHistoryStore, ledger: PositionLedger):
         super().__init__(
             name="Market Making",
             description="Provide liquidity and capture bid-ask spread",
@@ -151,54 +164,62 @@ class MarketMakingStrategy(TradingStrategy):
             time_horizon="short"
         )
         self.spread_target = 0.02  # 2% spread
-        self.inventory_limit = 0.1  # 10% inventory skew
+        self.history = history
+        self.ledger = ledger
+        self.quote_engine = QuoteEngine(min_spread=self.spread_target, db_path="data/quotes.db")
     
     async def calculate_quotes(self, market: Dict) -> Optional[Dict]:
-        """计算做市报价"""
+        """计算单个市场的做市报价"""
         try:
-            # 获取中间价
-            outcomes = market.get('outcomes', [])
-            if len(outcomes) < 2:
-                return None
+            record = MarketRecord.from_gamma(market)
             
             # 简化的双结果市场处理
-            if len(outcomes) == 2:
-                price_yes = float(outcomes[0].get('price', 0.5))
-                price_no = float(outcomes[1].get('price', 0.5))
-                
-                # 计算动态价差
-                volatility = self._estimate_volatility(market)
-                spread = max(self.spread_target, volatility * 0.5)
-                
-                # 库存调整
-                inventory_skew = self._calculate_inventory_skew(market)
-                
-                return {
-                    'market_id': market.get('id'),
-                    'strategy': 'MM',
-                    'bid': price_yes - spread/2 - inventory_skew,
-                    'ask': price_yes + spread/2 - inventory_skew,
-                    'spread': spread,
-                    'size': self._calculate_position_size(market)
-                }
+            if len(record.prices) != 2:
+                return None
+            
+            bid, ask, spread, _ = self.quote_engine.compute(
+                np.array([record.prices[0]]),
+                self._estimate_volatility([record.market_id]),
+                np.array(self.ledger.inventory_vector([record.market_id]))
+            )
+            
+            return {
+                'market_id': record.market_id,
+                'strategy': 'MM',
+                'bid': float(bid[0]),
+                'ask': float(ask[0]),
+                'spread': float(ask[0] - bid[0]),
+                'size': self._calculate_position_size(market)
+            }
         except Exception as e:
             logger.error(f"Error calculating quotes: {e}")
             return None
     
-    def _estimate_volatility(self, market: Dict) -> float:
-        """估计波动率"""
-        # 简化：基于交易量估计
-        volume = float(market.get('volume', 0))
-        if volume > 10_000_000:
-            return 0.05
-        elif volume > 1_000_000:
-            return 0.03
-        return 0.02
+    async def calculate_quotes_batch(self, markets: List[Dict]) -> List[Dict]:
+        """
+        一次为所有双结果市场计算报价
+        只返回相对上次报价移动超过容差的市场
+        """
+        records = [MarketRecord.from_gamma(m) for m in markets]
+        binary = [(r, m) for r, m in zip(records, markets) if len(r.prices) == 2 and r.market_id]
+        if not binary:
+            return []
+        
+        market_ids = [r.market_id for r, _ in binary]
+        mids = np.array([r.prices[0] for r, _ in binary])
+        sizes = np.array([self._calculate_position_size(m) for _, m in binary])
+        
+        return self.quote_engine.update(
+            market_ids,
+            mids,
+            self._estimate_volatility(market_ids),
+            np.array(self.ledger.inventory_vector(market_ids)),
+            sizes
+        )
     
-    def _calculate_inventory_skew(self, market: Dict) -> float:
-        """计算库存倾斜"""
-        # 简化版，实际需要跟踪持仓
-        return 0.0
+    def _estimate_volatility(self, market_ids: List[str]) -> np.ndarray:
+        """基于价格历史的实际波动率，历史不足时为 NaN (由引擎使用默认值)"""
+        return self.history.realized_volatility(market_ids)
     
     def _calculate_position_size(self, market: Dict) -> float:
         """计算仓位大小"""
@@ -213,7 +234,8 @@ class MomentumStrategy(TradingStrategy):
     动量突破策略
     适用于重大事件前后的价格动量
     """
-    def __init__(self):
+    def __init__(self, history: PriceHistoryStore, window: int = 3, min_strength: float = 0.1,
+                 bucket: float = 86400, lookback_buckets: int = 10):
         super().__init__(
             name="Momentum Breakout",
             description="Trade on momentum after significant events",
@@ -221,39 +243,76 @@ class MomentumStrategy(TradingStrategy):
             expected_return=0.5,  # 50%
             time_horizon="medium"
         )
+        self.history = history
+        self.window = window                  # 连续同向的周期数
+        self.min_strength = min_strength      # 10% 动量
+        self.bucket = bucket                  # 每个周期的秒数 (默认1天)
+        self.lookback_buckets = lookback_buckets
     
-    async def detect_momentum(self, market: Dict, price_history: List[float]) -> Optional[Dict]:
-        """检测动量信号"""
-        if len(price_history) < 5:
-            return None
+    def score_matrix(self, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        一次计算所有市场的动量
+        返回 (方向: 1 / -1 / 0, 强度)
+        """
+        if matrix.shape[1] <= self.window:
+            zeros = np.zeros(matrix.shape[0])
+            return zeros, zeros
         
-        # 计算简单动量
-        returns = pd.Series(price_history).pct_change().dropna()
+        # 价格为 0 / 负数 / inf 的点视为缺失，避免 0 → p 的收益为 inf
+        prices = np.where(np.isfinite(matrix) & (matrix > 0), matrix, np.nan)
+        returns = prices[:, 1:] / prices[:, :-1] - 1
+        recent = returns[:, -self.window:]
         
-        if len(returns) < 3:
-            return None
+        # 窗口内每一期都有有效收益且方向一致才算动量
+        valid = np.all(np.isfinite(recent), axis=1)
+        up = valid & np.all(recent > 0, axis=1)
+        down = valid & np.all(recent < 0, axis=1)
+        direction = np.where(up, 1, np.where(down, -1, 0))
+        strength = np.where(direction != 0, np.abs(np.where(np.isfinite(recent), recent, 0.0).sum(axis=1)), 0.0)
         
-        # 连续3天同向移动
-        if (returns.iloc[-3:] > 0).all():
-            signal = 'buy'
-            strength = returns.iloc[-3:].sum()
-        elif (returns.iloc[-3:] < 0).all():
-            signal = 'sell'
-            strength = abs(returns.iloc[-3:].sum())
-        else:
+        return direction, strength
+    
+    def _signal(self, market_id: str, question: str, direction: int, strength: float) -> Dict:
+        return {
+            'market_id': market_id,
+            'question': question,
+            'strategy': 'Momentum',
+            'signal': 'buy' if direction > 0 else 'sell',
+            'strength': float(strength),
+            'confidence': min(float(strength) * 100, 100)
+        }
+    
+    async def detect_momentum(self, market: Dict, price_history: List[float]) -> Optional[Dict]:
+        """检测单个市场的动量信号"""
+        if len(price_history) < 5:
             return None
         
-        if strength > 0.1:  # 10% 动量
-            return {
-                'market_id': market.get('id'),
-                'question': market.get('question'),
-                'strategy': 'Momentum',
-                'signal': signal,
-                'strength': strength,
-                'confidence': min(strength * 100, 100)
-            }
+        direction, strength = self.score_matrix(np.array([price_history], dtype=float))
+        if direction[0] != 0 and strength[0] > self.min_strength:
+            return self._signal(market.get('id'), market.get('question'), direction[0], strength[0])
         
         return None
+    
+    async def detect_momentum_all(self, markets: List[Dict]) -> List[Dict]:
+        """
+        基于价格历史矩阵，一次检测全部市场的动量突破
+        """
+        questions = {str(m.get('id')): m.get('question') for m in markets if m.get('id')}
+        market_ids, _, matrix = self.history.load_matrix(
+            list(questions),
+            lookback=self.lookback_buckets * self.bucket,
+            bucket=self.bucket
+        )
+        
+        direction, strength = self.score_matrix(matrix)
+        hits = np.flatnonzero((direction != 0) & (strength > self.min_strength))
+        
+        signals = [
+            self._signal(market_ids[i], questions.get(market_ids[i]), direction[i], strength[i])
+            for i in hits
+        ]
+        signals.sort(key=lambda x: x['strength'], reverse=True)
+        return signals
 
 # ==========================================
 # 主系统 - 多策略融合
@@ -268,16 +327,23 @@ class PolymarketStrategyEngine:
         self.api_key = os.getenv("POLYMARKET_API_KEY")
         self.gamma_url = "https://gamma-api.polymarket.com"
         
+        # 价格历史与持仓账本
+        self.history = PriceHistoryStore()
+        self.ledger = PositionLedger()
+        
         # 初始化策略
         self.strategies = {
             'iea': ImpossibleEventStrategy(),
-            'mm': MarketMakingStrategy(),
-            'momentum': MomentumStrategy()
+            'mm': MarketMakingStrategy(self.history, self.ledger),
+            'momentum': MomentumStrategy(self.history)
         }
+        # 旧快照保留到最长的回看窗口 (做市波动率 7 天，动量 lookback_buckets 个周期)
+        momentum = self.strategies['momentum']
+        self.history.retention = max(7 * 86400, momentum.lookback_buckets * momentum.bucket)
         
-        # 缓存
-        self.market_cache = {}
-        self.cache_time = 300  # 5分钟缓存
+        # 市场页面经共享 HTTP 缓存获取，同一轮内其他模块已取过的页面直接复用
+        self.cache = shared_cache()
+        self.cache_time = 60
         
         logger.info("🚀 Strategy Engine v2.0 initialized")
         logger.info(f"   Loaded {len(self.strategies)} strategies")
@@ -287,7 +353,7 @@ class PolymarketStrategyEngine:
         markets = []
         offset = 0
         
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
             while len(markets) < limit:
                 try:
                     params = {
@@ -297,22 +363,16 @@ class PolymarketStrategyEngine:
                         'offset': offset
                     }
                     
-                    async with session.get(
-                        f"{self.gamma_url}/markets",
-                        params=params,
-                        timeout=aiohttp.ClientTimeout(total=30)
-                    ) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            if not data:
-                                break
-                            markets.extend(data)
-                            offset += 100
-                            
-                            if len(data) < 100:
-                                break
-                        else:
-                            break
+                    data = await self.cache.get_json(
+                        f"{self.gamma_url}/markets", params, ttl=self.cache_time, session=session
+                    )
+                    if not data:
+                        break
+                    markets.extend(data)
+                    offset += 100
+                    
+                    if len(data) < 100:
+                        break
                             
                 except Exception as e:
                     logger.error(f"Error fetching markets: {e}")
@@ -328,6 +388,10 @@ class PolymarketStrategyEngine:
         # 获取市场数据
         markets = await self.fetch_markets_async()
         
+        # 记录价格快照，供波动率/动量计算
+        recorded = self.history.record_markets(markets)
+        logger.info(f"   Recorded {recorded} price points")
+        
         results = {
             'timestamp': datetime.now().isoformat(),
             'markets_scanned': len(markets),
@@ -339,25 +403,34 @@ class PolymarketStrategyEngine:
             logger.info(f"\n📊 Running {strategy.name}...")
             
             if name == 'iea':
-                opportunities = await strategy.find_opportunities(markets)
+                opportunities = await strategy.find_opportunities(markets, top_k=3)
                 results['strategies']['iea'] = {
-                    'opportunities': len(opportunities),
-                    'top_3': opportunities[:3]
+                    'opportunities': strategy.total_opportunities,
+                    'top_3': opportunities
                 }
                 
             elif name == 'mm':
-                # 做市策略需要价格历史，简化处理
+                # 先导入 Hummingbot 新成交，库存偏移基于最新持仓
+                imported = self.ledger.sync_hummingbot()
+                if imported:
+                    logger.info(f"   Imported {imported} fills into position ledger")
+                
+                # 所有高流动性市场一次性计算报价
                 high_liquidity = [m for m in markets if float(m.get('liquidity', 0)) > 100_000]
+                quotes = await strategy.calculate_quotes_batch(high_liquidity)
                 results['strategies']['mm'] = {
                     'eligible_markets': len(high_liquidity),
-                    'sample_quotes': []
+                    'quote_updates': len(quotes),
+                    'sample_quotes': quotes[:5]
+                }
+            
+            elif name == 'momentum':
+                # 基于价格历史矩阵一次扫描全部市场
+                signals = await strategy.detect_momentum_all(markets)
+                results['strategies']['momentum'] = {
+                    'opportunities': len(signals),
+                    'top_signals': signals[:10]
                 }
-                
-                # 为前5个市场计算报价
-                for market in high_liquidity[:5]:
-                    quote = await strategy.calculate_quotes(market)
-                    if quote:
-                        results['strategies']['mm']['sample_quotes'].append(quote)
             
             logger.info(f"   Found {results['strategies'][name].get('opportunities', 0)} opportunities")
         
@@ -403,7 +476,8 @@ class PolymarketStrategyEngine:
             # MM策略结果
             mm_data = results['strategies'].get('mm', {})
             f.write(f"## 📊 策略2: 做市策略 (MM)\n\n")
-            f.write(f"**合格市场**: {mm_data.get('eligible_markets', 0)} 个\n\n")
+            f.write(f"**合格市场**: {mm_data.get('eligible_markets', 0)} 个\n")
+            f.write(f"**报价更新**: {mm_data.get('quote_updates', 0)} 个\n\n")
             
             if mm_data.get('sample_quotes'):
                 f.write(f"**示例报价**:\n\n")
@@ -413,6 +487,15 @@ class PolymarketStrategyEngine:
                     f.write(f"  价差: {quote.get('spread', 0):.2%}\n")
                     f.write(f"  仓位: ${quote.get('size', 0):.2f}\n\n")
             
+            # 动量策略结果
+            momentum_data = results['strategies'].get('momentum', {})
+            f.write(f"## 🚀 策略3: 动量突破 (Momentum)\n\n")
+            f.write(f"**动量信号**: {momentum_data.get('opportunities', 0)} 个\n\n")
+            
+            for signal in momentum_data.get('top_signals', [])[:5]:
+                f.write(f"- **{(signal.get('question') or 'N/A')[:50]}**\n")
+                f.write(f"  方向: {signal['signal']} | 强度: {signal['strength']:.2%}\n\n")
+            
             f.write(f"---\n\n")
             f.write(f"*报告由多策略融合引擎 v2.0 生成*\n")
             f.write(f"*基于 GitHub 主流生态优化*\n")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+持仓账本 (SQLite)
+记录每笔成交，按市场汇总净库存 (份数)
+成交来自 Hummingbot 交易数据库 (sync_hummingbot，按 rowid 游标增量导入) 或直接 record_fill
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from monitor_hummingbot import TradeDBReader
+
+logger = logging.getLogger(__name__)
+
+# Hummingbot 交易对 → Polymarket market_id 映射 (JSON 对象)，未映射的交易对按原名记账
+HUMMINGBOT_MARKET_MAP = "data/hummingbot_markets.json"
+
+
+class PositionLedger:
+    """
+    持仓账本
+    side 为 'BUY' / 'SELL'，size 为 YES 份数
+    """
+
+    def __init__(self, db_path: str = "data/positions.db"):
+        self.db_path = db_path
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fills (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                market_id TEXT NOT NULL,
+                side TEXT NOT NULL,
+                size REAL NOT NULL,
+                price REAL NOT NULL,
+                fee REAL DEFAULT 0,
+                ts REAL NOT NULL,
+                source TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_fills_market ON fills (market_id);
+
+            CREATE TABLE IF NOT EXISTS ledger_cursors (
+                source TEXT PRIMARY KEY,
+                last_rowid INTEGER NOT NULL
+            );
+        """)
+        # 成交唯一键 (来源 + 来源内 rowid)，重复导入时忽略
+        columns = {r[1] for r in self.conn.execute("PRAGMA table_info(fills)")}
+        if 'fill_key' not in columns:
+            self.conn.execute("ALTER TABLE fills ADD COLUMN fill_key TEXT")
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_fills_key ON fills (fill_key)")
+        self.conn.commit()
+
+    def record_fill(self, market_id: str, side: str, size: float, price: float,
+                    fee: float = 0.0, ts: Optional[float] = None, source: str = ""):
+        """记录一笔成交"""
+        self.conn.execute(
+            "INSERT INTO fills (market_id, side, size, price, fee, ts, source) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(market_id), side.upper(), float(size), float(price), float(fee),
+             ts if ts is not None else time.time(), source)
+        )
+        self.conn.commit()
+
+    def cursor(self, source: str) -> int:
+        row = self.conn.execute("SELECT last_rowid FROM ledger_cursors WHERE source=?", (source,)).fetchone()
+        return row[0] if row else 0
+
+    def sync_hummingbot(self, data_dir: str = "hummingbot_files/hummingbot_data",
+                        map_path: str = HUMMINGBOT_MARKET_MAP) -> int:
+        """
+        导入 Hummingbot 交易数据库中的新成交，返回导入笔数
+        每个库的成交与游标在同一事务中提交，中途失败不会重复记账
+        """
+        market_map: Dict[str, str] = {}
+        if os.path.exists(map_path):
+            with open(map_path) as f:
+                market_map = json.load(f)
+
+        directory = Path(data_dir)
+        imported = 0
+        for path in sorted(directory.glob("*.sqlite")) if directory.exists() else []:
+            source = f"hummingbot:{path.name}"
+            reader = TradeDBReader(path)
+            reader.last_fill_rowid = self.cursor(source)
+            try:
+                conn = reader.connect()
+                try:
+                    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+                    fills = reader.read_fills(conn) if 'TradeFill' in tables else []
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ 读取 {path.name} 失败: {e}")
+                continue
+            if not fills:
+                continue
+
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO fills (market_id, side, size, price, fee, ts, source, fill_key) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(market_map.get(fill.market, fill.market), fill.side, fill.amount, fill.price, fill.fee,
+                      fill.timestamp, source, f"{source}:{rowid}") for rowid, fill in fills]
+                )
+                self.conn.execute("INSERT OR REPLACE INTO ledger_cursors (source, last_rowid) VALUES (?, ?)",
+                                  (source, fills[-1][0]))
+            imported += len(fills)
+        return imported
+
+    def inventory(self, market_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """各市场净库存 (买入为正，卖出为负)"""
+        rows = self.conn.execute("""
+            SELECT market_id, SUM(CASE WHEN side = 'BUY' THEN size ELSE -size END)
+            FROM fills GROUP BY market_id
+        """).fetchall()
+        inventory = {market_id: net for market_id, net in rows}
+
+        if market_ids is None:
+            return inventory
+        return {m: inventory.get(m, 0.0) for m in market_ids}
+
+    def inventory_vector(self, market_ids: List[str]) -> List[float]:
+        """按给定顺序返回净库存"""
+        inventory = self.inventory()
+        return [inventory.get(m, 0.0) for m in market_ids]
+
+    def close(self):
+        self.conn.close()
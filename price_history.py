@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+价格历史存储 (SQLite)
+每轮扫描记录一次各市场 YES 价格快照，
+按 (市场 × 时间) 矩阵读出，供波动率与动量计算使用
+写入时删除超过 retention 的旧快照
+"""
+
+import os
+import time
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from market_catalog import MarketRecord
+
+
+class PriceHistoryStore:
+    """
+    价格历史存储
+    """
+
+    def __init__(self, db_path: str = "data/price_history.db", retention: float = 10 * 86400):
+        self.db_path = db_path
+        self.retention = retention   # 保留时长，应不小于各调用方最大的回看窗口
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS prices (
+                market_id TEXT NOT NULL,
+                ts REAL NOT NULL,
+                price REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_prices_ts ON prices (ts);
+            CREATE INDEX IF NOT EXISTS idx_prices_market_ts ON prices (market_id, ts);
+        """)
+        self.conn.commit()
+
+    def record(self, points: Iterable[Tuple[str, float]], ts: Optional[float] = None):
+        """批量写入 (market_id, price)，ts 默认为当前时间"""
+        ts = ts if ts is not None else time.time()
+        self.conn.executemany(
+            "INSERT INTO prices (market_id, ts, price) VALUES (?, ?, ?)",
+            ((str(market_id), ts, float(price)) for market_id, price in points)
+        )
+        self.conn.commit()
+
+    def record_markets(self, markets: Iterable[Dict], ts: Optional[float] = None) -> int:
+        """记录 Gamma 原始市场数据中的 YES 价格"""
+        points = []
+        for market in markets:
+            record = MarketRecord.from_gamma(market)
+            if record.market_id and record.prices:
+                points.append((record.market_id, record.prices[0]))
+
+        self.record(points, ts)
+        self.prune(ts)
+        return len(points)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """删除超过 retention 的快照"""
+        now = now if now is not None else time.time()
+        cursor = self.conn.execute("DELETE FROM prices WHERE ts < ?", (now - self.retention,))
+        self.conn.commit()
+        return cursor.rowcount
+
+    def load_matrix(self, market_ids: Optional[List[str]] = None, lookback: float = 7 * 86400,
+                    bucket: float = 3600, now: Optional[float] = None,
+                    fill: bool = True) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        读出 (市场 × 时间桶) 价格矩阵
+        同一桶内取最后一个价格；fill 时空桶向前填充，最早的空桶保持 NaN
+        返回 (market_ids, 桶起始时间, 矩阵)
+        """
+        now = now if now is not None else time.time()
+        start = now - lookback
+
+        rows = self.conn.execute(
+            "SELECT market_id, ts, price FROM prices WHERE ts >= ? ORDER BY ts", (start,)
+        ).fetchall()
+
+        n_buckets = max(int(np.ceil(lookback / bucket)), 1)
+        times = start + np.arange(n_buckets) * bucket
+
+        if not rows:
+            ids = list(market_ids or [])
+            return ids, times, np.full((len(ids), n_buckets), np.nan)
+
+        row_ids = np.array([r[0] for r in rows])
+        row_ts = np.fromiter((r[1] for r in rows), dtype=float, count=len(rows))
+        row_prices = np.fromiter((r[2] for r in rows), dtype=float, count=len(rows))
+
+        unique_ids, inverse = np.unique(row_ids, return_inverse=True)
+        if market_ids is None:
+            market_ids = unique_ids.tolist()
+
+        # unique_ids 中的位置 → 请求的行号，不在请求中的为 -1
+        position = {m: i for i, m in enumerate(market_ids)}
+        mapping = np.array([position.get(m, -1) for m in unique_ids])
+        rows_idx = mapping[inverse]
+        cols_idx = np.minimum(((row_ts - start) // bucket).astype(int), n_buckets - 1)
+
+        keep = rows_idx >= 0
+        matrix = np.full((len(market_ids), n_buckets), np.nan)
+        # 按时间升序写入，同一格后写覆盖先写
+        matrix[rows_idx[keep], cols_idx[keep]] = row_prices[keep]
+
+        return list(market_ids), times, forward_fill(matrix) if fill else matrix
+
+    def realized_volatility(self, market_ids: List[str], lookback: float = 7 * 86400,
+                            bucket: float = 3600, min_observations: int = 5) -> np.ndarray:
+        """
+        每个市场单桶价格变化的标准差 (概率单位)
+        只用真实快照 (不向前填充)，价格变化不足 min_observations 个的返回 NaN
+        """
+        _, _, matrix = self.load_matrix(market_ids, lookback, bucket, fill=False)
+        return realized_volatility(matrix, min_observations)
+
+    def close(self):
+        self.conn.close()
+
+
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """沿时间轴向前填充 NaN"""
+    if matrix.size == 0:
+        return matrix
+    valid = ~np.isnan(matrix)
+    idx = np.where(valid, np.arange(matrix.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    return matrix[np.arange(matrix.shape[0])[:, None], idx]
+
+
+def realized_volatility(matrix: np.ndarray, min_observations: int = 5) -> np.ndarray:
+    """
+    矩阵每行相邻有效价格差的标准差 (NaN 为缺失的桶)
+    跨越 k 个桶的变化除以 sqrt(k) 折算为单桶，向前填充的重复值不能当作零变化计入
+    """
+    sigma = np.full(matrix.shape[0], np.nan)
+    for i, row in enumerate(matrix):
+        observed = np.flatnonzero(np.isfinite(row))
+        if len(observed) <= min_observations:
+            continue
+        diffs = np.diff(row[observed]) / np.sqrt(np.diff(observed))
+        sigma[i] = np.std(diffs)
+    return sigma
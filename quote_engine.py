@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+做市报价引擎 (Avellaneda–Stoikov)
+以向量形式为所有市场一次性计算报价:
+
+    保留价   r = s - q·γ·σ²·T
+    最优价差 δ = γ·σ²·T + (2/γ)·ln(1 + γ/k)
+
+σ 来自价格历史的实际波动率，q 来自持仓账本的净库存。
+只有报价移动超过容差时才输出更新，减少撤改单；
+上次报价存入 SQLite (db_path)，每轮 cron 新进程启动时载入，容差过滤跨进程生效。
+"""
+
+import os
+import time
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class QuoteEngine:
+    """
+    向量化报价引擎
+    """
+
+    def __init__(self, gamma: float = 1.0, k: float = 100.0, horizon: float = 24,
+                 inventory_unit: float = 100, min_spread: float = 0.02, tick: float = 0.01,
+                 tolerance: float = 0.005, fallback_sigma: float = 0.02,
+                 db_path: Optional[str] = None):
+        self.gamma = gamma                    # 风险厌恶系数
+        self.k = k                            # 订单到达强度
+        self.horizon = horizon                # 报价周期 (以波动率时间桶计)
+        self.inventory_unit = inventory_unit  # 库存归一化单位 (份)
+        self.min_spread = min_spread          # 最小价差
+        self.tick = tick                      # 最小报价单位
+        self.tolerance = tolerance            # 报价更新容差
+        self.fallback_sigma = fallback_sigma  # 无历史时的默认波动率
+
+        self.last_quotes: Dict[str, Tuple[float, float]] = {}
+
+        self.conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.conn = sqlite3.connect(db_path)
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS last_quotes (
+                    market_id TEXT PRIMARY KEY,
+                    bid REAL NOT NULL,
+                    ask REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+            """)
+            self.conn.commit()
+            self.last_quotes = {
+                market_id: (bid, ask)
+                for market_id, bid, ask in self.conn.execute("SELECT market_id, bid, ask FROM last_quotes")
+            }
+
+    def compute(self, mids: np.ndarray, sigmas: np.ndarray,
+                inventories: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        计算全部市场报价
+        返回 (bid, ask, spread, reservation)
+        """
+        mids = np.asarray(mids, dtype=float)
+        sigmas = np.asarray(sigmas, dtype=float)
+        sigmas = np.where(np.isnan(sigmas), self.fallback_sigma, sigmas)
+        q = np.asarray(inventories, dtype=float) / self.inventory_unit
+
+        variance = self.gamma * sigmas ** 2 * self.horizon
+        reservation = mids - q * variance
+        spread = variance + (2 / self.gamma) * np.log1p(self.gamma / self.k)
+        spread = np.maximum(spread, self.min_spread)
+
+        # 向外取整到 tick，并限制在 (0, 1) 内
+        bid = np.floor((reservation - spread / 2) / self.tick + 1e-9) * self.tick
+        ask = np.ceil((reservation + spread / 2) / self.tick - 1e-9) * self.tick
+        bid = np.clip(bid, self.tick, 1 - 2 * self.tick)
+        ask = np.clip(ask, bid + self.tick, 1 - self.tick)
+
+        return np.round(bid, 6), np.round(ask, 6), spread, reservation
+
+    def update(self, market_ids: List[str], mids: np.ndarray, sigmas: np.ndarray,
+               inventories: np.ndarray, sizes: Optional[np.ndarray] = None) -> List[Dict]:
+        """
+        重新计算报价，只返回移动超过容差的市场
+        """
+        bid, ask, spread, reservation = self.compute(mids, sigmas, inventories)
+
+        previous = np.array([self.last_quotes.get(m, (np.nan, np.nan)) for m in market_ids]).reshape(-1, 2)
+        moved = (
+            np.isnan(previous[:, 0])
+            | (np.abs(bid - previous[:, 0]) > self.tolerance)
+            | (np.abs(ask - previous[:, 1]) > self.tolerance)
+        )
+
+        updates = []
+        for i in np.flatnonzero(moved):
+            market_id = market_ids[i]
+            self.last_quotes[market_id] = (bid[i], ask[i])
+            updates.append({
+                'market_id': market_id,
+                'strategy': 'MM',
+                'mid': float(mids[i]),
+                'reservation': float(reservation[i]),
+                'bid': float(bid[i]),
+                'ask': float(ask[i]),
+                'spread': float(ask[i] - bid[i]),
+                'inventory': float(inventories[i]),
+                'size': float(sizes[i]) if sizes is not None else None
+            })
+
+        if self.conn is not None and updates:
+            now = time.time()
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO last_quotes (market_id, bid, ask, updated_at) VALUES (?, ?, ?, ?)",
+                    [(u['market_id'], u['bid'], u['ask'], now) for u in updates]
+                )
+
+        return updates
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+已处理条目存储 (SQLite)
+各监控共用的去重层: 按命名空间记录已见过的键，带 TTL 过期与每个命名空间的数量上限，
+内存占用不随运行时间增长，重启后也不会重复提醒。
+"""
+
+import os
+import time
+import sqlite3
+from typing import Iterable, List, Optional
+
+
+class SeenStore:
+    """
+    持久化去重集合
+    """
+
+    def __init__(self, namespace: str, db_path: str = "data/seen.db",
+                 ttl: float = 7 * 86400, max_items: int = 100000):
+        self.namespace = namespace
+        self.db_path = db_path
+        self.ttl = ttl              # 过期时间 (秒)
+        self.max_items = max_items  # 每个命名空间最多保留的条目
+        self._writes = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # 多个监控进程共用同一文件
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS seen (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                ts REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_seen_ts ON seen (namespace, ts);
+        """)
+        self.conn.commit()
+        self.purge()
+
+    def __contains__(self, key: str) -> bool:
+        row = self.conn.execute(
+            "SELECT ts FROM seen WHERE namespace=? AND key=?", (self.namespace, str(key))
+        ).fetchone()
+        return row is not None and row[0] >= time.time() - self.ttl
+
+    def __len__(self) -> int:
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM seen WHERE namespace=? AND ts >= ?",
+            (self.namespace, time.time() - self.ttl)
+        ).fetchone()
+        return row[0]
+
+    def add(self, key: str) -> bool:
+        """记录一个键，返回它此前是否未见过 (或已过期)"""
+        return bool(self.add_many([key]))
+
+    def add_many(self, keys: Iterable[str]) -> List[str]:
+        """批量记录，返回其中新出现的键 (保持输入顺序)"""
+        now = time.time()
+        cutoff = now - self.ttl
+        new = []
+
+        for key in keys:
+            key = str(key)
+            cursor = self.conn.execute(
+                """INSERT INTO seen (namespace, key, ts) VALUES (?, ?, ?)
+                   ON CONFLICT(namespace, key) DO UPDATE SET ts=excluded.ts WHERE seen.ts < ?""",
+                (self.namespace, key, now, cutoff)
+            )
+            if cursor.rowcount:
+                new.append(key)
+
+        self.conn.commit()
+
+        self._writes += len(new)
+        if self._writes >= 1000:
+            self.purge()
+        return new
+
+    def filter_new(self, items: Iterable, key) -> List:
+        """过滤出未见过的条目并记录，key 为取键函数"""
+        items = list(items)
+        keys = [str(key(item)) for item in items]
+        new = set(self.add_many(keys))
+
+        result = []
+        for item, k in zip(items, keys):
+            if k in new:
+                result.append(item)
+                new.discard(k)  # 同一批内重复的只保留第一个
+        return result
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """删除过期条目，并把命名空间裁剪到 max_items"""
+        now = now if now is not None else time.time()
+        removed = self.conn.execute(
+            "DELETE FROM seen WHERE namespace=? AND ts < ?", (self.namespace, now - self.ttl)
+        ).rowcount
+
+        removed += self.conn.execute(
+            """DELETE FROM seen WHERE namespace=? AND key IN (
+                   SELECT key FROM seen WHERE namespace=? ORDER BY ts DESC LIMIT -1 OFFSET ?
+               )""",
+            (self.namespace, self.namespace, self.max_items)
+        ).rowcount
+
+        self.conn.commit()
+        self._writes = 0
+        return removed
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+统一信号总线
+Twitter / 外部数据源 / 链上监控 / 扫描器发布 Signal，融合中心订阅消费。
+
+两种模式:
+1. 进程内: SignalBus()，基于 asyncio.Queue 的发布/订阅
+2. 持久化: SignalBus(db_path)，信号写入 SQLite，
+   订阅时指定 consumer 名称即按游标读取，可跨进程、重启后从游标继续
+
+各监控脚本是独立进程，默认使用共享的持久化总线 SIGNAL_DB (WAL 模式，读写互不阻塞)。
+
+投递语义: consumer 订阅为「至多一次」。游标在信号读入订阅队列时推进 (先于处理)，
+进程在处理完队列前退出时，队列中剩余的信号不会重新投递；需要不丢失时应自行幂等并用 read_since 手动消费。
+所有已登记的消费者都读过的信号会被定期清理，新消费者只能读到清理后剩余的信号。
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_DB = os.getenv(
+    'SIGNAL_BUS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'signals.db')
+)
+
+
+@dataclass
+class Signal:
+    """
+    一条信号
+    source: twitter / fivethirtyeight / espn / onchain / news / scanner
+    confidence: 0-100
+    """
+    source: str
+    kind: str
+    confidence: float
+    market_id: Optional[str] = None
+    payload: Dict = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+    id: Optional[int] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_row(cls, row: tuple) -> 'Signal':
+        signal_id, source, kind, confidence, market_id, payload, ts = row
+        return cls(source, kind, confidence, market_id, json.loads(payload), ts, signal_id)
+
+
+class Subscription:
+    """
+    一个订阅者的信号队列，可 async for 迭代
+    """
+
+    def __init__(self, bus: 'SignalBus', sources: Optional[Iterable[str]], maxsize: int,
+                 consumer: Optional[str] = None):
+        self.bus = bus
+        self.sources = set(sources) if sources else None
+        self.consumer = consumer
+        self.queue: "asyncio.Queue[Signal]" = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self._pump: Optional[asyncio.Task] = None
+
+    def matches(self, signal: Signal) -> bool:
+        return self.sources is None or signal.source in self.sources
+
+    def deliver(self, signal: Signal):
+        """放入队列，满时丢弃最旧的信号"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(signal)
+
+    async def get(self) -> Signal:
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Signal:
+        return await self.queue.get()
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class SignalBus:
+    """
+    异步发布/订阅总线
+    """
+
+    def __init__(self, db_path: Optional[str] = None, poll_interval: float = 1.0,
+                 timeout: float = 30, prune_every: int = 100):
+        self.db_path = db_path
+        self.poll_interval = poll_interval  # 持久化模式下读取其他进程写入的间隔
+        self.prune_every = prune_every      # 每推进多少次游标清理一次已确认的信号
+        self._advances = 0
+        self.subscriptions: List[Subscription] = []
+        self.published = 0
+
+        self.conn = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # 多个监控进程同时写入: WAL 让读不阻塞写，timeout 等待其他进程的写锁
+            self.conn = sqlite3.connect(db_path, timeout=timeout)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS signals (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    market_id TEXT,
+                    payload TEXT,
+                    ts REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS signal_cursors (
+                    consumer TEXT PRIMARY KEY,
+                    last_id INTEGER NOT NULL
+                );
+            """)
+            self.conn.commit()
+
+    @property
+    def durable(self) -> bool:
+        return self.conn is not None
+
+    def publish_nowait(self, signal: Signal) -> Signal:
+        """
+        同步发布，供非 asyncio 的生产者使用
+        持久化模式下写入数据库；进程内订阅者直接收到 (带 consumer 的订阅从数据库读取)
+        """
+        if self.conn is not None:
+            cursor = self.conn.execute(
+                "INSERT INTO signals (source, kind, confidence, market_id, payload, ts) VALUES (?, ?, ?, ?, ?, ?)",
+                (signal.source, signal.kind, float(signal.confidence), signal.market_id,
+                 json.dumps(signal.payload, ensure_ascii=False, default=str), signal.timestamp)
+            )
+            self.conn.commit()
+            signal.id = cursor.lastrowid
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+        for subscription in self.subscriptions:
+            if subscription.consumer is None and subscription.matches(signal):
+                subscription.deliver(signal)
+
+        self.published += 1
+        return signal
+
+    async def publish(self, signal: Signal) -> Signal:
+        return self.publish_nowait(signal)
+
+    def subscribe(self, sources: Optional[Iterable[str]] = None, maxsize: int = 10000,
+                  consumer: Optional[str] = None) -> Subscription:
+        """
+        订阅信号
+        consumer 仅在持久化模式下有效: 从该消费者上次的游标继续读取
+        """
+        if consumer and not self.durable:
+            raise ValueError("consumer 订阅需要持久化模式 (db_path)")
+
+        subscription = Subscription(self, sources, maxsize, consumer)
+        self.subscriptions.append(subscription)
+
+        if consumer:
+            if self._wakeup is None:
+                self._wakeup = asyncio.Event()
+            subscription._pump = asyncio.create_task(self._pump(subscription))
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+        if subscription._pump is not None:
+            subscription._pump.cancel()
+
+    def read_since(self, consumer: str, limit: int = 1000) -> List[Signal]:
+        """
+        读取消费者游标之后的信号并推进游标
+        游标在返回前即已提交: 调用方处理失败时这些信号不会再次返回 (至多一次)
+        """
+        row = self.conn.execute(
+            "SELECT last_id FROM signal_cursors WHERE consumer=?", (consumer,)
+        ).fetchone()
+        last_id = row[0] if row else 0
+
+        rows = self.conn.execute(
+            "SELECT id, source, kind, confidence, market_id, payload, ts FROM signals "
+            "WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)
+        ).fetchall()
+
+        if rows:
+            self.conn.execute(
+                """INSERT INTO signal_cursors (consumer, last_id) VALUES (?, ?)
+                   ON CONFLICT(consumer) DO UPDATE SET last_id=excluded.last_id""",
+                (consumer, rows[-1][0])
+            )
+            self.conn.commit()
+            self._advances += 1
+            if self._advances % self.prune_every == 0:
+                self.prune()
+
+        return [Signal.from_row(r) for r in rows]
+
+    def prune(self) -> int:
+        """删除所有已登记消费者都已读过的信号，返回删除条数 (没有消费者时不删除)"""
+        row = self.conn.execute("SELECT MIN(last_id) FROM signal_cursors").fetchone()
+        if row is None or row[0] is None:
+            return 0
+        deleted = self.conn.execute("DELETE FROM signals WHERE id <= ?", (row[0],)).rowcount
+        self.conn.commit()
+        if deleted:
+            logger.debug(f"🧹 清理 {deleted} 条已确认信号")
+        return deleted
+
+    async def _pump(self, subscription: Subscription):
+        """把数据库中的新信号搬到订阅队列；本进程发布时立即唤醒"""
+        while True:
+            self._wakeup.clear()
+            try:
+                signals = self.read_since(subscription.consumer)
+            except sqlite3.Error as e:
+                logger.error(f"❌ 读取信号失败: {e}")
+                signals = []
+
+            for signal in signals:
+                if subscription.matches(signal):
+                    await subscription.queue.put(signal)
+
+            if signals:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def close(self):
+        for subscription in list(self.subscriptions):
+            self.unsubscribe(subscription)
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
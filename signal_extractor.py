@@ -2,59 +2,104 @@
 """
 信号提取器 - 从日志中识别交易信号
 无需 Discord/Telegram，直接读取本地日志
+
+日志由 LogWatcher 增量跟踪 (Linux 上基于 inotify)，
+每条新增行只匹配一次，命中的信号放入队列由主线程输出。
 """
 
 import re
 import time
+import queue
+import threading
 from datetime import datetime
-from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from log_tailer import LogWatcher
+
+LOG_FILES = {
+    'twitter': '/root/clawd/twitter_monitor_0xCristal.log',
+    'data_integration': '/root/clawd/data_integration.log'
+}
+
+# 信号模式 (按优先级排列，命中第一个即停止)
+SIGNAL_PATTERNS = [
+    (r'🚨.*signal.*detected', 'HIGH'),
+    (r'置信度.*([0-9]+)', 'MEDIUM'),
+    (r'bought|sold|long|short', 'LOW'),
+]
+
+
+class SignalExtractor:
+    """
+    日志信号提取器
+    """
+
+    def __init__(self, log_files: Dict[str, str] = None,
+                 patterns: List[Tuple[str, str]] = None, poll_interval: float = 5.0):
+        self.log_files = log_files or LOG_FILES
+        self.patterns = [(re.compile(p, re.IGNORECASE), level) for p, level in (patterns or SIGNAL_PATTERNS)]
+        self.watcher = LogWatcher(self.log_files.values(), from_end=True, poll_interval=poll_interval)
+        self.names = {path: name for path, name in zip(self.watcher.tailers, self.log_files)}
+        self.signals: "queue.Queue[Dict]" = queue.Queue()
+
+    def match(self, line: str) -> Optional[str]:
+        """返回命中的信号级别"""
+        for pattern, level in self.patterns:
+            if pattern.search(line):
+                return level
+        return None
+
+    def _produce(self):
+        while True:
+            try:
+                for path, line in self.watcher.follow():
+                    level = self.match(line)
+                    if level:
+                        self.signals.put({
+                            'source': self.names.get(path, path),
+                            'level': level,
+                            'line': line.strip(),
+                            'timestamp': datetime.now()
+                        })
+            except Exception as e:
+                print(f"错误: {e}")
+                time.sleep(10)
+
+    def start(self) -> threading.Thread:
+        """后台线程跟踪日志"""
+        thread = threading.Thread(target=self._produce, name='signal-extractor', daemon=True)
+        thread.start()
+        return thread
+
 
 def monitor_logs():
     """
     实时监控日志文件并提取信号
     """
-    log_files = {
-        'twitter': '/root/clawd/twitter_monitor_0xCristal.log',
-        'data_integration': '/root/clawd/data_integration.log'
-    }
-    
+    extractor = SignalExtractor()
+
     print("🔍 信号提取器已启动")
     print("=" * 60)
-    print("监控以下日志文件:")
-    for name, path in log_files.items():
+    print(f"监控以下日志文件 ({extractor.watcher.mode}):")
+    for name, path in extractor.log_files.items():
         print(f"  - {name}: {path}")
     print("=" * 60)
     print()
-    
-    # 信号模式
-    signal_patterns = [
-        (r'🚨.*signal.*detected', 'HIGH'),
-        (r'置信度.*([0-9]+)', 'MEDIUM'),
-        (r'bought|sold|long|short', 'LOW'),
-    ]
-    
-    while True:
+
+    thread = extractor.start()
+
+    while thread.is_alive():
         try:
-            for name, path in log_files.items():
-                if Path(path).exists():
-                    with open(path, 'r') as f:
-                        lines = f.readlines()
-                        
-                    # 检查最近10行
-                    for line in lines[-10:]:
-                        for pattern, level in signal_patterns:
-                            if re.search(pattern, line, re.IGNORECASE):
-                                timestamp = datetime.now().strftime('%H:%M:%S')
-                                print(f"[{timestamp}] [{level}] {name}: {line.strip()}")
-                                
-                                if level == 'HIGH':
-                                    print("  ⚠️  高优先级信号！请检查详情")
-                                
-            time.sleep(5)  # 每5秒检查一次
-            
-        except Exception as e:
-            print(f"错误: {e}")
-            time.sleep(10)
+            signal = extractor.signals.get(timeout=1)
+        except queue.Empty:
+            continue
+
+        print(f"[{signal['timestamp']:%H:%M:%S}] [{signal['level']}] {signal['source']}: {signal['line']}")
+        if signal['level'] == 'HIGH':
+            print("  ⚠️  高优先级信号！请检查详情")
+
+    print("❌ 日志跟踪线程已退出")
+
 
 if __name__ == "__main__":
     monitor_logs()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+ESPN 体育数据采集与市场关联
+- 所有联赛的伤病 / 新闻 / 球队接口在一个会话中并发请求；
+  经共享 HTTP 缓存 (http_cache) 按接口设置缓存时间 (球队列表一天一次)，过期后做条件请求，
+  按缓存条目的内容版本判断接口是否有新内容
+- 伤病与新闻统一为事件: 联赛、球队、球员、状态、严重程度；
+  伤病状态变化 (Questionable → Out) 视为新事件
+- 用 ESPN 球队名单在市场目录中建立 球队 → 未关闭市场 索引，事件按球队关联市场，
+  同时涉及两支同联赛球队的对阵市场排在前面
+"""
+
+import re
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from http_cache import ResponseCache, shared_cache
+from market_catalog import MarketCatalog, MarketRecord
+
+logger = logging.getLogger(__name__)
+
+ESPN_API = "https://site.api.espn.com/apis/site/v2/sports"
+
+# 伤病状态 → 严重程度
+INJURY_SEVERITY = {
+    'out': 1.0,
+    'injured reserve': 1.0,
+    'suspension': 0.9,
+    'doubtful': 0.75,
+    'questionable': 0.5,
+    'day-to-day': 0.4,
+    'probable': 0.2,
+}
+
+# 重要新闻关键词 (按词边界匹配，避免 "about" 命中 "out")
+NEWS_PATTERN = re.compile(
+    r'\b(injur\w*|ruled out|out for|out indefinitely|questionable|doubtful|suspend\w*|'
+    r'trade[ds]?|traded|waive[ds]?|starting lineup|will start|to start|returns?|sidelined)\b',
+    re.IGNORECASE
+)
+
+# 联赛代号 → 市场文本中可能出现的联赛关键词
+LEAGUE_KEYWORDS = {
+    'nba': ('nba',),
+    'nfl': ('nfl', 'super bowl'),
+    'mlb': ('mlb', 'world series'),
+    'nhl': ('nhl', 'stanley cup'),
+    'wnba': ('wnba',),
+}
+
+
+def league_of(sport: str) -> str:
+    """'basketball/nba' → 'nba'"""
+    return sport.rsplit('/', 1)[-1]
+
+
+def injury_severity(status: str) -> float:
+    status = (status or '').lower()
+    for key, severity in INJURY_SEVERITY.items():
+        if key in status:
+            return severity
+    return 0.3
+
+
+class TeamIndex:
+    """
+    单个联赛的球队名单与 球队 → 市场 索引
+    全名直接匹配；昵称 (如 Lakers) 在其他联赛也可能出现，需要文本中有联赛关键词或另一支同联赛球队
+    """
+
+    def __init__(self, league: str, teams: List[Dict]):
+        self.league = league
+        self.teams: Dict[str, Dict] = {}
+        self.aliases: Dict[str, Tuple[str, bool]] = {}   # 小写别名 → (球队缩写, 是否全名)
+
+        for team in teams:
+            abbr = team.get('abbreviation') or team.get('id')
+            if not abbr:
+                continue
+            self.teams[abbr] = team
+            for field, full in (('displayName', True), ('shortDisplayName', False), ('name', False)):
+                alias = (team.get(field) or '').lower()
+                if alias and (alias not in self.aliases or full):
+                    self.aliases[alias] = (abbr, full)
+
+        names = sorted(self.aliases, key=len, reverse=True)
+        self.pattern = re.compile(r'\b(' + '|'.join(re.escape(n) for n in names) + r')\b') if names else None
+        self.markets: Dict[str, List[str]] = {}   # 球队缩写 → market_id (对阵市场在前)
+
+    def find_teams(self, text: str) -> List[str]:
+        """文本中提到的本联赛球队"""
+        if self.pattern is None:
+            return []
+        text = text.lower()
+        found: Dict[str, bool] = {}
+        for match in self.pattern.finditer(text):
+            abbr, full = self.aliases[match.group(1)]
+            found[abbr] = found.get(abbr, False) or full
+
+        league_mentioned = any(k in text for k in LEAGUE_KEYWORDS.get(self.league, (self.league,)))
+        if len(found) >= 2 or league_mentioned:
+            return list(found)
+        return [abbr for abbr, full in found.items() if full]
+
+    def team_for(self, name: str) -> Optional[str]:
+        """球队名/缩写 → 球队缩写"""
+        if not name:
+            return None
+        if name in self.teams:
+            return name
+        entry = self.aliases.get(name.lower())
+        return entry[0] if entry else None
+
+    def index_markets(self, records: Iterable[MarketRecord]) -> int:
+        games: Dict[str, List[str]] = {}
+        others: Dict[str, List[str]] = {}
+        for record in records:
+            text = ' '.join(p for p in (record.question, record.group_item_title, record.event_title) if p)
+            teams = self.find_teams(text)
+            target = games if len(teams) >= 2 else others
+            for abbr in teams:
+                target.setdefault(abbr, []).append(record.market_id)
+
+        self.markets = {
+            abbr: games.get(abbr, []) + others.get(abbr, [])
+            for abbr in set(games) | set(others)
+        }
+        return sum(len(v) for v in self.markets.values())
+
+
+class SportsIngester:
+    """
+    ESPN 多联赛并发采集器
+    """
+
+    def __init__(self, sports: Optional[List[str]] = None, base_url: str = ESPN_API,
+                 concurrency: int = 16, timeout: float = 15,
+                 ttl: Optional[Dict[str, float]] = None, max_markets: int = 3,
+                 cache: Optional[ResponseCache] = None):
+        self.sports = sports or ['basketball/nba', 'football/nfl']
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ttl = {'injuries': 60, 'news': 60, 'teams': 86400}
+        self.ttl.update(ttl or {})
+        self.max_markets = max_markets   # 每个事件最多关联的市场数
+
+        self.cache = cache or shared_cache()
+        self.versions: Dict[str, int] = {}        # URL → 已处理的内容版本
+        self.indexes: Dict[str, TeamIndex] = {}                   # 联赛 → 球队索引
+        self.catalog: Optional[MarketCatalog] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    async def _get(self, session: aiohttp.ClientSession, sport: str, endpoint: str) -> Tuple[Optional[Dict], bool]:
+        """
+        经缓存请求接口，返回 (数据, 是否有更新)
+        内容版本与上次处理时相同 (缓存命中 / 304 / 正文未变) 时 更新=False
+        """
+        url = f"{self.base_url}/{sport}/{endpoint}"
+        try:
+            entry = await self.cache.fetch(url, ttl=self.ttl[endpoint], session=session)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error(f"❌ 获取 ESPN {sport}/{endpoint} 失败: {e}")
+            return None, False
+
+        updated = self.versions.get(url) != entry.version
+        self.versions[url] = entry.version
+        return entry.data, updated
+
+    async def _load_teams(self, session: aiohttp.ClientSession, sport: str):
+        data, updated = await self._get(session, sport, 'teams')
+        league = league_of(sport)
+        if not data or (not updated and league in self.indexes):
+            return
+
+        teams = []
+        for sport_entry in data.get('sports', []):
+            for league_entry in sport_entry.get('leagues', []):
+                teams.extend(t.get('team', t) for t in league_entry.get('teams', []))
+
+        self.indexes[league] = TeamIndex(league, teams)
+        if self.catalog is not None:
+            self.indexes[league].index_markets(self.catalog.markets.values())
+        logger.info(f"🏟️ {league.upper()}: {len(teams)} 支球队")
+
+    def sync_catalog(self, catalog: MarketCatalog) -> Dict[str, int]:
+        """目录刷新后重建各联赛的 球队 → 市场 索引"""
+        self.catalog = catalog
+        return {league: index.index_markets(catalog.markets.values()) for league, index in self.indexes.items()}
+
+    def normalize_injuries(self, sport: str, data: Optional[Dict]) -> List[Dict]:
+        league = league_of(sport)
+        index = self.indexes.get(league)
+        events = []
+        for team_entry in (data or {}).get('injuries', []):
+            team_name = team_entry.get('displayName', '')
+            for injury in team_entry.get('injuries', []):
+                athlete = injury.get('athlete') or {}
+                team = athlete.get('team') or {}
+                abbr = (team.get('abbreviation')
+                        or (index.team_for(team.get('displayName') or team_name) if index else None))
+                status = injury.get('status') or (injury.get('type') or {}).get('description', '')
+                player = athlete.get('displayName', '')
+                events.append({
+                    'id': f"{league}:injury:{injury.get('id') or player}:{status}:{injury.get('date', '')}",
+                    'sport': sport,
+                    'league': league,
+                    'kind': 'injury',
+                    'team': abbr,
+                    'team_name': team.get('displayName') or team_name,
+                    'player': player,
+                    'position': (athlete.get('position') or {}).get('abbreviation', ''),
+                    'status': status,
+                    'severity': injury_severity(status),
+                    'headline': f"{player} ({team.get('displayName') or team_name}): {status}",
+                    'description': injury.get('shortComment') or injury.get('longComment') or '',
+                    'published': injury.get('date', '')
+                })
+        return events
+
+    def normalize_news(self, sport: str, data: Optional[Dict]) -> List[Dict]:
+        league = league_of(sport)
+        index = self.indexes.get(league)
+        events = []
+        for article in (data or {}).get('articles', []):
+            headline = article.get('headline', '')
+            description = article.get('description', '')
+            if not NEWS_PATTERN.search(headline + ' ' + description):
+                continue
+
+            teams, players = [], []
+            for category in article.get('categories', []):
+                if category.get('type') == 'team':
+                    abbr = index.team_for(category.get('description', '')) if index else None
+                    if abbr:
+                        teams.append(abbr)
+                elif category.get('type') == 'athlete':
+                    players.append(category.get('description', ''))
+            if not teams and index:
+                teams = index.find_teams(headline)
+
+            events.append({
+                'id': f"{league}:news:{article.get('id') or headline}",
+                'sport': sport,
+                'league': league,
+                'kind': 'news',
+                'team': teams[0] if teams else None,
+                'teams': teams,
+                'players': players,
+                'severity': 0.5,
+                'headline': headline,
+                'description': description,
+                'published': article.get('published', '')
+            })
+        return events
+
+    def link_markets(self, event: Dict) -> List[str]:
+        """事件涉及球队的未关闭市场"""
+        index = self.indexes.get(event['league'])
+        if index is None:
+            return []
+        market_ids: List[str] = []
+        for abbr in event.get('teams') or [event.get('team')]:
+            for market_id in index.markets.get(abbr, []):
+                if market_id not in market_ids:
+                    market_ids.append(market_id)
+        return market_ids[:self.max_markets]
+
+    async def poll(self, session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+        """
+        并发抓取所有联赛的伤病与新闻，返回有更新接口中的事件 (已附带关联市场)
+        未传入 session 时使用采集器自己的长连接会话
+        """
+        if session is None:
+            if self.session is None or self.session.closed:
+                self.session = self._new_session()
+            session = self.session
+
+        await asyncio.gather(*(self._load_teams(session, sport) for sport in self.sports))
+
+        requests = [(sport, endpoint) for sport in self.sports for endpoint in ('injuries', 'news')]
+        results = await asyncio.gather(*(self._get(session, sport, endpoint) for sport, endpoint in requests))
+
+        events = []
+        for (sport, endpoint), (data, updated) in zip(requests, results):
+            if not updated:
+                continue
+            normalize = self.normalize_injuries if endpoint == 'injuries' else self.normalize_news
+            events.extend(normalize(sport, data))
+
+        for event in events:
+            event['market_ids'] = self.link_markets(event)
+        return events
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+ctf_decoder.FlowTracker 离线检查: 区块游标未提交、同一批成交被重新拉取时不重复累计
+"""
+
+import json
+
+from ctf_decoder import FlowTracker
+from market_catalog import MarketCatalog
+
+YES_TOKEN, NO_TOKEN = '1111', '2222'
+EXCHANGE = '0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e'
+
+
+def make_catalog() -> MarketCatalog:
+    catalog = MarketCatalog()
+    catalog.load([{
+        'id': '253591', 'question': 'Fed cut in March?', 'conditionId': '0x' + 'ab' * 32,
+        'outcomes': json.dumps(['Yes', 'No']), 'outcomePrices': json.dumps(['0.34', '0.66']),
+        'clobTokenIds': json.dumps([YES_TOKEN, NO_TOKEN]),
+    }])
+    return catalog
+
+
+def fill(block: int, index: int, token: str, side: str, usdc: float) -> dict:
+    return {
+        'block_number': block, 'log_index': index, 'tx_hash': '0x' + f'{block:x}'.rjust(64, '0'),
+        'exchange': EXCHANGE, 'maker': '0x' + 'aa' * 20, 'taker': EXCHANGE, 'token_id': token,
+        'side': side, 'size': usdc / 0.34, 'usdc': usdc, 'price': 0.34, 'fee': 0.0, 'aggressor': True,
+    }
+
+
+def test_refetched_fills_not_double_counted():
+    tracker = FlowTracker(make_catalog())
+    fills = [fill(100, 0, YES_TOKEN, 'BUY', 30000), fill(100, 1, NO_TOKEN, 'BUY', 5000)]
+    times = {100: 1_700_000_000}
+
+    tracker.add_fills(fills, times)
+    tracker.add_fills(fills, times)                       # 上一轮未提交游标，重新拉取
+    tracker.add_fills([fill(101, 0, YES_TOKEN, 'SELL', 1000)], {101: 1_700_000_002})
+
+    (signal,) = tracker.signals(3600, min_flow=1000)
+    assert signal['buy_usdc'] == 30000 and signal['sell_usdc'] == 6000
+    assert tracker.duplicates == 2
+    assert tracker.wallet_flows[3600].totals['0x' + 'aa' * 20][2] == 3
+
+
+def test_seen_keys_expire_with_longest_window():
+    tracker = FlowTracker(make_catalog())
+    tracker.add_fills([fill(100, 0, YES_TOKEN, 'BUY', 30000)], {100: 1_700_000_000})
+    tracker.expire(1_700_000_000 + 3600 + 1)
+    assert len(tracker.seen) == 1                          # 24 小时窗口仍包含该成交
+    tracker.expire(1_700_000_000 + 86400 + 1)
+    assert not tracker.seen and not tracker.market_flows[86400].totals
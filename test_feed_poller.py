@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+feed_poller 离线检查
+本地 aiohttp 服务模拟两个 Nitter 镜像: 一个返回 fixtures/nitter_rss.xml (支持 ETag)，一个始终 500
+"""
+
+import time
+import asyncio
+from pathlib import Path
+
+from aiohttp import web
+
+from feed_poller import FeedPoller
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'nitter_rss.xml'
+ETAG = '"rss-v1"'
+
+
+async def start_mirror(handler):
+    app = web.Application()
+    app.router.add_get('/{user}/rss', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def poll_twice():
+    requests = {'good': 0, 'bad': 0}
+
+    async def good(request):
+        requests['good'] += 1
+        if request.headers.get('If-None-Match') == ETAG:
+            return web.Response(status=304)
+        return web.Response(body=FIXTURE.read_bytes(), content_type='application/rss+xml',
+                            headers={'ETag': ETAG})
+
+    async def bad(request):
+        requests['bad'] += 1
+        return web.Response(status=500)
+
+    good_runner, good_url = await start_mirror(good)
+    bad_runner, bad_url = await start_mirror(bad)
+    poller = FeedPoller(instances=[bad_url, good_url], timeout=5)
+    poller.health[good_url].latency = 2.0   # 初始排序让坏镜像先被尝试
+    try:
+        first = await poller.poll(['0xCristal', 'polymarket'])
+        second = await poller.poll(['0xCristal', 'polymarket'])
+    finally:
+        await poller.close()
+        await good_runner.cleanup()
+        await bad_runner.cleanup()
+    return poller, bad_url, good_url, first, second, requests
+
+
+def test_poll_fixture_mirrors():
+    poller, bad_url, good_url, first, second, requests = asyncio.run(poll_twice())
+
+    tweets = first['0xCristal']
+    assert len(tweets) == 2 and len(first['polymarket']) == 2
+    assert tweets[0]['title'].startswith('New Polymarket position')
+    assert tweets[0]['link'].endswith('1754882710001#m')
+    assert second == {}                                     # 两个账号都 304
+    assert requests['bad'] == 2                             # 失败后进入冷却，第二轮不再请求
+    assert not poller.health[bad_url].available(time.time())
+    assert poller.preferred['0xCristal'] == good_url
+    assert poller.validators[('0xCristal', good_url)] == {'If-None-Match': ETAG}
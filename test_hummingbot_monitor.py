@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+monitor_hummingbot 离线检查
+用 fixtures/hummingbot_trades.sql (Hummingbot 真实表结构与成交行) 建库，验证 SqliteDecimal 缩放
+"""
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from monitor_hummingbot import PerformanceTracker, TradeDBReader
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'hummingbot_trades.sql'
+
+
+def build_trade_db(directory: str) -> Path:
+    path = Path(directory) / 'conf_pure_mm_1.sqlite'
+    conn = sqlite3.connect(path)
+    conn.executescript(FIXTURE.read_text())
+    conn.close()
+    return path
+
+
+def test_trade_fill_decimal_scaling():
+    with tempfile.TemporaryDirectory() as directory:
+        tracker = PerformanceTracker()
+        TradeDBReader(build_trade_db(directory)).read(tracker)
+
+    stats = tracker.markets['TRUMP-2024']
+    buy, sell = list(tracker.recent_fills)
+    assert (buy.side, buy.price, buy.amount) == ('BUY', 0.53, 10.0)
+    assert abs(buy.fee - 0.0106) < 1e-12
+    assert (sell.price, sell.amount) == (0.55, 4.0)
+    assert stats.orders == 2 and stats.fills == 2
+    assert abs(stats.position - 6.0) < 1e-9
+    assert abs(stats.realized_pnl - 4.0 * 0.02) < 1e-9
+
+
+def test_trade_fill_float_columns():
+    """旧版本 FLOAT 列按原值读取"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'legacy.sqlite'
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE TradeFill (symbol TEXT, timestamp BIGINT, order_id TEXT, trade_type TEXT,
+                                    price FLOAT, amount FLOAT);
+            INSERT INTO TradeFill VALUES ('TRUMP-2024', 1707206412000, 'o1', 'BUY', 0.53, 10.0);
+        """)
+        conn.close()
+        tracker = PerformanceTracker()
+        TradeDBReader(path).read(tracker)
+
+    fill = tracker.recent_fills[0]
+    assert (fill.price, fill.amount, fill.fee) == (0.53, 10.0, 0.0)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+做市报价离线检查: Hummingbot 成交 → 持仓账本 → 库存偏移；上次报价跨进程保留
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from position_ledger import PositionLedger
+from quote_engine import QuoteEngine
+from test_hummingbot_monitor import build_trade_db
+
+
+def test_fills_skew_quotes():
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir = os.path.join(directory, 'hummingbot_data')
+        os.makedirs(data_dir)
+        build_trade_db(data_dir)
+        map_path = os.path.join(directory, 'markets.json')
+        with open(map_path, 'w') as f:
+            json.dump({'TRUMP-2024': '253591'}, f)
+
+        ledger = PositionLedger(os.path.join(directory, 'positions.db'))
+        engine = QuoteEngine()
+        flat = engine.compute(np.array([0.5]), np.array([0.05]), np.array(ledger.inventory_vector(['253591'])))
+
+        assert ledger.sync_hummingbot(data_dir, map_path) == 2
+        assert ledger.sync_hummingbot(data_dir, map_path) == 0   # 游标已推进，不重复记账
+        inventory = ledger.inventory_vector(['253591'])
+        assert abs(inventory[0] - 6.0) < 1e-9
+
+        long = engine.compute(np.array([0.5]), np.array([0.05]), np.array(inventory))
+        assert long[3][0] < flat[3][0]   # 多头库存压低保留价
+        ledger.close()
+
+
+def test_last_quotes_persist():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'quotes.db')
+        args = (['a', 'b'], np.array([0.5, 0.3]), np.array([0.05, 0.05]), np.zeros(2))
+
+        assert len(QuoteEngine(db_path=path).update(*args)) == 2
+        # 新进程载入上次报价，价格未动时不再输出更新
+        assert QuoteEngine(db_path=path).update(*args) == []
+        moved = QuoteEngine(db_path=path).update(args[0], np.array([0.5, 0.4]), args[2], args[3])
+        assert [q['market_id'] for q in moved] == ['b']
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+onchain_ingester 离线检查
+RecordedChain 以 fixtures/onchain_logs.json (eth_getLogs 格式的 Polygon USDC Transfer 日志) 代替 RPC 节点:
+按区块区间 / 地址 / topic0 过滤，结果超过 max_results 时返回节点的 -32005 错误
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from onchain_ingester import BlockTimestampCache, LogIngester, decode_uint256_words, topic_address
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'onchain_logs.json'
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+USDC = '0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174'
+
+
+def as_bytes(value: str) -> bytes:
+    return bytes.fromhex(value[2:])
+
+
+class RecordedChain:
+    """web3.Web3 的最小替身: eth.block_number / eth.get_logs / eth.get_block"""
+
+    def __init__(self, path: Path = FIXTURE):
+        fixture = json.loads(path.read_text())
+        self.first_block = fixture['first_block']
+        self.first_timestamp = fixture['first_timestamp']
+        self.block_interval = fixture['block_interval']
+        self.max_results = fixture['max_results']
+        self.logs = [self._log(log) for log in fixture['logs']]
+        self.calls = []
+        self.eth = SimpleNamespace(
+            block_number=fixture['latest_block'],
+            get_logs=self.get_logs,
+            get_block=lambda number: {'number': number, 'timestamp': self.timestamp(number)}
+        )
+
+    @staticmethod
+    def _log(log: dict) -> dict:
+        return dict(log, transactionHash=as_bytes(log['transactionHash']), blockHash=as_bytes(log['blockHash']),
+                    topics=[as_bytes(t) for t in log['topics']], data=as_bytes(log['data']))
+
+    def timestamp(self, number: int) -> int:
+        return self.first_timestamp + (number - self.first_block) * self.block_interval
+
+    def add_log(self, log: dict):
+        self.logs.append(self._log(log))
+
+    def get_logs(self, params: dict) -> list:
+        self.calls.append((params['fromBlock'], params['toBlock']))
+        addresses = params['address'] if isinstance(params['address'], list) else [params['address']]
+        addresses = {a.lower() for a in addresses}
+        wanted = params['topics'][0] if params['topics'] else None
+        wanted = {w.lower() for w in (wanted if isinstance(wanted, list) else [wanted])} if wanted else None
+
+        found = [
+            log for log in self.logs
+            if params['fromBlock'] <= log['blockNumber'] <= params['toBlock']
+            and log['address'].lower() in addresses
+            and (wanted is None or '0x' + log['topics'][0].hex() in wanted)
+        ]
+        if len(found) > self.max_results:
+            raise ValueError({'code': -32005, 'message': f'query returned more than {self.max_results} results'})
+        return found
+
+
+def transfer_log(block: int, index: int, amount_usdc: int) -> dict:
+    return {
+        'address': USDC, 'blockNumber': block, 'logIndex': index,
+        'transactionHash': '0x' + f'{block:x}{index:04x}'.rjust(64, '0'), 'blockHash': '0x' + '11' * 32,
+        'topics': [TRANSFER_TOPIC, '0x' + '00' * 12 + 'aa' * 20, '0x' + '00' * 12 + 'bb' * 20],
+        'data': '0x' + (amount_usdc * 10 ** 6).to_bytes(32, 'big').hex(),
+    }
+
+
+def make_ingester(chain: RecordedChain, cursor_path: str) -> LogIngester:
+    return LogIngester(chain, USDC, [TRANSFER_TOPIC], name='usdc_transfer', cursor_path=cursor_path,
+                       start_lookback=300, confirmations=5, chunk_size=2000, min_chunk=10)
+
+
+def test_first_poll_splits_ranges_and_decodes():
+    chain = RecordedChain()
+    with tempfile.TemporaryDirectory() as directory:
+        ingester = make_ingester(chain, os.path.join(directory, 'cursor.json'))
+        logs = ingester.poll()
+
+    # 区块 61200240 的日志在确认数之内 (latest 260 - 5)，全部 6 条均已确认
+    assert [(log['blockNumber'], log['logIndex']) for log in logs] == sorted(
+        (log['blockNumber'], log['logIndex']) for log in chain.logs)
+    assert len(chain.calls) > 1 and ingester.chunk_size < 2000     # -32005 后二分并缩小切块
+    assert ingester.pending == 61200255
+
+    amounts = decode_uint256_words(log['data'] for log in logs) / 1e6
+    assert list(amounts) == [25000.0, 1250.0, 48500.5, 9999.99, 150000.0, 10000.0]
+    assert topic_address(logs[0]['topics'][1]) == '0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e'
+
+    times = BlockTimestampCache(chain).get_many(log['blockNumber'] for log in logs)
+    assert times[61200057] == 1707206400 + 57 * 2
+
+
+def test_cursor_resumes_after_commit():
+    chain = RecordedChain()
+    with tempfile.TemporaryDirectory() as directory:
+        cursor_path = os.path.join(directory, 'cursor.json')
+        first = make_ingester(chain, cursor_path)
+        first.poll()
+        first.commit()
+
+        chain.add_log(transfer_log(61200258, 0, 70000))
+        chain.add_log(transfer_log(61200268, 3, 90000))   # 尚未确认
+        chain.eth.block_number = 61200270
+        chain.calls.clear()
+
+        # 新进程从游标文件继续，只拉取游标之后的已确认区块
+        resumed = make_ingester(chain, cursor_path)
+        assert resumed.cursor == 61200255
+        logs = resumed.poll()
+        assert chain.calls == [(61200256, 61200265)]
+        assert [log['blockNumber'] for log in logs] == [61200258]
+
+
+def test_failed_round_is_refetched():
+    chain = RecordedChain()
+    with tempfile.TemporaryDirectory() as directory:
+        ingester = make_ingester(chain, os.path.join(directory, 'cursor.json'))
+        first = ingester.poll()
+        ingester.pending = None     # 处理失败: 不推进游标
+        ingester.commit()
+        assert ingester.cursor is None
+        assert len(ingester.poll()) == len(first)
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+钱包交易历史 (Polymarket Data API → SQLite)
+- /activity 分页并发拉取 (TRADE / REDEEM / SPLIT / MERGE / REWARD / CONVERSION)
+- 本地表按钱包缓存，之后只拉取上次同步之后的新记录
+- /positions 拉取当前持仓，用于未实现盈亏与持仓市值
+- 多钱包共用一个会话并发同步，全局限制同时在途的请求数
+- 已结算市场的结果 (Gamma) 缓存在同一库中
+- 读出为 pandas DataFrame 供分析
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATA_API = "https://data-api.polymarket.com"
+GAMMA_API = "https://gamma-api.polymarket.com"
+
+PAGE_SIZE = 500      # 单页上限
+MAX_OFFSET = 10000   # 接口允许的最大 offset，超过后按时间窗口继续向前翻
+
+ACTIVITY_COLUMNS = (
+    'wallet', 'ts', 'type', 'side', 'asset', 'condition_id', 'outcome', 'outcome_index',
+    'size', 'usdc_size', 'price', 'tx_hash', 'title', 'slug', 'event_slug'
+)
+
+POSITION_COLUMNS = (
+    'wallet', 'asset', 'condition_id', 'outcome', 'size', 'avg_price', 'initial_value',
+    'current_value', 'cash_pnl', 'realized_pnl', 'cur_price', 'redeemable', 'title',
+    'slug', 'event_slug', 'end_date'
+)
+
+
+def _to_float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def activity_row(wallet: str, item: Dict) -> Tuple:
+    """Data API /activity 记录 → 表行"""
+    return (
+        wallet,
+        int(_to_float(item.get('timestamp'))),
+        item.get('type') or 'TRADE',
+        item.get('side') or '',
+        str(item.get('asset') or ''),
+        (item.get('conditionId') or '').lower(),
+        item.get('outcome') or '',
+        int(_to_float(item.get('outcomeIndex'), -1)),
+        _to_float(item.get('size')),
+        _to_float(item.get('usdcSize')),
+        _to_float(item.get('price')),
+        item.get('transactionHash') or '',
+        item.get('title') or '',
+        item.get('slug') or '',
+        item.get('eventSlug') or '',
+    )
+
+
+def position_row(wallet: str, item: Dict) -> Tuple:
+    """Data API /positions 记录 → 表行"""
+    return (
+        wallet,
+        str(item.get('asset') or ''),
+        (item.get('conditionId') or '').lower(),
+        item.get('outcome') or '',
+        _to_float(item.get('size')),
+        _to_float(item.get('avgPrice')),
+        _to_float(item.get('initialValue')),
+        _to_float(item.get('currentValue')),
+        _to_float(item.get('cashPnl')),
+        _to_float(item.get('realizedPnl')),
+        _to_float(item.get('curPrice')),
+        int(bool(item.get('redeemable'))),
+        item.get('title') or '',
+        item.get('slug') or '',
+        item.get('eventSlug') or '',
+        item.get('endDate') or '',
+    )
+
+
+class TradeHistoryStore:
+    """
+    交易历史本地缓存
+    """
+
+    def __init__(self, db_path: str = "data/trade_history.db"):
+        self.db_path = db_path
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS activity (
+                wallet TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                side TEXT NOT NULL,
+                asset TEXT NOT NULL,
+                condition_id TEXT NOT NULL,
+                outcome TEXT,
+                outcome_index INTEGER,
+                size REAL NOT NULL,
+                usdc_size REAL NOT NULL,
+                price REAL NOT NULL,
+                tx_hash TEXT NOT NULL,
+                title TEXT,
+                slug TEXT,
+                event_slug TEXT,
+                -- 接口没有记录 id，用内容去重 (分页边界/时间窗口重叠会重复返回)
+                UNIQUE (wallet, tx_hash, type, side, asset, size, price, ts)
+            );
+            CREATE INDEX IF NOT EXISTS idx_activity_wallet_ts ON activity (wallet, ts);
+
+            CREATE TABLE IF NOT EXISTS positions (
+                wallet TEXT NOT NULL,
+                asset TEXT NOT NULL,
+                condition_id TEXT,
+                outcome TEXT,
+                size REAL,
+                avg_price REAL,
+                initial_value REAL,
+                current_value REAL,
+                cash_pnl REAL,
+                realized_pnl REAL,
+                cur_price REAL,
+                redeemable INTEGER,
+                title TEXT,
+                slug TEXT,
+                event_slug TEXT,
+                end_date TEXT,
+                PRIMARY KEY (wallet, asset)
+            );
+
+            CREATE TABLE IF NOT EXISTS sync_state (
+                wallet TEXT PRIMARY KEY,
+                last_ts INTEGER NOT NULL,
+                synced_at REAL NOT NULL
+            );
+
+            -- 已结算市场: 每个结果的最终赔付 (1/0)
+            CREATE TABLE IF NOT EXISTS resolutions (
+                condition_id TEXT PRIMARY KEY,
+                market_id TEXT,
+                payouts TEXT NOT NULL
+            );
+
+            -- 钱包技能指标缓存: fingerprint 不变 (无新成交、无新结算) 时直接复用
+            CREATE TABLE IF NOT EXISTS wallet_skills (
+                wallet TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                metrics TEXT
+            );
+        """)
+        self.conn.commit()
+
+    def sync_state(self, wallet: str) -> Tuple[Optional[int], float]:
+        """返回 (已缓存的最新记录时间, 上次同步时间)"""
+        row = self.conn.execute(
+            "SELECT last_ts, synced_at FROM sync_state WHERE wallet=?", (wallet,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, 0.0)
+
+    def save_activity(self, wallet: str, items: List[Dict]) -> int:
+        """写入活动记录，返回新增条数"""
+        before = self.conn.total_changes
+        self.conn.executemany(
+            f"INSERT OR IGNORE INTO activity ({', '.join(ACTIVITY_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(ACTIVITY_COLUMNS))})",
+            (activity_row(wallet, item) for item in items)
+        )
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def save_positions(self, wallet: str, items: List[Dict]):
+        """当前持仓整体替换"""
+        with self.conn:
+            self.conn.execute("DELETE FROM positions WHERE wallet=?", (wallet,))
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO positions ({', '.join(POSITION_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(POSITION_COLUMNS))})",
+                (position_row(wallet, item) for item in items)
+            )
+
+    def mark_synced(self, wallet: str):
+        row = self.conn.execute("SELECT MAX(ts) FROM activity WHERE wallet=?", (wallet,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sync_state (wallet, last_ts, synced_at) VALUES (?, ?, ?)",
+            (wallet, row[0] or 0, time.time())
+        )
+        self.conn.commit()
+
+    def sync_states(self, wallets: List[str]) -> Dict[str, int]:
+        """批量读取各钱包已缓存的最新记录时间"""
+        rows = self.conn.execute("SELECT wallet, last_ts FROM sync_state").fetchall()
+        wanted = set(wallets)
+        return {wallet: ts for wallet, ts in rows if wallet in wanted}
+
+    def load_activity(self, wallet: str) -> pd.DataFrame:
+        df = pd.read_sql_query(
+            "SELECT * FROM activity WHERE wallet=? ORDER BY ts", self.conn, params=(wallet,)
+        )
+        df['time'] = pd.to_datetime(df['ts'], unit='s')
+        return df
+
+    def load_activity_many(self, wallets: List[str], columns: Optional[List[str]] = None,
+                           since: Optional[int] = None, types: Tuple[str, ...] = ('TRADE',)) -> pd.DataFrame:
+        """多个钱包的记录读成一张表 (只取需要的列)"""
+        cols = ', '.join(columns) if columns else '*'
+        self._want_wallets(wallets)
+
+        query = (f"SELECT {cols} FROM activity WHERE wallet IN (SELECT wallet FROM wanted_wallets) "
+                 f"AND type IN ({', '.join('?' * len(types))})")
+        params: List = list(types)
+        if since is not None:
+            query += " AND ts >= ?"
+            params.append(since)
+        return pd.read_sql_query(query + " ORDER BY ts", self.conn, params=params)
+
+    def save_resolutions(self, resolutions: Dict[str, Tuple[str, List[float]]]):
+        """condition_id → (market_id, 各结果赔付)"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO resolutions (condition_id, market_id, payouts) VALUES (?, ?, ?)",
+            ((cid, mid, json.dumps(payouts)) for cid, (mid, payouts) in resolutions.items())
+        )
+        self.conn.commit()
+
+    def load_resolutions(self) -> Dict[str, Tuple[str, List[float]]]:
+        rows = self.conn.execute("SELECT condition_id, market_id, payouts FROM resolutions").fetchall()
+        return {cid: (mid, json.loads(payouts)) for cid, mid, payouts in rows}
+
+    def _want_wallets(self, wallets: List[str]):
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted_wallets (wallet TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM wanted_wallets")
+        self.conn.executemany("INSERT OR IGNORE INTO wanted_wallets VALUES (?)", ((w,) for w in wallets))
+
+    def traded_conditions(self, wallets: List[str]) -> List[str]:
+        """钱包成交过的全部 condition_id"""
+        self._want_wallets(wallets)
+        rows = self.conn.execute(
+            "SELECT DISTINCT condition_id FROM activity "
+            "WHERE wallet IN (SELECT wallet FROM wanted_wallets) AND type='TRADE'"
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def skill_fingerprints(self, wallets: List[str]) -> Dict[str, str]:
+        """
+        钱包 → (最新成交 rowid, 已结算的成交市场数)
+        任一变化说明该钱包的技能指标需要重算
+        """
+        self._want_wallets(wallets)
+        rows = self.conn.execute("""
+            SELECT a.wallet, MAX(a.rowid), COUNT(DISTINCT r.condition_id)
+            FROM activity a LEFT JOIN resolutions r ON r.condition_id = a.condition_id
+            WHERE a.wallet IN (SELECT wallet FROM wanted_wallets) AND a.type = 'TRADE'
+            GROUP BY a.wallet
+        """).fetchall()
+        return {wallet: f"{last}:{resolved}" for wallet, last, resolved in rows}
+
+    def load_skills(self) -> Dict[str, Tuple[str, Optional[Dict]]]:
+        """钱包 → (fingerprint, 指标；无已结算样本为 None)"""
+        rows = self.conn.execute("SELECT wallet, fingerprint, metrics FROM wallet_skills").fetchall()
+        return {wallet: (fp, json.loads(metrics) if metrics else None) for wallet, fp, metrics in rows}
+
+    def save_skills(self, fingerprints: Dict[str, str], metrics: Dict[str, Dict]):
+        """保存重算过的钱包 (metrics 中没有的钱包记为无样本)"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO wallet_skills (wallet, fingerprint, metrics) VALUES (?, ?, ?)",
+            ((w, fp, json.dumps(metrics[w]) if w in metrics else None) for w, fp in fingerprints.items())
+        )
+        self.conn.commit()
+
+    def load_positions(self, wallet: str) -> pd.DataFrame:
+        return pd.read_sql_query("SELECT * FROM positions WHERE wallet=?", self.conn, params=(wallet,))
+
+    def close(self):
+        self.conn.close()
+
+
+class TradeHistoryFetcher:
+    """
+    Data API 分页并发拉取
+    每轮并发请求 concurrency 个连续 offset 的页面，出现不满页即到底；
+    offset 达到上限后以已取到的最早时间作为 end 重新从 0 翻页
+    """
+
+    def __init__(self, store: TradeHistoryStore, concurrency: int = 8,
+                 max_age: float = 3600, timeout: float = 30, max_requests: int = 16):
+        self.store = store
+        self.concurrency = concurrency
+        self.max_age = max_age    # 缓存在该时间内视为最新，不请求接口
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_requests = max_requests  # 所有钱包合计同时在途的请求数
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _get(self, session: aiohttp.ClientSession, path: str, params,
+                   retries: int = 3, base_url: str = DATA_API) -> List[Dict]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_requests)
+
+        for attempt in range(retries):
+            try:
+                async with self._semaphore, session.get(f"{base_url}{path}", params=params) as resp:
+                    if resp.status == 429 or resp.status >= 500:
+                        raise aiohttp.ClientResponseError(
+                            resp.request_info, resp.history, status=resp.status
+                        )
+                    resp.raise_for_status()
+                    data = await resp.json()
+                    return data if isinstance(data, list) else []
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == retries - 1:
+                    raise
+                logger.warning(f"⚠️ {path} 请求失败，重试 ({e})")
+                await asyncio.sleep(2 ** attempt)
+        return []
+
+    async def fetch_activity(self, session: aiohttp.ClientSession, wallet: str,
+                             start: Optional[int] = None) -> List[Dict]:
+        """拉取 start 之后 (含) 的全部活动记录，按时间倒序翻页"""
+        items: List[Dict] = []
+        end: Optional[int] = None
+        offset = 0
+
+        while True:
+            offsets = [o for o in range(offset, offset + self.concurrency * PAGE_SIZE, PAGE_SIZE)
+                       if o <= MAX_OFFSET]
+            params = []
+            for o in offsets:
+                p = {'user': wallet, 'limit': PAGE_SIZE, 'offset': o,
+                     'sortBy': 'TIMESTAMP', 'sortDirection': 'DESC'}
+                if start is not None:
+                    p['start'] = start
+                if end is not None:
+                    p['end'] = end
+                params.append(p)
+
+            pages = await asyncio.gather(*(self._get(session, '/activity', p) for p in params))
+            done = False
+            for page in pages:
+                items.extend(page)
+                if len(page) < PAGE_SIZE:
+                    done = True
+                    break
+            if done:
+                return items
+
+            offset = offsets[-1] + PAGE_SIZE
+            if offset > MAX_OFFSET:
+                # 翻到上限，缩小时间窗口继续 (边界上的重复记录由表的唯一约束去重)
+                oldest = min(int(_to_float(item.get('timestamp'))) for item in items)
+                if oldest == end:
+                    logger.warning(f"⚠️ {wallet} 同一时间戳记录超过 offset 上限，停止翻页")
+                    return items
+                end = oldest
+                offset = 0
+
+    async def fetch_positions(self, session: aiohttp.ClientSession, wallet: str) -> List[Dict]:
+        positions: List[Dict] = []
+        offset = 0
+        while offset <= MAX_OFFSET:
+            page = await self._get(session, '/positions', {
+                'user': wallet, 'limit': PAGE_SIZE, 'offset': offset, 'sizeThreshold': 0
+            })
+            positions.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        return positions
+
+    async def sync(self, wallet: str, force: bool = False,
+                   session: Optional[aiohttp.ClientSession] = None) -> int:
+        """同步一个钱包，返回新增记录数；缓存未过期时直接返回 0"""
+        wallet = wallet.lower()
+        last_ts, synced_at = self.store.sync_state(wallet)
+        if not force and time.time() - synced_at < self.max_age:
+            return 0
+
+        if session is None:
+            async with aiohttp.ClientSession(timeout=self.timeout) as own_session:
+                return await self.sync(wallet, force=True, session=own_session)
+
+        activity, positions = await asyncio.gather(
+            self.fetch_activity(session, wallet, start=last_ts),
+            self.fetch_positions(session, wallet)
+        )
+
+        added = self.store.save_activity(wallet, activity)
+        self.store.save_positions(wallet, positions)
+        self.store.mark_synced(wallet)
+        logger.info(f"📥 {wallet}: 拉取 {len(activity)} 条活动 (新增 {added})，{len(positions)} 个持仓")
+        return added
+
+    async def sync_many(self, wallets: List[str], force: bool = False) -> Dict[str, int]:
+        """并发同步多个钱包，单个失败不影响其他钱包；返回 钱包 → 新增记录数"""
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            results = await asyncio.gather(
+                *(self.sync(wallet, force=force, session=session) for wallet in wallets),
+                return_exceptions=True
+            )
+
+        added = {}
+        for wallet, result in zip(wallets, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ 同步 {wallet} 失败: {result}")
+            else:
+                added[wallet.lower()] = result
+        return added
+
+    async def fetch_resolutions(self, condition_ids: List[str], batch_size: int = 50) -> int:
+        """
+        从 Gamma 拉取尚未缓存的已结算市场结果，返回新增数量
+        结算后 outcomePrices 为 ["1", "0"] 形式，未结算的不缓存
+        """
+        known = self.store.load_resolutions()
+        missing = [cid for cid in dict.fromkeys(condition_ids) if cid and cid not in known]
+        if not missing:
+            return 0
+
+        async def fetch_batch(batch: List[str]) -> List[Dict]:
+            params = [('condition_ids', cid) for cid in batch] + [('limit', len(batch))]
+            return await self._get(session, '/markets', params, base_url=GAMMA_API)
+
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+            pages = await asyncio.gather(*(fetch_batch(b) for b in batches), return_exceptions=True)
+
+        resolved = {}
+        for page in pages:
+            if isinstance(page, Exception):
+                logger.error(f"❌ 拉取市场结果失败: {page}")
+                continue
+            for market in page:
+                if not market.get('closed'):
+                    continue
+                prices = market.get('outcomePrices')
+                if isinstance(prices, str):
+                    try:
+                        prices = json.loads(prices)
+                    except ValueError:
+                        continue
+                payouts = [_to_float(p) for p in prices or []]
+                # 只接受明确结算为 0/1 的市场
+                if payouts and all(p in (0.0, 1.0) for p in payouts) and sum(payouts) == 1.0:
+                    cid = (market.get('conditionId') or '').lower()
+                    resolved[cid] = (str(market.get('id', '')), payouts)
+
+        self.store.save_resolutions(resolved)
+        return len(resolved)
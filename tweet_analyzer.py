@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+推文信号分析器
+关键词在初始化时构建为 Aho-Corasick 自动机 (安装了 pyahocorasick 时)，
+一次扫描即可得到全部命中的关键词及其类别；未安装时退化为对小写文本的子串查找。
+(Python re 的多分支正则逐位置逐分支尝试，实测比这两种方式都慢，因此不用于关键词)
+市场与金额模式只编译一次。支持批量评分，用于回测归档推文。
+
+评分规则与原 TwitterSignalMonitor.analyze_tweet 一致:
+买入/卖出关键词 +20，持仓 +15，市场 +10，具体市场 +25，金额 +10，
+置信度 >= 30 且有命中时视为有效信号。
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+KEYWORDS = {
+    'buy': ['bought', 'buying', 'long', '做多', '买入'],
+    'sell': ['sold', 'selling', 'short', '做空', '卖出'],
+    'position': ['position', '持仓', '仓位', '押注'],
+    'markets': ['polymarket', 'kalshi', '预测市场'],
+    'crypto': ['bitcoin', 'ethereum', 'btc', 'eth', '加密']
+}
+
+# 类别 → (信号前缀, 分值)，未列出的类别只记录不计分
+CATEGORY_SCORES = {
+    'buy': ('BUY', 20),
+    'sell': ('SELL', 20),
+    'position': ('POSITION', 15),
+    'markets': ('MARKET', 10),
+}
+
+# "Will X win/lose/happen"
+WILL_PATTERN = re.compile(r'Will\s+([A-Za-z\s]+)\s+(win|lose|happen)', re.IGNORECASE)
+# "X by 2025": 先定位 "by 年份"，再向前取连续的字母/空白，避免逐位置回溯
+BY_YEAR_PATTERN = re.compile(r'\s+by\s+\d{4}', re.IGNORECASE)
+LETTERS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ \t\n\r\f\v')
+
+AMOUNT_PATTERN = re.compile(r'\$([\d,]+(?:\.\d+)?)([KkMm]?)')
+AMOUNT_MULTIPLIERS = {'': 1, 'k': 1e3, 'm': 1e6}
+
+MIN_CONFIDENCE = 30
+
+
+def parse_amount(number: str, suffix: str) -> float:
+    """'1,500' + 'K' → 1500000.0"""
+    return float(number.replace(',', '')) * AMOUNT_MULTIPLIERS[suffix.lower()]
+
+
+class TweetAnalyzer:
+    """
+    编译后的多模式推文分析器
+    """
+
+    def __init__(self, keywords: Optional[Dict[str, List[str]]] = None,
+                 min_confidence: int = MIN_CONFIDENCE):
+        self.keywords = keywords or KEYWORDS
+        self.min_confidence = min_confidence
+
+        # 关键词 → 所属类别 (按配置顺序，可属于多个类别)
+        self.categories: Dict[str, List[str]] = {}
+        for category, words in self.keywords.items():
+            for word in words:
+                self.categories.setdefault(word.lower(), []).append(category)
+
+        self._automaton = None
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for word in self.categories:
+                self._automaton.add_word(word, word)
+            self._automaton.make_automaton()
+        self._words = tuple(self.categories)
+
+        # 原实现按配置顺序输出信号，这里记录每个关键词的排序位置
+        self.order = {}
+        for category, words in self.keywords.items():
+            for word in words:
+                self.order.setdefault((category, word.lower()), len(self.order))
+
+    def match_keywords(self, text: str) -> List[Tuple[str, str]]:
+        """返回命中的 (类别, 关键词)，按配置顺序去重"""
+        lower = text.lower()
+        if self._automaton is not None:
+            found = {word for _, word in self._automaton.iter(lower)}
+        else:
+            found = [word for word in self._words if word in lower]
+
+        hits = [(c, w) for w in found for c in self.categories[w]]
+        return sorted(hits, key=self.order.__getitem__)
+
+    def extract_markets(self, text: str) -> List[str]:
+        """提取具体市场引用，每个模式取第一个匹配"""
+        refs = []
+
+        match = WILL_PATTERN.search(text)
+        if match:
+            refs.append(' '.join(match.group(0).split()))
+
+        for match in BY_YEAR_PATTERN.finditer(text):
+            start = match.start()
+            while start > 0 and text[start - 1] in LETTERS:
+                start -= 1
+            if start < match.start():
+                refs.append(' '.join(text[start:match.end()].split()))
+                break
+
+        return refs
+
+    def extract_amounts(self, text: str) -> List[float]:
+        """提取所有美元金额"""
+        return [parse_amount(n, s) for n, s in AMOUNT_PATTERN.findall(text)]
+
+    def analyze_text(self, text: str) -> Dict:
+        """对一段文本评分，返回结构化结果 (不论是否达到阈值)"""
+        signals = []
+        confidence = 0
+        categories = {}
+
+        for category, keyword in self.match_keywords(text):
+            categories.setdefault(category, []).append(keyword)
+            if category in CATEGORY_SCORES:
+                prefix, score = CATEGORY_SCORES[category]
+                signals.append(f'{prefix}:{keyword}')
+                confidence += score
+
+        market_refs = self.extract_markets(text)
+        for ref in market_refs:
+            signals.append(f'MARKET_SPECIFIC:{ref}')
+            confidence += 25
+
+        amounts = self.extract_amounts(text)
+        if amounts:
+            confidence += 10
+
+        return {
+            'signals': signals,
+            'confidence': confidence,
+            'categories': categories,
+            'market_refs': market_refs,
+            'amounts': amounts,
+            'amount_usd': amounts[0] if amounts else None
+        }
+
+    def analyze(self, tweet: Dict) -> Optional[Dict]:
+        """分析单条推文，未达到阈值返回 None"""
+        text = tweet.get('title', '') + ' ' + tweet.get('description', '')
+        result = self.analyze_text(text)
+
+        if result['confidence'] < self.min_confidence or not result['signals']:
+            return None
+
+        return dict(
+            result,
+            timestamp=tweet.get('pubDate'),
+            text=text[:200],
+            link=tweet.get('link')
+        )
+
+    def iter_batch(self, tweets: Iterable[Dict]) -> Iterator[Tuple[Dict, Optional[Dict]]]:
+        """流式批量评分，产出 (推文, 信号或 None)，适合回测大量归档推文"""
+        analyze = self.analyze
+        for tweet in tweets:
+            yield tweet, analyze(tweet)
+
+    def analyze_batch(self, tweets: Iterable[Dict]) -> List[Dict]:
+        """批量评分，只返回有效信号"""
+        return [signal for _, signal in self.iter_batch(tweets) if signal is not None]
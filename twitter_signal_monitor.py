@@ -5,13 +5,14 @@ Twitter 交易信号监控工具
 当出现交易信号时发送通知
 """
 
-import os
-import json
 import time
-import re
 from datetime import datetime
 from typing import List, Dict, Optional
-import requests
+
+from feed_poller import FeedPoller
+from seen_store import SeenStore
+from signal_bus import SIGNAL_DB, Signal, SignalBus
+from tweet_analyzer import KEYWORDS, TweetAnalyzer
 
 class TwitterSignalMonitor:
     """
@@ -19,15 +20,12 @@ class TwitterSignalMonitor:
     注意: 需要使用 Twitter API v2 或 nitter 等替代方案
     """
     
-    def __init__(self, username: str = "0xCristal"):
+    def __init__(self, username: str = "0xCristal", bus: Optional[SignalBus] = None):
         self.username = username
-        self.keywords = {
-            'buy': ['bought', 'buying', 'long', '做多', '买入'],
-            'sell': ['sold', 'selling', 'short', '做空', '卖出'],
-            'position': ['position', '持仓', '仓位', '押注'],
-            'markets': ['polymarket', 'kalshi', '预测市场'],
-            'crypto': ['bitcoin', 'ethereum', 'btc', 'eth', '加密']
-        }
+        self.bus = bus or SignalBus(SIGNAL_DB)
+        self.poller = FeedPoller()
+        self.keywords = KEYWORDS
+        self.analyzer = TweetAnalyzer(self.keywords)
         
         self.signals_history = []
         self.monitor_log = f"twitter_monitor_{username}.log"
@@ -39,107 +37,16 @@ class TwitterSignalMonitor:
     def fetch_tweets_nitter(self, count: int = 20) -> List[Dict]:
         """
         使用 nitter 获取推文 (无需 API key)
-        nitter 是 Twitter 的开源镜像
+        nitter 是 Twitter 的开源镜像；订阅未更新时返回空列表
         """
-        # nitter 实例列表 (部分可能不可用)
-        nitter_instances = [
-            "https://nitter.net",
-            "https://nitter.it",
-            "https://nitter.cz",
-        ]
-        
-        tweets = []
-        
-        for instance in nitter_instances:
-            try:
-                url = f"{instance}/{self.username}/rss"
-                response = requests.get(url, timeout=10)
-                
-                if response.status_code == 200:
-                    # 解析 RSS
-                    import xml.etree.ElementTree as ET
-                    root = ET.fromstring(response.content)
-                    
-                    for item in root.findall('.//item')[:count]:
-                        tweet = {
-                            'title': item.find('title').text if item.find('title') is not None else '',
-                            'link': item.find('link').text if item.find('link') is not None else '',
-                            'pubDate': item.find('pubDate').text if item.find('pubDate') is not None else '',
-                            'description': item.find('description').text if item.find('description') is not None else ''
-                        }
-                        tweets.append(tweet)
-                    
-                    if tweets:
-                        break  # 成功获取，跳出循环
-                        
-            except Exception as e:
-                continue
-        
-        return tweets
+        self.poller.count = count
+        return self.poller.poll_sync([self.username]).get(self.username, [])
     
     def analyze_tweet(self, tweet: Dict) -> Optional[Dict]:
         """
         分析单条推文，提取交易信号
         """
-        text = tweet.get('title', '') + ' ' + tweet.get('description', '')
-        text_lower = text.lower()
-        
-        signal = {
-            'timestamp': tweet.get('pubDate'),
-            'text': text[:200],
-            'link': tweet.get('link'),
-            'signals': [],
-            'confidence': 0
-        }
-        
-        # 检测买入信号
-        for keyword in self.keywords['buy']:
-            if keyword in text_lower:
-                signal['signals'].append(f'BUY:{keyword}')
-                signal['confidence'] += 20
-        
-        # 检测卖出信号
-        for keyword in self.keywords['sell']:
-            if keyword in text_lower:
-                signal['signals'].append(f'SELL:{keyword}')
-                signal['confidence'] += 20
-        
-        # 检测持仓信息
-        for keyword in self.keywords['position']:
-            if keyword in text_lower:
-                signal['signals'].append(f'POSITION:{keyword}')
-                signal['confidence'] += 15
-        
-        # 检测市场提及
-        for keyword in self.keywords['markets']:
-            if keyword in text_lower:
-                signal['signals'].append(f'MARKET:{keyword}')
-                signal['confidence'] += 10
-        
-        # 检测具体市场 (Polymarket 格式)
-        market_patterns = [
-            r'Will\s+([A-Za-z\s]+)\s+(win|lose|happen)',
-            r'([A-Za-z\s]+)\s+by\s+\d{4}',
-        ]
-        
-        for pattern in market_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                signal['signals'].append(f'MARKET_SPECIFIC:{matches[0]}')
-                signal['confidence'] += 25
-        
-        # 提取金额
-        amount_pattern = r'\$([\d,]+(?:\.\d+)?)([KkMm]?)'
-        amount_matches = re.findall(amount_pattern, text)
-        if amount_matches:
-            signal['amount'] = amount_matches[0]
-            signal['confidence'] += 10
-        
-        # 只有置信度 > 30 才认为是有效信号
-        if signal['confidence'] >= 30 and signal['signals']:
-            return signal
-        
-        return None
+        return self.analyzer.analyze(tweet)
     
     def save_signal(self, signal: Dict):
         """保存信号到历史记录"""
@@ -153,6 +60,14 @@ class TwitterSignalMonitor:
             f.write(f"置信度: {signal['confidence']}\n")
             f.write(f"内容: {signal['text']}\n")
             f.write(f"链接: {signal['link']}\n")
+        
+        # 发布到信号总线
+        self.bus.publish_nowait(Signal(
+            source='twitter',
+            kind='tweet',
+            confidence=signal['confidence'],
+            payload=dict(signal, username=self.username)
+        ))
     
     def generate_alert(self, signal: Dict):
         """生成警报消息"""
@@ -187,7 +102,8 @@ class TwitterSignalMonitor:
         print(f"\n🔄 开始监控循环（每 {interval} 秒检查一次）")
         print("按 Ctrl+C 停止\n")
         
-        checked_tweets = set()  # 避免重复检查
+        # 避免重复检查，持久化并带过期，重启后不会重复提醒
+        checked_tweets = SeenStore(f"twitter:{self.username}")
         
         try:
             while True:
@@ -201,9 +117,7 @@ class TwitterSignalMonitor:
                     # 使用链接作为唯一标识
                     tweet_id = tweet.get('link', '')
                     
-                    if tweet_id and tweet_id not in checked_tweets:
-                        checked_tweets.add(tweet_id)
-                        
+                    if tweet_id and checked_tweets.add(tweet_id):
                         # 分析推文
                         signal = self.analyze_tweet(tweet)
                         
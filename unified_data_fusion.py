@@ -2,12 +2,72 @@
 """
 统一数据融合中心
 整合所有数据源，输出交易信号
+
+各数据源通过信号总线 (signal_bus) 发布信号，
+融合中心订阅后每收到一条信号即重新评分，不再定时轮询。
+
+评分按市场分别维护: 每个 (市场, 数据源) 保存指数衰减的置信度累加值，
+新信号只更新所属市场，O(1) 完成；超过窗口未更新的数据源不再计入。
+不带 market_id 的信号 (推文、新闻) 通过 MarketLinker 按文本关联到市场，
+关联不上的只计数，不参与评分。
 """
 
+import re
+import math
+import time
+import heapq
 import asyncio
 import json
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from market_catalog import MarketCatalog
+from market_linker import MarketLinker, payload_text
+from signal_bus import SIGNAL_DB, Signal, SignalBus
+
+UNLINKED_MARKET = 'UNKNOWN'  # 保存信号时缺少市场的占位名
+
+
+class DecayedAggregate:
+    """
+    指数衰减累加器
+    value / weight 分别为衰减后的置信度之和与信号数，二者之比即衰减加权平均置信度
+    (每条信号可带权重，默认 1)
+    """
+    __slots__ = ('value', 'weight', 'updated')
+
+    def __init__(self):
+        self.value = 0.0
+        self.weight = 0.0
+        self.updated = 0.0
+
+    def add(self, confidence: float, ts: float, decay: float, window: float, weight: float = 1.0):
+        if ts >= self.updated:
+            if ts - self.updated > window:
+                self.value = self.weight = 0.0
+            else:
+                factor = math.exp(-decay * (ts - self.updated))
+                self.value *= factor
+                self.weight *= factor
+            self.updated = ts
+            self.value += confidence * weight
+            self.weight += weight
+        elif self.updated - ts <= window:
+            # 迟到的信号按其年龄衰减后计入
+            factor = math.exp(-decay * (self.updated - ts)) * weight
+            self.value += confidence * factor
+            self.weight += factor
+
+    def read(self, now: float, decay: float, window: float) -> Optional[Dict]:
+        """返回当前的平均置信度与有效信号数，超出窗口返回 None"""
+        age = now - self.updated
+        if self.weight <= 0 or age > window:
+            return None
+        return {
+            'confidence': self.value / self.weight,
+            'signals': self.weight * math.exp(-decay * max(age, 0))
+        }
+
 
 class UnifiedDataFusion:
     """
@@ -15,59 +75,162 @@ class UnifiedDataFusion:
     整合多个数据源，生成综合交易信号
     """
     
-    def __init__(self):
+    def __init__(self, bus: Optional[SignalBus] = None, half_life: float = 3600,
+                 window: float = 6 * 3600, min_signals: float = 0.1,
+                 linker: Optional[MarketLinker] = None, catalog_refresh: float = 900):
         self.sources = {
-            'twitter': {'weight': 0.3, 'signals': []},
-            'fivethirtyeight': {'weight': 0.25, 'signals': []},
-            'espn': {'weight': 0.2, 'signals': []},
-            'onchain': {'weight': 0.15, 'signals': []},
-            'news': {'weight': 0.1, 'signals': []}
+            'twitter': {'weight': 0.3},
+            'fivethirtyeight': {'weight': 0.25},
+            'espn': {'weight': 0.2},
+            'onchain': {'weight': 0.15},
+            'news': {'weight': 0.1},
+            'scanner': {'weight': 0.2}
         }
         
         self.fusion_threshold = 70  # 融合后置信度阈值
+        self.bus = bus or SignalBus(SIGNAL_DB)
+        
+        self.decay = math.log(2) / half_life  # 半衰期换算的衰减率
+        self.window = window                  # 超过该时长未更新的数据源不计入
+        self.min_signals = min_signals        # 衰减后有效信号数低于该值的数据源不计入
+        
+        # market_id → {source: DecayedAggregate}
+        self.markets: Dict[str, Dict[str, DecayedAggregate]] = {}
+        self.scores: Dict[str, float] = {}
+        self.ingested = 0
+        self.unlinked = 0   # 无法关联市场而丢弃的信号数
+        
+        self.linker = linker or MarketLinker()
+        self.catalog_refresh = catalog_refresh  # 市场目录刷新间隔 (秒)，0 表示不自动刷新
     
-    def calculate_fusion_score(self, signals: List[Dict]) -> Dict:
+    def ingest(self, signal: Signal) -> Optional[Dict]:
         """
-        计算融合后的综合评分
+        接收一条总线信号，只更新其所属市场，返回该市场的融合结果
+        未知来源或无法关联市场时返回 None (不同市场的噪声不能汇成一个虚构市场的信号)
+        """
+        if signal.source not in self.sources:
+            return None
+        
+        market_id = signal.market_id or self.link_market(signal)
+        if market_id is None:
+            self.unlinked += 1
+            return None
+        aggregates = self.markets.setdefault(market_id, {})
+        aggregate = aggregates.get(signal.source)
+        if aggregate is None:
+            aggregate = aggregates[signal.source] = DecayedAggregate()
+        
+        aggregate.add(signal.confidence, signal.timestamp, self.decay, self.window)
+        
+        self.ingested += 1
+        if self.ingested % 10000 == 0:
+            self.prune()
+        
+        return self.calculate_fusion_score(market_id, now=max(signal.timestamp, time.time()))
+    
+    def link_market(self, signal: Signal) -> Optional[str]:
+        """
+        按文本把信号关联到市场，并记录到 payload
+        """
+        text = payload_text(signal.payload)
+        if not text:
+            return None
+        
+        match = self.linker.link(text)
+        if match is None:
+            return None
+        
+        market_id, score = match
+        signal.market_id = market_id
+        signal.payload['linked_market'] = {
+            'market_id': market_id,
+            'question': self.linker.questions.get(market_id),
+            'score': round(score, 2)
+        }
+        return market_id
+    
+    async def sync_markets(self, catalog: MarketCatalog) -> bool:
+        """同步一次市场目录，增量更新关联索引"""
+        try:
+            await catalog.sync()
+            stats = self.linker.sync_catalog(catalog)
+            print(f"📚 市场索引: 更新 {stats['updated']} | 移除 {stats['removed']} | 共 {stats['total']}")
+            return True
+        except Exception as e:
+            print(f"❌ 市场目录同步失败: {e}")
+            return False
+    
+    async def refresh_markets(self, catalog: MarketCatalog):
+        """定期同步市场目录 (首次同步由 run 完成)"""
+        while True:
+            await asyncio.sleep(self.catalog_refresh)
+            await self.sync_markets(catalog)
+    
+    def calculate_fusion_score(self, market_id: str, now: Optional[float] = None) -> Dict:
+        """
+        计算单个市场的融合评分
         
         加权平均算法:
-        score = Σ(source_confidence × source_weight)
+        w = source_weight × min(1, decayed_signals)
+        score = Σ(decayed_confidence × w) / Σ(w)
         """
+        now = now if now is not None else time.time()
         total_score = 0
         total_weight = 0
         
         details = {}
         
-        for source, data in self.sources.items():
-            weight = data['weight']
-            signals = data['signals']
+        for source, aggregate in self.markets.get(market_id, {}).items():
+            state = aggregate.read(now, self.decay, self.window)
+            if state is None or state['signals'] < self.min_signals:
+                continue
             
-            if signals:
-                # 取该源的最新信号
-                latest = signals[-1]
-                confidence = latest.get('confidence', 0)
-                
-                weighted_score = confidence * weight
-                total_score += weighted_score
-                total_weight += weight
-                
-                details[source] = {
-                    'confidence': confidence,
-                    'weight': weight,
-                    'contribution': weighted_score
-                }
+            # 新鲜度: 衰减后有效信号数不足 1 时按比例降低权重
+            weight = self.sources[source]['weight'] * min(1.0, state['signals'])
+            weighted_score = state['confidence'] * weight
+            total_score += weighted_score
+            total_weight += weight
+            
+            details[source] = {
+                'confidence': round(state['confidence'], 2),
+                'signals': round(state['signals'], 2),
+                'weight': round(weight, 4),
+                'contribution': weighted_score
+            }
         
         if total_weight > 0:
             final_score = total_score / total_weight
         else:
             final_score = 0
         
+        self.scores[market_id] = final_score
+        
         return {
+            'market_id': market_id,
             'score': round(final_score, 2),
             'details': details,
             'timestamp': datetime.now().isoformat()
         }
     
+    def top_markets(self, k: int = 10) -> List[Dict]:
+        """当前评分最高的 k 个市场 (按需重新评分，不在每条信号时全量计算)"""
+        now = time.time()
+        candidates = heapq.nlargest(k * 2, self.scores, key=self.scores.get)
+        results = [self.calculate_fusion_score(m, now) for m in candidates]
+        return heapq.nlargest(k, results, key=lambda r: r['score'])
+    
+    def prune(self, now: Optional[float] = None) -> int:
+        """移除所有数据源都已超出窗口的市场"""
+        now = now if now is not None else time.time()
+        stale = [
+            market_id for market_id, aggregates in self.markets.items()
+            if all(now - a.updated > self.window for a in aggregates.values())
+        ]
+        for market_id in stale:
+            del self.markets[market_id]
+            self.scores.pop(market_id, None)
+        return len(stale)
+    
     def generate_trading_signal(self, fusion_result: Dict) -> Dict:
         """
         根据融合结果生成交易信号
@@ -82,66 +245,65 @@ class UnifiedDataFusion:
                 'urgency': 'HIGH' if score > 85 else 'MEDIUM',
                 'sources': fusion_result['details'],
                 'timestamp': fusion_result['timestamp'],
-                'market': self._infer_market(fusion_result)
+                'market': fusion_result['market_id']
             }
         else:
             signal = {
                 'action': 'WAIT',
                 'confidence': score,
                 'reason': 'Confidence below threshold',
-                'timestamp': fusion_result['timestamp']
+                'timestamp': fusion_result['timestamp'],
+                'market': fusion_result['market_id']
             }
         
         return signal
     
-    def _infer_market(self, fusion_result: Dict) -> str:
-        """推断相关市场"""
-        # 简化版：根据数据源推断
-        details = fusion_result.get('details', {})
-        
-        if 'fivethirtyeight' in details:
-            return 'US_ELECTION_2024'
-        elif 'espn' in details:
-            return 'SPORTS'
-        else:
-            return 'UNKNOWN'
-    
     async def run(self):
-        """主运行循环"""
+        """主运行循环: 每收到一条信号只重新评分其所属市场"""
         print("🚀 启动统一数据融合中心")
         print("=" * 60)
         
-        while True:
+        consumer = 'fusion' if self.bus.durable else None
+        subscription = self.bus.subscribe(self.sources.keys(), consumer=consumer)
+        
+        # 首次同步完成前不消费信号，否则启动时积压的信号都会落到未关联市场
+        catalog = MarketCatalog()
+        if not await self.sync_markets(catalog):
+            print("⚠️ 首次市场目录同步失败，信号暂时无法关联市场")
+        refresher = asyncio.create_task(self.refresh_markets(catalog)) if self.catalog_refresh else None
+        trading = set()  # 当前处于 TRADE 状态的市场，只在状态变化时输出
+        
+        async for incoming in subscription:
             try:
-                # 这里应该读取各个数据源的信号
-                # 简化版示例
+                fusion_result = self.ingest(incoming)
+                if fusion_result is None:
+                    continue
                 
-                fusion_result = self.calculate_fusion_score([])
                 signal = self.generate_trading_signal(fusion_result)
+                market = signal['market']
                 
-                if signal['action'] == 'TRADE':
+                if signal['action'] == 'TRADE' and market not in trading:
+                    trading.add(market)
                     print(f"\n🚨 交易信号生成!")
                     print(f"   方向: {signal['direction']}")
                     print(f"   置信度: {signal['confidence']}/100")
                     print(f"   紧急度: {signal['urgency']}")
-                    print(f"   市场: {signal['market']}")
+                    print(f"   市场: {market}")
                     
                     # 保存信号
                     self._save_signal(signal)
-                else:
-                    print(f"\n⏳ 等待中... 当前置信度: {signal['confidence']}/100")
-                
-                print(f"\n⏰ {datetime.now().strftime('%H:%M:%S')} - 下次检查...")
-                await asyncio.sleep(300)  # 5分钟
+                elif signal['action'] == 'WAIT' and market in trading:
+                    trading.discard(market)
+                    print(f"\n⏳ {market} 置信度回落至 {signal['confidence']}/100")
                 
             except Exception as e:
                 print(f"❌ 运行错误: {e}")
-                await asyncio.sleep(60)
     
     def _save_signal(self, signal: Dict):
         """保存信号到文件"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"signals/fusion_signal_{timestamp}.json"
+        market = re.sub(r'[^\w-]', '_', str(signal.get('market', UNLINKED_MARKET)))
+        filename = f"signals/fusion_signal_{market}_{timestamp}.json"
         
         import os
         os.makedirs('signals', exist_ok=True)